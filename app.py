@@ -1,17 +1,235 @@
-from flask import Flask, render_template, request, redirect, url_for, send_from_directory, session
+from flask import Flask, Response, render_template, request, redirect, url_for, send_file, session, jsonify, abort
+import io
+import logging
 import os
+import shutil
+import tempfile
+import threading
 import uuid
-from werkzeug.utils import secure_filename
-from utils.pdf_generator import generate_summary_pdf, convert_to_pdf, merge_pdfs
+import zipfile
+from utils.pipeline import FORM_FIELDS, build_profile, lock_name, profile_lock, profile_name, record_name, save_profile_record, load_profile_record, update_profile
+from utils.jobs import JobStore, JobQueue, QueueFull
+from utils.bulk import ManifestError, parse_manifest, stream_bulk_zip, get_bulk_executor
+from utils.conversion_cache import ConversionCache
+from utils.storage import StorageManager, servable
+from utils.file_serving import file_version, send_profile
+from utils.metrics import REGISTRY, JOBS_IN_FLIGHT, PipelineTrace, input_type, log_event
+from utils.profiling import profile_stats_name, profiled, wants_profile
+from utils.warmup import is_ready, warm_up, warm_up_in_background
+from utils.limits import DocumentTooLarge, ResumeLimits
+from utils.admission import Admission, Busy
+from utils.search import SearchIndex
+from utils.fingerprint import Fingerprint, upload_text
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'supersecretkey')
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload
+# Background job mode: profiles are generated off the request when the form
+# is posted with async=1 (or always, when ASYNC_JOBS is set)
+app.config['ASYNC_JOBS'] = os.environ.get('ASYNC_JOBS') == '1'
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', '2'))
+app.config['JOB_QUEUE_LIMIT'] = int(os.environ.get('JOB_QUEUE_LIMIT', '50'))
+app.config['JOB_DATABASE'] = os.environ.get('JOB_DATABASE')  # defaults to UPLOAD_FOLDER/jobs.sqlite3
+# Converted resumes are cached by content hash (CONVERSION_CACHE_MAX_MB=0 disables)
+app.config['CONVERSION_CACHE_DIR'] = os.environ.get('CONVERSION_CACHE_DIR')  # defaults to UPLOAD_FOLDER/.conversion-cache
+app.config['CONVERSION_CACHE_MAX_BYTES'] = int(os.environ.get('CONVERSION_CACHE_MAX_MB', '512')) * 1024 * 1024
+# Upload folder lifecycle: final profiles expire after PROFILE_TTL_HOURS, or
+# least recently downloaded first once STORAGE_QUOTA_MB is exceeded
+app.config['PROFILE_TTL'] = float(os.environ.get('PROFILE_TTL_HOURS', '168')) * 3600
+app.config['STORAGE_QUOTA_BYTES'] = int(os.environ.get('STORAGE_QUOTA_MB', '2048')) * 1024 * 1024
+app.config['STORAGE_JANITOR_INTERVAL'] = int(os.environ.get('STORAGE_JANITOR_INTERVAL', '300'))
+app.config['STORAGE_DATABASE'] = os.environ.get('STORAGE_DATABASE')  # defaults to UPLOAD_FOLDER/storage.sqlite3
+# Hand profile bodies to a front proxy: 'x-accel' (nginx) or 'x-sendfile'
+app.config['FILE_SENDFILE_MODE'] = os.environ.get('FILE_SENDFILE_MODE') or None
+app.config['ACCEL_REDIRECT_PREFIX'] = os.environ.get('ACCEL_REDIRECT_PREFIX', '/protected-uploads')
+# Write profiles linearized ("fast web view"): with range requests the summary
+# page shows before a long resume has finished downloading (needs pikepdf)
+app.config['LINEARIZE_PROFILES'] = os.environ.get('LINEARIZE_PROFILES') == '1'
+# Resume limits: resumes over RESUME_MAX_PAGES are rejected with 413, or cut to
+# their first RESUME_MAX_PAGES pages with RESUME_PAGE_LIMIT_MODE=truncate.
+# RESUME_MAX_MB also applies to converted documents and bulk ZIP members.
+app.config['RESUME_MAX_PAGES'] = int(os.environ.get('RESUME_MAX_PAGES', '300'))
+app.config['RESUME_PAGE_LIMIT_MODE'] = os.environ.get('RESUME_PAGE_LIMIT_MODE', 'reject')
+app.config['RESUME_MAX_BYTES'] = int(os.environ.get('RESUME_MAX_MB', '16')) * 1024 * 1024
+# Admission control: per kind of resume (word, pdf, image), at most
+# *_CONCURRENCY builds run at once and *_QUEUE more wait up to
+# ADMISSION_WAIT_SECONDS; beyond that the form answers 503 with Retry-After.
+# Limits are per server process. Keep WORD_CONCURRENCY + WORD_QUEUE below
+# GUNICORN_THREADS so Word documents never hold every request thread.
+app.config['ADMISSION_LIMITS'] = {
+    'word': (int(os.environ.get('WORD_CONCURRENCY', '2')), int(os.environ.get('WORD_QUEUE', '2'))),
+    'pdf': (int(os.environ.get('PDF_CONCURRENCY', '4')), int(os.environ.get('PDF_QUEUE', '8'))),
+    'image': (int(os.environ.get('IMAGE_CONCURRENCY', '2')), int(os.environ.get('IMAGE_QUEUE', '2'))),
+}
+app.config['ADMISSION_WAIT_SECONDS'] = float(os.environ.get('ADMISSION_WAIT_SECONDS', '30'))
+app.config['ADMISSION_RETRY_AFTER'] = int(os.environ.get('ADMISSION_RETRY_AFTER', '10'))
+# Candidate search: finished profiles are indexed on a background thread,
+# which also reconciles with the records on disk every SEARCH_RECONCILE_INTERVAL seconds
+app.config['SEARCH_DATABASE'] = os.environ.get('SEARCH_DATABASE')  # defaults to UPLOAD_FOLDER/search.sqlite3
+app.config['SEARCH_RECONCILE_INTERVAL'] = int(os.environ.get('SEARCH_RECONCILE_INTERVAL', '300'))
+# Duplicate detection: uploads are compared with earlier profiles (same email
+# or phone, or resume text at least DUPLICATE_THRESHOLD similar) and matches
+# are flagged on the download page. With DUPLICATE_REUSE=1, or the form's
+# reuse box ticked, the earlier profile is returned instead of a new build.
+app.config['DUPLICATE_DETECTION'] = os.environ.get('DUPLICATE_DETECTION', '1') == '1'
+app.config['DUPLICATE_THRESHOLD'] = float(os.environ.get('DUPLICATE_THRESHOLD', '0.8'))
+app.config['DUPLICATE_REUSE'] = os.environ.get('DUPLICATE_REUSE') == '1'
+# Candidate packets: documents attached after the resume (certificates, offer
+# letters...), each with a bookmark unless PACKET_BOOKMARKS=0
+app.config['MAX_ATTACHMENTS'] = int(os.environ.get('MAX_ATTACHMENTS', '10'))
+app.config['PACKET_BOOKMARKS'] = os.environ.get('PACKET_BOOKMARKS', '1') == '1'
+# Bulk import: a manifest plus a ZIP of resumes, built on a process pool
+app.config['BULK_MAX_CONTENT_LENGTH'] = 512 * 1024 * 1024  # 512MB max batch upload
+app.config['BULK_WORKERS'] = int(os.environ.get('BULK_WORKERS', '0')) or None  # default: one per core
+# /metrics is open unless METRICS_TOKEN is set, then it needs "Authorization: Bearer <token>"
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+# Logged-in users can profile a submission with "X-Profile: 1" or ?profile=1;
+# PROFILE_SAMPLE_RATE additionally profiles that fraction of all submissions
+app.config['PROFILING_ENABLED'] = os.environ.get('PROFILING_ENABLED', '1') == '1'
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+
+# Pipeline events are logged as one JSON line each, carrying the session id
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'),
+                    format='%(asctime)s %(levelname)s %(name)s %(message)s')
 
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+_conversion_cache = None
+_storage = None
+_storage_lock = threading.Lock()
+_job_queue = None
+_job_queue_lock = threading.Lock()
+_admission = None
+_admission_lock = threading.Lock()
+_search_index = None
+_search_index_lock = threading.Lock()
+
+def get_storage():
+    """
+    Returns the upload folder's storage manager, starting its janitor thread
+    on first use (so it runs in each server worker, never at import time).
+    """
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            folder = app.config['UPLOAD_FOLDER']
+            _storage = StorageManager(
+                folder,
+                app.config['STORAGE_DATABASE'] or os.path.join(folder, 'storage.sqlite3'),
+                ttl=app.config['PROFILE_TTL'],
+                quota_bytes=app.config['STORAGE_QUOTA_BYTES']
+            )
+            _storage.start_janitor(app.config['STORAGE_JANITOR_INTERVAL'])
+        return _storage
+
+def get_conversion_cache():
+    """
+    Returns the shared conversion cache, or None when it is disabled.
+    """
+    global _conversion_cache
+    if not app.config['CONVERSION_CACHE_MAX_BYTES']:
+        return None
+    if _conversion_cache is None:
+        _conversion_cache = ConversionCache(
+            app.config['CONVERSION_CACHE_DIR'] or os.path.join(app.config['UPLOAD_FOLDER'], '.conversion-cache'),
+            max_bytes=app.config['CONVERSION_CACHE_MAX_BYTES']
+        )
+    return _conversion_cache
+
+def get_search_index():
+    """
+    Returns the candidate search index, starting its indexing thread on
+    first use.
+    """
+    global _search_index
+    with _search_index_lock:
+        if _search_index is None:
+            folder = app.config['UPLOAD_FOLDER']
+            _search_index = SearchIndex(
+                folder,
+                app.config['SEARCH_DATABASE'] or os.path.join(folder, 'search.sqlite3'),
+                reconcile_interval=app.config['SEARCH_RECONCILE_INTERVAL'],
+                duplicate_threshold=app.config['DUPLICATE_THRESHOLD']
+            )
+            _search_index.start()
+        return _search_index
+
+def find_duplicates(form_data, resume, filename):
+    """
+    Earlier profiles (still on disk) that are likely the same candidate as
+    this upload, best match first.
+    """
+    fingerprint = Fingerprint.from_profile(form_data, upload_text(resume, filename))
+    folder = app.config['UPLOAD_FOLDER']
+    return [match for match in get_search_index().duplicates.find(fingerprint)
+            if os.path.exists(os.path.join(folder, profile_name(match['session_id'])))]
+
+def get_admission():
+    """
+    Returns the process-wide admission control for profile builds.
+    """
+    global _admission
+    with _admission_lock:
+        if _admission is None:
+            _admission = Admission(app.config['ADMISSION_LIMITS'],
+                                   wait_timeout=app.config['ADMISSION_WAIT_SECONDS'])
+        return _admission
+
+def get_job_queue():
+    """
+    Returns the background job queue, creating it (and re-queuing jobs left
+    over from a previous run) on first use.
+    """
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            db_path = app.config['JOB_DATABASE'] or os.path.join(app.config['UPLOAD_FOLDER'], 'jobs.sqlite3')
+            _job_queue = JobQueue(
+                JobStore(db_path),
+                app.config['UPLOAD_FOLDER'],
+                workers=app.config['JOB_WORKERS'],
+                max_pending=app.config['JOB_QUEUE_LIMIT'],
+                cache=get_conversion_cache(),
+                storage=get_storage(),
+                linearize=app.config['LINEARIZE_PROFILES'],
+                limits=resume_limits(),
+                admission=get_admission(),
+                search=get_search_index()
+            )
+            _job_queue.recover()
+        return _job_queue
+
+def file_url(filename):
+    """
+    Link to a generated file, versioned by its content so it can be cached.
+    """
+    return url_for('serve_file', filename=filename, v=file_version(app.config['UPLOAD_FOLDER'], filename))
+
+def resume_limits():
+    return ResumeLimits(
+        max_pages=app.config['RESUME_MAX_PAGES'] or None,
+        max_bytes=app.config['RESUME_MAX_BYTES'] or None,
+        truncate=app.config['RESUME_PAGE_LIMIT_MODE'] == 'truncate'
+    )
+
+def uploaded_attachments():
+    """
+    The request's ``attachments`` files as ``(stream, filename)`` pairs in
+    upload order, and an error message when they cannot be accepted.
+    """
+    files = [f for f in request.files.getlist('attachments') if f.filename]
+    if len(files) > app.config['MAX_ATTACHMENTS']:
+        return [], f"At most {app.config['MAX_ATTACHMENTS']} attachments can be added"
+    unsupported = [f.filename for f in files if input_type(f.filename) == 'other']
+    if unsupported:
+        return [], f"Unsupported attachment format: {', '.join(unsupported)}"
+    return [(f.stream, f.filename) for f in files], None
+
+def wants_json():
+    return request.accept_mimetypes.best == 'application/json'
+
 @app.route('/')
 def index():
     return redirect(url_for('login'))
@@ -35,85 +253,336 @@ def form():
         return redirect(url_for('login'))
     
     if request.method == 'POST':
+        session_id = None
         try:
             # 1. Collect Form Data
-            form_data = {
-                'candidate_name': request.form.get('candidate_name'),
-                'department': request.form.get('department'),
-                'phone': request.form.get('phone'),
-                'email': request.form.get('email'),
-                'location': request.form.get('location'),
-                'age': request.form.get('age'),
-                'education': request.form.get('education'),
-                'tech_expertise': request.form.get('tech_expertise'),
-                'industry': request.form.get('industry'),
-                'current_company': request.form.get('current_company'),
-                'product_selling': request.form.get('product_selling'),
-                'ticket_size': request.form.get('ticket_size'),
-                'sales_target': request.form.get('sales_target'),
-                'sales_achieved': request.form.get('sales_achieved'),
-                'communication': request.form.get('communication'),
-                'reason_change': request.form.get('reason_change'),
-                'total_exp': request.form.get('total_exp'),
-                'current_salary': request.form.get('current_salary'),
-                'expected_salary': request.form.get('expected_salary'),
-                'notice_period': request.form.get('notice_period'),
-                'remarks': request.form.get('remarks')
-            }
+            form_data = {field: request.form.get(field) for field in FORM_FIELDS}
 
             # 2. Handle File Upload
             if 'resume_file' not in request.files:
                 return "No file uploaded", 400
             
-            file = request.files['resume_file']
-            if file.filename == '':
+            files = [f for f in request.files.getlist('resume_file') if f.filename]
+            if not files:
                 return "No file selected", 400
+            file = files[0]
+            # Several files are the pages of a photographed resume
+            if len(files) > 1 and any(input_type(f.filename) != 'image' for f in files):
+                return "Several files can only be uploaded as images, one per resume page", 400
+            attachments, error = uploaded_attachments()
+            if error:
+                return error, 400
+
+            # Job mode: queue the work and return immediately. Multi-image
+            # resumes and packets are built right away: a job keeps a single upload.
+            if (app.config['ASYNC_JOBS'] or request.values.get('async') == '1') and len(files) == 1 \
+                    and not attachments:
+                try:
+                    job_id = get_job_queue().submit(form_data, file.stream, file.filename)
+                except QueueFull as e:
+                    return str(e), 503, {'Retry-After': '30'}
+                if wants_json():
+                    return jsonify(job_id=job_id, status_url=url_for('job_status', job_id=job_id)), 202
+                return redirect(url_for('download_job', job_id=job_id))
 
             # Generate unique session ID for filenames
             session_id = str(uuid.uuid4())
-            filename = secure_filename(file.filename)
-            upload_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{session_id}_{filename}")
-            file.save(upload_path)
+            trace = PipelineTrace(file.filename, session_id=session_id)
 
-            # 3. Generate Summary PDF
-            summary_pdf_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{session_id}_summary.pdf")
-            generate_summary_pdf(form_data, summary_pdf_path)
-
-            # 4. Convert Uploaded Resume to PDF
-            converted_pdf_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{session_id}_converted.pdf")
+            # 3. Build the profile in memory (summary, conversion, merge).
+            # Only the final PDF is written, or nothing when streamed back.
+            final_pdf_name = profile_name(session_id)
+            stream_back = request.args.get('stream') == '1'
+            if stream_back:
+                output = io.BytesIO()
+            else:
+                output = os.path.join(app.config['UPLOAD_FOLDER'], final_pdf_name)
+            profile = app.config['PROFILING_ENABLED'] and wants_profile(request, app.config['PROFILE_SAMPLE_RATE'])
+            stats_name = None
+            duplicates = []
+            reuse = None
             try:
-                convert_to_pdf(upload_path, converted_pdf_path)
+                with get_admission().admit([file.filename] + [name for _, name in attachments]), \
+                        JOBS_IN_FLIGHT.track(mode='sync'):
+                    with trace.stage('save'):
+                        # PDFs are merged straight from the (spooled) upload
+                        if len(files) > 1:
+                            resume = [f.read() for f in files]
+                        elif file.filename.lower().endswith('.pdf'):
+                            resume = file.stream
+                        else:
+                            resume = file.read()
+                    if app.config['DUPLICATE_DETECTION']:
+                        with trace.stage('fingerprint'):
+                            duplicates = find_duplicates(form_data, resume, file.filename)
+                    if duplicates and (app.config['DUPLICATE_REUSE'] or request.form.get('reuse_duplicate') == '1'):
+                        reuse = duplicates[0]['session_id']
+                    else:
+                        with profiled(profile, app.config['UPLOAD_FOLDER'], session_id) as stats_name:
+                            info = build_profile(form_data, resume, file.filename, output,
+                                                 cache=get_conversion_cache(), trace=trace,
+                                                 linearize=app.config['LINEARIZE_PROFILES'],
+                                                 limits=resume_limits(), attachments=attachments,
+                                                 outline=bool(attachments) and app.config['PACKET_BOOKMARKS'])
+            except Busy as e:
+                return f"{e}. (reference {session_id})", 503, {'Retry-After': str(app.config['ADMISSION_RETRY_AFTER'])}
+            except DocumentTooLarge as e:
+                return f"{e}. (reference {session_id})", 413
             except RuntimeError as e:
-                return f"Error converting file: {str(e)}. Please try uploading a PDF.", 500
-
-            # 5. Merge PDFs
-            final_pdf_name = f"TalentWrap_Profile_{session_id}.pdf"
-            final_pdf_path = os.path.join(app.config['UPLOAD_FOLDER'], final_pdf_name)
-            merge_pdfs(summary_pdf_path, converted_pdf_path, final_pdf_path)
+                return f"Error converting file: {str(e)}. Please try uploading a PDF. (reference {session_id})", 500
+            finally:
+                if stats_name:
+                    get_storage().register(stats_name)
 
-            # Cleanup temp files (optional, keeping final one)
-            # os.remove(upload_path)
-            # os.remove(summary_pdf_path)
-            # os.remove(converted_pdf_path)
+            if reuse:
+                # The candidate already has a profile: hand that one out
+                log_event('profile_reused', session_id=session_id, duplicate_of=reuse,
+                          reasons=duplicates[0]['reasons'], stages_ms={
+                              stage: round(seconds * 1000, 1) for stage, seconds in trace.timings.items()})
+                existing = profile_name(reuse)
+                if stream_back:
+                    response = send_file(os.path.join(app.config['UPLOAD_FOLDER'], existing),
+                                         mimetype='application/pdf', as_attachment=True, download_name=existing)
+                else:
+                    response = redirect(url_for('download', filename=existing))
+                response.headers['X-Duplicate-Of'] = reuse
+                return response
 
-            return redirect(url_for('download', filename=final_pdf_name))
+            info['possible_duplicates'] = duplicates
+            if stream_back:
+                output.seek(0)
+                response = send_file(output, mimetype='application/pdf', as_attachment=True,
+                                     download_name=final_pdf_name)
+            else:
+                # Keep what the edit flow needs to re-render just the summary
+                save_profile_record(app.config['UPLOAD_FOLDER'], session_id, form_data, info)
+                get_storage().merge_succeeded(session_id, final_pdf_name, record_name(session_id))
+                get_search_index().enqueue(session_id)
+                response = redirect(url_for('download', filename=final_pdf_name))
+            response.headers['X-Conversion-Cache'] = info['conversion_cache']
+            response.headers['X-Session-Id'] = session_id
+            if info['resume_pages_truncated']:
+                response.headers['X-Resume-Pages-Truncated'] = str(info['resume_pages_truncated'])
+            if duplicates:
+                response.headers['X-Possible-Duplicates'] = ','.join(match['session_id'] for match in duplicates)
+            if stats_name:
+                response.headers['X-Profile-Stats'] = file_url(stats_name)
+            return response
 
         except Exception as e:
+            if session_id:
+                log_event('request_failed', session_id=session_id, error=str(e) or type(e).__name__)
+                return f"An error occurred: {str(e)} (reference {session_id})", 500
             return f"An error occurred: {str(e)}", 500
         
-    return render_template('form.html')
+    return render_template('form.html', profile={})
+
+@app.route('/edit/<session_id>', methods=['GET', 'POST'])
+def edit_profile(session_id):
+    if not session.get('logged_in'):
+        return redirect(url_for('login'))
+    try:
+        uuid.UUID(session_id)
+    except ValueError:
+        abort(404)
+
+    folder = app.config['UPLOAD_FOLDER']
+    record = load_profile_record(folder, session_id)
+    if record is None:
+        abort(404)
+
+    if request.method == 'POST':
+        form_data = {field: request.form.get(field) for field in FORM_FIELDS}
+        file = request.files.get('resume_file')
+        attachments, error = uploaded_attachments()
+        if error:
+            return error, 400
+        if attachments and not (file and file.filename):
+            return "Attachments can only be replaced together with the resume", 400
+        try:
+            if file and file.filename:
+                # A new resume means a full rebuild under the same session
+                # Built next to the live profile and swapped in when done, so a
+                # download never sees a partial file and a failure leaves it intact
+                final_path = os.path.join(folder, profile_name(session_id))
+                tmp_path = f"{final_path}.{uuid.uuid4().hex}.tmp"
+                try:
+                    with get_admission().admit([file.filename] + [name for _, name in attachments]), \
+                            JOBS_IN_FLIGHT.track(mode='sync'):
+                        info = build_profile(form_data, file.stream, file.filename, tmp_path,
+                                             cache=get_conversion_cache(),
+                                             trace=PipelineTrace(file.filename, session_id=session_id),
+                                             linearize=app.config['LINEARIZE_PROFILES'],
+                                             limits=resume_limits(), attachments=attachments,
+                                             outline=bool(attachments) and app.config['PACKET_BOOKMARKS'])
+                    with profile_lock(folder, session_id):
+                        # The new resume keeps the candidate's duplicate flags
+                        current = load_profile_record(folder, session_id)
+                        if current is None:
+                            raise FileNotFoundError(f"No editable profile for session {session_id}")
+                        info['possible_duplicates'] = current.get('possible_duplicates')
+                        os.replace(tmp_path, final_path)
+                        save_profile_record(folder, session_id, form_data, info)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+            else:
+                update_profile(folder, session_id, form_data, linearize=app.config['LINEARIZE_PROFILES'])
+            get_storage().merge_succeeded(session_id, profile_name(session_id), record_name(session_id),
+                                          lock_name(session_id))
+            get_search_index().enqueue(session_id)
+        except FileNotFoundError:
+            abort(404)
+        except Busy as e:
+            return f"{e}.", 503, {'Retry-After': str(app.config['ADMISSION_RETRY_AFTER'])}
+        except DocumentTooLarge as e:
+            return f"{e}.", 413
+        except RuntimeError as e:
+            return f"Error converting file: {str(e)}. Please try uploading a PDF.", 500
+        except Exception as e:
+            return f"An error occurred: {str(e)}", 500
+        return redirect(url_for('download', filename=profile_name(session_id)))
+
+    return render_template('form.html', profile=record['form_data'], session_id=session_id)
+
+@app.route('/bulk', methods=['GET', 'POST'])
+def bulk():
+    if not session.get('logged_in'):
+        return redirect(url_for('login'))
+
+    if request.method == 'POST':
+        # Batches are much larger than a single resume
+        request.max_content_length = app.config['BULK_MAX_CONTENT_LENGTH']
+
+        manifest = request.files.get('manifest')
+        resumes = request.files.get('resumes')
+        if not manifest or manifest.filename == '' or not resumes or resumes.filename == '':
+            return "Both a manifest and a ZIP of resumes are required", 400
+
+        try:
+            rows = parse_manifest(manifest.stream, manifest.filename)
+        except ManifestError as e:
+            return f"Invalid manifest: {str(e)}", 400
+
+        # The request's files are closed once the view returns, but the
+        # response keeps reading resumes while it streams, so take a copy.
+        spool = tempfile.TemporaryFile()
+        shutil.copyfileobj(resumes.stream, spool)
+        try:
+            archive = zipfile.ZipFile(spool)
+        except zipfile.BadZipFile:
+            spool.close()
+            return "Resumes must be uploaded as a ZIP file", 400
+
+        workers = app.config['BULK_WORKERS'] or os.cpu_count() or 1
+
+        def generate():
+            try:
+                yield from stream_bulk_zip(rows, archive, get_bulk_executor(workers),
+                                           max_in_flight=2 * workers, cache=get_conversion_cache(),
+                                           limits=resume_limits(), admission=get_admission())
+            finally:
+                archive.close()
+                spool.close()
+
+        return Response(
+            generate(),
+            mimetype='application/zip',
+            headers={'Content-Disposition': 'attachment; filename=TalentWrap_Profiles.zip'}
+        )
+
+    return render_template('bulk.html')
+
+@app.route('/search')
+def search():
+    if not session.get('logged_in'):
+        return redirect(url_for('login'))
+    query = request.args.get('q', '')
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    total, hits = get_search_index().search(query, limit=limit, offset=offset)
+    for hit in hits:
+        hit['download_url'] = url_for('download', filename=profile_name(hit['session_id']))
+        hit['edit_url'] = url_for('edit_profile', session_id=hit['session_id'])
+    if wants_json():
+        return jsonify(query=query, total=total, offset=offset, results=hits)
+    return render_template('search.html', query=query, total=total, offset=offset, limit=limit, results=hits)
 
 @app.route('/download/<filename>')
 def download(filename):
     if not session.get('logged_in'):
         return redirect(url_for('login'))
-    return render_template('download.html', filename=filename)
+    session_id = None
+    duplicates = []
+    if filename.startswith('TalentWrap_Profile_') and filename.endswith('.pdf'):
+        candidate = filename[len('TalentWrap_Profile_'):-len('.pdf')]
+        record = load_profile_record(app.config['UPLOAD_FOLDER'], candidate)
+        if record is not None:
+            session_id = candidate
+            for match in record.get('possible_duplicates') or []:
+                other = load_profile_record(app.config['UPLOAD_FOLDER'], match['session_id'])
+                if other is not None:
+                    duplicates.append(dict(match, candidate_name=other['form_data'].get('candidate_name'),
+                                           url=url_for('download', filename=profile_name(match['session_id']))))
+    stats_url = None
+    if session_id and os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], profile_stats_name(session_id))):
+        stats_url = file_url(profile_stats_name(session_id))
+    return render_template('download.html', filename=filename, file_url=file_url(filename), session_id=session_id,
+                           stats_url=stats_url, duplicates=duplicates)
+
+@app.route('/download/job/<job_id>')
+def download_job(job_id):
+    if not session.get('logged_in'):
+        return redirect(url_for('login'))
+    return render_template('download.html', job_id=job_id)
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    if not session.get('logged_in'):
+        return redirect(url_for('login'))
+    status = get_job_queue().get(job_id)
+    if status is None:
+        abort(404)
+    if status['result']:
+        status['download_url'] = file_url(status['result'])
+    return jsonify(status)
 
 @app.route('/files/<filename>')
 def serve_file(filename):
     if not session.get('logged_in'):
         return redirect(url_for('login'))
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    # The upload folder also holds records, uploads and databases
+    if not servable(filename):
+        abort(404)
+    response = send_profile(
+        request, app.config['UPLOAD_FOLDER'], filename,
+        sendfile_mode=app.config['FILE_SENDFILE_MODE'],
+        accel_prefix=app.config['ACCEL_REDIRECT_PREFIX']
+    )
+    get_storage().touch(filename)
+    return response
+
+@app.route('/healthz')
+def healthz():
+    # Liveness only: answers as soon as the process serves requests
+    return jsonify(status='ok')
+
+@app.route('/ready')
+def ready():
+    # Not ready until the PDF stack is loaded; without a pre-forking server
+    # (which warms up before forking) the first probe starts the warm-up.
+    if is_ready():
+        return jsonify(status='ready')
+    warm_up_in_background()
+    return jsonify(status='warming up'), 503, {'Retry-After': '1'}
+
+@app.route('/metrics')
+def metrics():
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f"Bearer {token}":
+        abort(401)
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
+    warm_up()
     app.run(debug=True, host='0.0.0.0')
@@ -0,0 +1,98 @@
+"""
+Time-to-first-page of generated profiles, plain vs linearized.
+
+A viewer streaming a plain PDF needs the cross-reference table at its end
+before it can draw anything, so the first page appears once the whole file
+has arrived. A linearized PDF puts the first page's objects up front; the
+linearization dictionary's /E entry is where that section ends. Time to
+first page is modelled as one round trip plus the bytes needed over the
+link:
+
+    python -m benchmarks.bench_first_page
+    python -m benchmarks.bench_first_page --pages 1 10 50 --mbps 2 --rtt-ms 100
+
+Merge times include writing, so the "linearize" column is the extra cost of
+the linearized output.
+"""
+import argparse
+import io
+import re
+import sys
+import time
+
+import pikepdf
+
+from benchmarks.bench_pipeline import SHORT_DATA, make_resume_pdf
+
+
+def first_page_bytes(data):
+    """
+    Bytes a streaming viewer needs before it can show page one.
+    """
+    match = re.search(rb'/Linearized\b.*?/E\s+(\d+)', data[:2048], re.S)
+    return int(match.group(1)) if match else len(data)
+
+
+def merge_timed(summary, resume, linearize, repeat):
+    from utils.pdf_generator import merge_pdfs
+    times = []
+    output = b''
+    for _ in range(repeat):
+        buffer = io.BytesIO()
+        started = time.perf_counter()
+        merge_pdfs(io.BytesIO(summary), io.BytesIO(resume), buffer, linearize=linearize)
+        times.append(time.perf_counter() - started)
+        output = buffer.getvalue()
+    return output, min(times)
+
+
+def run(pages, repeat=3):
+    from utils.pdf_generator import generate_summary_pdf, get_overlay_page
+    summary = io.BytesIO()
+    generate_summary_pdf(SHORT_DATA, summary)
+    get_overlay_page()
+    resume = make_resume_pdf(pages)
+
+    plain, plain_s = merge_timed(summary.getvalue(), resume, False, repeat)
+    linear, linear_s = merge_timed(summary.getvalue(), resume, True, repeat)
+    with pikepdf.open(io.BytesIO(linear)) as pdf:
+        if not (pdf.is_linearized and pdf.check_linearization(io.StringIO())):
+            raise RuntimeError(f"{pages}-page profile is not correctly linearized")
+    return {
+        'pages': pages,
+        'plain_bytes': len(plain),
+        'linear_bytes': len(linear),
+        'plain_first_page': first_page_bytes(plain),
+        'linear_first_page': first_page_bytes(linear),
+        'plain_merge_s': plain_s,
+        'linear_merge_s': linear_s,
+    }
+
+
+def time_to_first_page(nbytes, mbps, rtt_ms):
+    return rtt_ms / 1000 + nbytes * 8 / (mbps * 1_000_000)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, nargs='*', default=[1, 10, 50], help="resume lengths (default 1 10 50)")
+    parser.add_argument('--mbps', type=float, default=2.0, help="modelled link speed in Mbit/s (default 2)")
+    parser.add_argument('--rtt-ms', type=float, default=100.0, help="modelled round trip in ms (default 100)")
+    parser.add_argument('--repeat', type=int, default=3, help="timed merges per variant (default 3)")
+    args = parser.parse_args(argv)
+
+    print(f"{'pages':>5}{'size':>10}{'linear':>10}{'1st page':>10}{'linear':>10}"
+          f"{'TTFP':>9}{'linear':>9}{'linearize':>11}")
+    for pages in args.pages:
+        r = run(pages, args.repeat)
+        ttfp_plain = time_to_first_page(r['plain_first_page'], args.mbps, args.rtt_ms)
+        ttfp_linear = time_to_first_page(r['linear_first_page'], args.mbps, args.rtt_ms)
+        print(f"{pages:>5}{r['plain_bytes'] / 1024:>8.1f}KB{r['linear_bytes'] / 1024:>8.1f}KB"
+              f"{r['plain_first_page'] / 1024:>8.1f}KB{r['linear_first_page'] / 1024:>8.1f}KB"
+              f"{ttfp_plain * 1000:>7.0f}ms{ttfp_linear * 1000:>7.0f}ms"
+              f"{(r['linear_merge_s'] - r['plain_merge_s']) * 1000:>+9.1f}ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
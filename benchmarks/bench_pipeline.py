@@ -0,0 +1,267 @@
+"""
+Offline benchmarks for the PDF pipeline.
+
+Every case runs in a fresh process so peak RSS is attributable to it. Inputs
+are synthetic (reportlab / Pillow) and built before timing starts.
+
+    python -m benchmarks.bench_pipeline                      # run everything
+    python -m benchmarks.bench_pipeline --cases merge        # name filter
+    python -m benchmarks.bench_pipeline --save benchmarks/baseline.json
+    python -m benchmarks.bench_pipeline --compare benchmarks/baseline.json --threshold 0.25
+
+With --compare the exit status is 1 when any case's median wall time or
+peak RSS regresses by more than the threshold.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import platform
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+LONG_TEXT = ("Consistently exceeded quarterly enterprise sales targets across three regions, "
+             "managing a pipeline of strategic accounts and mentoring a team of inside sales reps. ") * 12
+
+SHORT_DATA = {
+    'candidate_name': 'Jane Doe',
+    'department': 'Enterprise Sales',
+    'phone': '9876543210',
+    'email': 'jane@example.com',
+    'location': 'Pune',
+    'age': '31',
+    'education': 'MBA',
+    'industry': 'SaaS',
+    'current_company': 'Acme Corp',
+    'communication': 'Excellent',
+    'reason_change': 'Growth',
+    'total_exp': '8 years',
+    'current_salary': '1,20,000',
+    'expected_salary': '1,50,000',
+    'notice_period': '30 days',
+}
+
+LONG_DATA = dict(SHORT_DATA, tech_expertise=LONG_TEXT, product_selling=LONG_TEXT,
+                 reason_change=LONG_TEXT, remarks=LONG_TEXT)
+
+
+def make_resume_pdf(pages):
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    for page in range(pages):
+        c.setFont("Helvetica-Bold", 16)
+        c.drawString(72, 780, f"Experience - page {page + 1}")
+        c.setFont("Helvetica", 10)
+        for line in range(55):
+            c.drawString(72, 750 - line * 12, f"{line + 1:02d}. Led account planning and closed strategic deals.")
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def make_photo(fmt, size=(4032, 3024)):
+    """
+    Phone-camera sized image; noise keeps it from compressing unrealistically well.
+    """
+    from PIL import Image
+    channels = [Image.effect_noise(size, 40 + 10 * i) for i in range(3)]
+    image = Image.merge('RGB', channels)
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, quality=90) if fmt == 'JPEG' else image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def make_scanned_pdf(pages, size=(1240, 1754)):
+    """
+    Portfolio of scanned pages: one distinct JPEG per page, like a scanner
+    produces.
+    """
+    import img2pdf
+    from PIL import Image, ImageDraw, ImageFilter
+    base = Image.effect_noise(size, 10).convert('L').filter(ImageFilter.GaussianBlur(1))
+    images = []
+    for page in range(pages):
+        image = base.copy()
+        ImageDraw.Draw(image).text((100, 100), f"Portfolio page {page + 1}", fill=0)
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=75)
+        images.append(buffer.getvalue())
+    return img2pdf.convert(images)
+
+
+def _summary_case(data):
+    def setup():
+        return data
+
+    def run(data):
+        from utils.pdf_generator import generate_summary_pdf
+        output = io.BytesIO()
+        generate_summary_pdf(data, output)
+        return output.getvalue()
+    return setup, run
+
+
+def _convert_case(make_input, filename):
+    def setup():
+        return make_input()
+
+    def run(data):
+        from utils.pdf_generator import convert_to_pdf
+        output = io.BytesIO()
+        convert_to_pdf(data, output, filename=filename)
+        return output.getvalue()
+    return setup, run
+
+
+def _images_case(count):
+    def setup():
+        return [make_photo('JPEG') for _ in range(count)]
+
+    def run(images):
+        from utils.pdf_generator import convert_images_to_pdf
+        output = io.BytesIO()
+        convert_images_to_pdf(images, output)
+        return output.getvalue()
+    return setup, run
+
+
+def _merge_case(pages, make_resume=make_resume_pdf):
+    def setup():
+        from utils.pdf_generator import generate_summary_pdf, get_overlay_page
+        summary = io.BytesIO()
+        generate_summary_pdf(SHORT_DATA, summary)
+        get_overlay_page()  # steady state: the overlay is built once per process
+        return summary.getvalue(), make_resume(pages)
+
+    def run(inputs):
+        from utils.pdf_generator import merge_pdfs
+        summary, resume = inputs
+        output = io.BytesIO()
+        merge_pdfs(io.BytesIO(summary), io.BytesIO(resume), output)
+        return output.getvalue()
+    return setup, run
+
+
+def _packet_case():
+    def setup():
+        from utils.pdf_generator import get_overlay_page
+        get_overlay_page()
+        return make_resume_pdf(10), [(make_photo('JPEG'), f'certificate_{i}.jpg') for i in range(3)]
+
+    def run(inputs):
+        from utils.pipeline import build_profile
+        resume, photos = inputs
+        output = io.BytesIO()
+        build_profile(SHORT_DATA, resume, 'resume.pdf', output, attachments=photos, outline=True)
+        return output.getvalue()
+    return setup, run
+
+
+CASES = {
+    'summary_short': lambda: _summary_case(SHORT_DATA),
+    'summary_long': lambda: _summary_case(LONG_DATA),
+    'convert_pdf_1p': lambda: _convert_case(lambda: make_resume_pdf(1), 'resume.pdf'),
+    'convert_pdf_10p': lambda: _convert_case(lambda: make_resume_pdf(10), 'resume.pdf'),
+    'convert_pdf_100p': lambda: _convert_case(lambda: make_resume_pdf(100), 'resume.pdf'),
+    'convert_jpeg_12mp': lambda: _convert_case(lambda: make_photo('JPEG'), 'photo.jpg'),
+    'convert_png_12mp': lambda: _convert_case(lambda: make_photo('PNG'), 'photo.png'),
+    'convert_jpeg_12mp_x4': lambda: _images_case(4),
+    'merge_1p': lambda: _merge_case(1),
+    'merge_10p': lambda: _merge_case(10),
+    'merge_100p': lambda: _merge_case(100),
+    'merge_scanned_200p': lambda: _merge_case(200, make_scanned_pdf),
+    'packet_pdf_10p_jpeg_x3': _packet_case,
+}
+
+
+def run_case(name, repeat):
+    """
+    Runs one case in the current (fresh) process.
+    """
+    setup, run = CASES[name]()
+    inputs = setup()
+    run(inputs)  # warm-up: imports, font registration, caches
+    times = []
+    output = b''
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = run(inputs)
+        times.append(time.perf_counter() - started)
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+    return {
+        'median_s': statistics.median(times),
+        'min_s': min(times),
+        'peak_rss_mb': round(peak_rss_mb, 1),
+        'output_bytes': len(output),
+    }
+
+
+def run_isolated(name, repeat):
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(run_case, name, repeat).result()
+
+
+def compare(results, baseline, threshold):
+    """
+    Returns a list of regression messages (empty when within the threshold).
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get('cases', {}).get(name)
+        if not before:
+            continue
+        for metric in ('median_s', 'peak_rss_mb'):
+            if before[metric] and result[metric] > before[metric] * (1 + threshold):
+                change = (result[metric] / before[metric] - 1) * 100
+                regressions.append(f"{name}: {metric} {before[metric]:.4g} -> {result[metric]:.4g} (+{change:.0f}%)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', nargs='*', help="only run cases whose name contains one of these")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per case (default 3)")
+    parser.add_argument('--save', metavar='PATH', help="write results as a JSON baseline")
+    parser.add_argument('--compare', metavar='PATH', help="compare against a JSON baseline")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="allowed relative regression for --compare (default 0.25)")
+    args = parser.parse_args(argv)
+
+    names = [name for name in CASES if not args.cases or any(f in name for f in args.cases)]
+    results = {}
+    print(f"{'case':<22}{'median':>10}{'min':>10}{'peak RSS':>12}{'output':>12}")
+    for name in names:
+        result = run_isolated(name, args.repeat)
+        results[name] = result
+        print(f"{name:<22}{result['median_s'] * 1000:>8.1f}ms{result['min_s'] * 1000:>8.1f}ms"
+              f"{result['peak_rss_mb']:>10.1f}MB{result['output_bytes'] / 1024:>10.1f}KB")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'cases': results},
+                      f, indent=2)
+        print(f"Baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold:.0%}:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
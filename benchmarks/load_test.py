@@ -0,0 +1,526 @@
+"""
+Load test: concurrent recruiters submitting profiles to a local server.
+
+Starts the app (gunicorn when installed, else Flask's threaded server) in a
+scratch directory, logs in once per simulated recruiter and has them submit
+a shuffled mix of PDF, phone-photo and Word resumes through /form as fast as
+the server answers. Inputs are synthetic and generated before timing starts;
+each one is distinct, so the conversion cache and duplicate detection see
+realistic traffic. When ``soffice`` is not on PATH, Word documents are
+converted by benchmarks/soffice_stub.py, which burns a core for
+``--stub-seconds`` like a real conversion would.
+
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --concurrency 8 --requests 200 --mix pdf=5,image=3,docx=2
+    python -m benchmarks.load_test --server gunicorn --workers 2 --threads 8 \\
+        --env WORD_CONCURRENCY=3 --env PDF_QUEUE=16 --json results.json
+
+Reports throughput, end-to-end latency per input type, p50/p95/p99 per
+pipeline stage, error rates (503s from admission control are counted
+separately) and the server's memory across the run. Stage timings are read
+from the server's ``profile_built`` log lines rather than /metrics, which
+only covers the worker process that happens to answer the scrape.
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import random
+import shutil
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+
+from benchmarks.bench_pipeline import LONG_TEXT, make_photo
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KINDS = {'pdf': 'resume.pdf', 'image': 'photo.jpg', 'docx': 'resume.docx'}
+STAGES = ['save', 'fingerprint', 'summary', 'convert', 'merge']
+WORDS = LONG_TEXT.split()
+
+DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="word/document.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    '</Relationships>'
+)
+DOCX_DOCUMENT = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>{body}</w:body>'
+    '</w:document>'
+)
+
+
+def resume_lines(rng, count):
+    return [' '.join(rng.choice(WORDS) for _ in range(12)) for _ in range(count)]
+
+
+def make_resume_pdf(rng, pages):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    for page in range(pages):
+        c.setFont("Helvetica", 10)
+        for line, text in enumerate(resume_lines(rng, 55)):
+            c.drawString(72, 780 - line * 13, text)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def make_docx(rng, paragraphs=60):
+    body = ''.join(f'<w:p><w:r><w:t>{escape(text)}</w:t></w:r></w:p>' for text in resume_lines(rng, paragraphs))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('[Content_Types].xml', DOCX_CONTENT_TYPES)
+        z.writestr('_rels/.rels', DOCX_RELS)
+        z.writestr('word/document.xml', DOCX_DOCUMENT.format(body=body))
+    return buffer.getvalue()
+
+
+def tag_jpeg(data, text):
+    """
+    Adds a JPEG comment, so otherwise identical photos are distinct uploads.
+    """
+    comment = text.encode()
+    return data[:2] + b'\xff\xfe' + (len(comment) + 2).to_bytes(2, 'big') + comment + data[2:]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        if kind not in KINDS:
+            raise argparse.ArgumentTypeError(f"unknown input type {kind!r} (use {', '.join(KINDS)})")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def build_plan(args):
+    """
+    The submissions to make, in order: (index, kind, filename, data).
+    """
+    rng = random.Random(args.seed)
+    kinds = rng.choices(list(args.mix), weights=list(args.mix.values()), k=args.requests)
+    low, _, high = args.pages.partition('-')
+    photos = [make_photo('JPEG', args.photo_size) for _ in range(min(kinds.count('image'), 4))]
+    plan = []
+    for index, kind in enumerate(kinds):
+        if kind == 'pdf':
+            data = make_resume_pdf(rng, rng.randint(int(low), int(high or low)))
+        elif kind == 'image':
+            data = tag_jpeg(photos[index % len(photos)], f"load test {args.seed} {index}")
+        else:
+            data = make_docx(rng)
+        plan.append((index, kind, KINDS[kind], data))
+    return plan
+
+
+def multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, filename, data in files:
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                   'Content-Type: application/octet-stream\r\n\r\n'.encode())
+        body.write(data)
+        body.write(b'\r\n')
+    body.write(f'--{boundary}--\r\n'.encode())
+    return body.getvalue(), f'multipart/form-data; boundary={boundary}'
+
+
+class Recruiter:
+    """
+    One logged-in browser session, on its own keep-alive connection.
+    """
+
+    def __init__(self, port, password, timeout):
+        self.port = port
+        self.timeout = timeout
+        self.conn = None
+        self.cookie = None
+        self._request('POST', '/login', f'password={password}'.encode(),
+                      {'Content-Type': 'application/x-www-form-urlencoded'})
+        if not self.cookie:
+            raise RuntimeError("login failed: no session cookie")
+
+    def _request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body, headers)
+                response = self.conn.getresponse()
+                response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle keep-alive connection
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        return response
+
+    def submit(self, index, filename, data):
+        fields = {
+            'candidate_name': f'Load Test {index}',
+            'email': f'load.test.{index}@example.com',
+            'phone': f'9{index:09d}',
+            'department': 'Enterprise Sales',
+            'location': 'Pune',
+        }
+        body, content_type = multipart(fields, [('resume_file', filename, data)])
+        return self._request('POST', '/form', body, {'Content-Type': content_type})
+
+
+class Server:
+    """
+    The app under test, started in a scratch directory. Its log is read on a
+    thread: ``profile_built`` / ``profile_failed`` events are collected and
+    the last lines are kept for error reports.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.port = args.port or free_port()
+        self.workdir = tempfile.mkdtemp(prefix='talentwrap-load-')
+        # The overlay logo is read relative to the working directory
+        os.symlink(os.path.join(REPO, 'static'), os.path.join(self.workdir, 'static'))
+        self.events = []
+        self.failures = []
+        self.tail = []
+        self.stub = None
+        self.process = None
+        self._reader = None
+
+    def environment(self):
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [REPO, env.get('PYTHONPATH')]))
+        env.update(PORT=str(self.port), WEB_CONCURRENCY=str(self.args.workers),
+                   GUNICORN_THREADS=str(self.args.threads), LOG_LEVEL='INFO')
+        if self.args.stub_soffice or not shutil.which('soffice'):
+            bin_dir = os.path.join(self.workdir, 'bin')
+            os.mkdir(bin_dir)
+            self.stub = os.path.join(bin_dir, 'soffice')
+            with open(self.stub, 'w') as f:
+                f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.join(REPO, "benchmarks", "soffice_stub.py")}" "$@"\n')
+            os.chmod(self.stub, os.stat(self.stub).st_mode | stat.S_IEXEC)
+            env['PATH'] = bin_dir + os.pathsep + env.get('PATH', '')
+            env['SOFFICE_POOL_SIZE'] = '0'  # the stub has no UNO listener
+            env['SOFFICE_STUB_SECONDS'] = str(self.args.stub_seconds)
+        for item in self.args.env:
+            name, _, value = item.partition('=')
+            env[name] = value
+        return env
+
+    def command(self):
+        kind = self.args.server
+        if kind == 'auto':
+            kind = 'gunicorn' if has_module('gunicorn') else 'flask'
+        self.kind = kind
+        if kind == 'gunicorn':
+            return [sys.executable, '-m', 'gunicorn', '-c', os.path.join(REPO, 'gunicorn.conf.py'), 'app:app']
+        return [sys.executable, '-c',
+                "from app import app; from utils.warmup import warm_up; warm_up(); "
+                f"app.run(host='127.0.0.1', port={self.port}, threaded=True)"]
+
+    def start(self, timeout=60):
+        self.process = subprocess.Popen(self.command(), cwd=self.workdir, env=self.environment(),
+                                        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        self._reader = threading.Thread(target=self._read_log, daemon=True)
+        self._reader.start()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("server exited during start-up:\n" + '\n'.join(self.tail))
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=2)
+                conn.request('GET', '/ready')
+                if conn.getresponse().status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError("server did not become ready in time:\n" + '\n'.join(self.tail))
+
+    def _read_log(self):
+        for line in self.process.stdout:
+            self.tail = (self.tail + [line.rstrip()])[-20:]
+            start = line.find('{"event"')
+            if start < 0:
+                continue
+            try:
+                event = json.loads(line[start:])
+            except ValueError:
+                continue
+            if event['event'] == 'profile_built':
+                self.events.append(event)
+            elif event['event'] == 'profile_failed':
+                self.failures.append(event)
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self._reader is not None:
+            self._reader.join(timeout=5)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def has_module(name):
+    import importlib.util
+    return importlib.util.find_spec(name) is not None
+
+
+def process_tree_rss(pid):
+    """
+    Resident memory in bytes of ``pid`` and all its descendants (gunicorn's
+    workers, soffice), or None where /proc is not available.
+    """
+    parents = {}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return None
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; fields resume after ')'
+                fields = f.read().rsplit(')', 1)[1].split()
+            parents[int(entry)] = int(fields[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    tree = {pid}
+    added = True
+    while added:
+        children = {child for child, parent in parents.items() if parent in tree and child not in tree}
+        tree |= children
+        added = bool(children)
+    total = 0
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    for member in tree:
+        try:
+            with open(f'/proc/{member}/statm') as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+
+class MemorySampler:
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = process_tree_rss(self.pid)
+            if rss is not None:
+                self.samples.append(rss)
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        rss = process_tree_rss(self.pid)
+        if rss is not None:
+            self.samples.append(rss)
+
+
+def percentile(values, q):
+    """
+    Nearest-rank percentile of ``values`` (None when empty).
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def latency_summary(values_ms):
+    return {f'p{q}': percentile(values_ms, q) for q in (50, 95, 99)} | {'count': len(values_ms)}
+
+
+def run(args):
+    print(f"Generating {args.requests} inputs...", flush=True)
+    plan = build_plan(args)
+    server = Server(args)
+    try:
+        server.start()
+        print(f"{server.kind} server ready on port {server.port}"
+              f"{' (soffice stub)' if server.stub else ''}", flush=True)
+        sampler = MemorySampler(server.process.pid)
+        sampler.start()
+        lock = threading.Lock()
+        queue = list(reversed(plan))
+        results = []
+
+        def recruiter():
+            client = Recruiter(server.port, args.password, args.timeout)
+            while True:
+                with lock:
+                    if not queue:
+                        return
+                    index, kind, filename, data = queue.pop()
+                started = time.perf_counter()
+                try:
+                    status = client.submit(index, filename, data).status
+                except OSError as e:
+                    status = None
+                    client.conn = None
+                    print(f"request {index} failed: {e}", file=sys.stderr)
+                results.append({'kind': kind, 'status': status, 'ms': (time.perf_counter() - started) * 1000})
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for future in [pool.submit(recruiter) for _ in range(args.concurrency)]:
+                future.result()
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+        time.sleep(0.5)  # let the last log lines arrive
+    finally:
+        server.stop()
+    return report(args, server, results, elapsed, sampler.samples)
+
+
+def report(args, server, results, elapsed, rss):
+    ok = [r for r in results if r['status'] in (200, 302)]
+    busy = [r for r in results if r['status'] == 503]
+    by_kind = {}
+    for kind in args.mix:
+        mine = [r for r in results if r['kind'] == kind]
+        done = [r['ms'] for r in mine if r['status'] in (200, 302)]
+        by_kind[kind] = dict(latency_summary(done), requests=len(mine),
+                             rejected=sum(r['status'] == 503 for r in mine),
+                             errors=sum(r['status'] not in (200, 302, 503) for r in mine))
+    stages = {}
+    for stage in STAGES + ['total']:
+        values = [event['total_ms'] if stage == 'total' else event['stages_ms'].get(stage)
+                  for event in server.events]
+        values = [value for value in values if value is not None]
+        if values:
+            stages[stage] = dict(latency_summary(values),
+                                 failures=sum(f.get('stage') == stage for f in server.failures))
+    summary = {
+        'server': server.kind,
+        'soffice_stub': bool(server.stub),
+        'concurrency': args.concurrency,
+        'requests': len(results),
+        'elapsed_s': round(elapsed, 2),
+        'throughput_per_s': round(len(ok) / elapsed, 3) if elapsed else None,
+        'error_rate': round((len(results) - len(ok) - len(busy)) / len(results), 4) if results else None,
+        'rejected_rate': round(len(busy) / len(results), 4) if results else None,
+        'by_input_type': by_kind,
+        'stages_ms': stages,
+        'rss_mb': {
+            'start': round(rss[0] / 2 ** 20, 1),
+            'peak': round(max(rss) / 2 ** 20, 1),
+            'end': round(rss[-1] / 2 ** 20, 1),
+            'growth': round((rss[-1] - rss[0]) / 2 ** 20, 1),
+        } if rss else None,
+    }
+
+    print(f"\n{summary['requests']} submissions in {summary['elapsed_s']}s at concurrency {args.concurrency}: "
+          f"{summary['throughput_per_s']} profiles/s, {summary['error_rate']:.1%} errors, "
+          f"{summary['rejected_rate']:.1%} rejected (503)")
+
+    def row(name, values, extra=''):
+        cells = ''.join(f"{values[p]:>10.0f}" if values[p] is not None else f"{'-':>10}" for p in ('p50', 'p95', 'p99'))
+        print(f"{name:<14}{values['count']:>7}{cells}{extra}")
+
+    print(f"\n{'input type':<14}{'ok':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'503':>7}{'errors':>8}")
+    for kind, values in by_kind.items():
+        row(kind, values, f"{values['rejected']:>7}{values['errors']:>8}")
+    print(f"\n{'stage':<14}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'failed':>8}")
+    for stage, values in stages.items():
+        row(stage, values, f"{values['failures']:>8}")
+    if summary['rss_mb']:
+        memory = summary['rss_mb']
+        print(f"\nServer RSS: {memory['start']}MB at start, {memory['peak']}MB peak, "
+              f"{memory['end']}MB at end ({memory['growth']:+}MB)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Results saved to {args.json}")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=4, help="simultaneous recruiters (default 4)")
+    parser.add_argument('--requests', type=int, default=60, help="submissions in total (default 60)")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('pdf=5,image=3,docx=2'),
+                        help="relative share of each input type (default pdf=5,image=3,docx=2)")
+    parser.add_argument('--pages', default='1-5', help="page range of PDF resumes (default 1-5)")
+    parser.add_argument('--photo-size', type=lambda s: tuple(int(v) for v in s.split('x')), default=(4032, 3024),
+                        help="pixel size of photographed resumes (default 4032x3024)")
+    parser.add_argument('--server', choices=['auto', 'gunicorn', 'flask'], default='auto',
+                        help="how to run the app (default: gunicorn when installed)")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn workers (default 2)")
+    parser.add_argument('--threads', type=int, default=8, help="gunicorn threads per worker (default 8)")
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE',
+                        help="extra server setting, e.g. --env WORD_CONCURRENCY=4 (repeatable)")
+    parser.add_argument('--stub-soffice', action='store_true',
+                        help="convert Word documents with the stub even when soffice is installed")
+    parser.add_argument('--stub-seconds', type=float, default=2.0,
+                        help="CPU time the soffice stub spends per document (default 2)")
+    parser.add_argument('--password', default=os.environ.get('APP_PASSWORD', 'admin'))
+    parser.add_argument('--port', type=int, help="server port (default: a free one)")
+    parser.add_argument('--timeout', type=float, default=300, help="per-request timeout in seconds (default 300)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', metavar='PATH', help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    summary = run(args)
+    return 0 if summary['requests'] and summary['error_rate'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Stand-in for ``soffice --headless --convert-to pdf`` when LibreOffice is not
+installed, so Word uploads can be load-tested anywhere.
+
+It accepts the same command line as the one-shot conversion in
+pdf_generator, keeps one core busy for ``SOFFICE_STUB_SECONDS`` (default 2,
+roughly a cold soffice start plus a short document) and writes a PDF with the
+document's text. benchmarks.load_test puts it on PATH as ``soffice``.
+"""
+import os
+import re
+import sys
+import time
+import zipfile
+
+
+def document_text(path):
+    try:
+        with zipfile.ZipFile(path) as z:
+            xml = z.read('word/document.xml').decode('utf-8', 'replace')
+    except (zipfile.BadZipFile, KeyError):
+        return ["(converted by soffice_stub)"]
+    return [re.sub(r'<[^<]+>', '', paragraph) for paragraph in xml.split('</w:p>')[:-1]]
+
+
+def write_pdf(lines, output):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    c = canvas.Canvas(output, pagesize=A4)
+    y = 780
+    for line in lines:
+        if y < 72:
+            c.showPage()
+            y = 780
+        c.drawString(72, y, line[:100])
+        y -= 14
+    c.save()
+
+
+def main(argv):
+    if '--convert-to' not in argv or '--outdir' not in argv:
+        print("soffice_stub only supports --convert-to pdf ... --outdir DIR", file=sys.stderr)
+        return 1
+    out_dir = argv[argv.index('--outdir') + 1]
+    inputs = [arg for arg in argv if not arg.startswith('-') and arg not in ('pdf', out_dir)]
+
+    deadline = time.monotonic() + float(os.environ.get('SOFFICE_STUB_SECONDS', '2'))
+    while time.monotonic() < deadline:
+        sum(i * i for i in range(10_000))
+
+    for path in inputs:
+        base = os.path.splitext(os.path.basename(path))[0]
+        write_pdf(document_text(path), os.path.join(out_dir, base + '.pdf'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
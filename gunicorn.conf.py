@@ -0,0 +1,23 @@
+"""
+Gunicorn settings: gunicorn -c gunicorn.conf.py app:app
+
+The app is loaded and warmed up once in the master, then forked, so workers
+start with fonts, styles and the overlay already in (shared) memory.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '7860')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+# Enough threads that Word documents (see ADMISSION_LIMITS in app.py) never
+# hold all of them
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+# Conversions of long documents can take a while
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '180'))
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before workers fork.
+    # Warm-up starts no threads or processes, so nothing is lost in the fork.
+    from utils.warmup import warm_up
+    warm_up()
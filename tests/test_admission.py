@@ -0,0 +1,94 @@
+import unittest
+import threading
+import time
+from utils.admission import Admission, Busy, Gate, conversion_kind
+from utils.metrics import ADMISSION_REJECTED
+
+
+class GateTestCase(unittest.TestCase):
+    def test_full_queue_rejected_at_once(self):
+        gate = Gate('word', capacity=1, max_waiting=0)
+        gate.acquire()
+        before = ADMISSION_REJECTED.value(kind='word')
+        started = time.monotonic()
+        with self.assertRaises(Busy):
+            gate.acquire()
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(ADMISSION_REJECTED.value(kind='word'), before + 1)
+
+    def test_wait_times_out(self):
+        gate = Gate('pdf', capacity=1, max_waiting=1, wait_timeout=0.1)
+        gate.acquire()
+        with self.assertRaises(Busy):
+            gate.acquire()
+        self.assertEqual(gate.waiting, 0)
+
+    def test_waiter_admitted_on_release(self):
+        gate = Gate('pdf', capacity=1, max_waiting=1, wait_timeout=5)
+        gate.acquire()
+        admitted = threading.Event()
+
+        def wait():
+            gate.acquire()
+            admitted.set()
+
+        thread = threading.Thread(target=wait)
+        thread.start()
+        time.sleep(0.05)
+        self.assertFalse(admitted.is_set())
+        gate.release()
+        thread.join(5)
+        self.assertTrue(admitted.is_set())
+        self.assertEqual(gate.active, 1)
+
+    def test_unbounded_wait_ignores_queue_limit(self):
+        gate = Gate('word', capacity=1, max_waiting=0, wait_timeout=0)
+        gate.acquire()
+        threading.Timer(0.05, gate.release).start()
+        gate.acquire(bounded=False)
+        self.assertEqual(gate.active, 1)
+
+    def test_background_waiters_leave_queue_free(self):
+        gate = Gate('word', capacity=1, max_waiting=1, wait_timeout=0.1)
+        gate.acquire()
+        background = threading.Thread(target=gate.acquire, kwargs={'bounded': False}, daemon=True)
+        background.start()
+        time.sleep(0.05)
+        # The queued job does not take the one place left for a request
+        started = time.monotonic()
+        with self.assertRaisesRegex(Busy, 'Timed out'):
+            gate.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+        self.assertEqual(gate.waiting, 0)
+        gate.release()
+        background.join(5)
+        self.assertEqual(gate.active, 1)
+        self.assertEqual(gate.waiting_unbounded, 0)
+
+
+class AdmissionTestCase(unittest.TestCase):
+    def test_kinds_have_their_own_capacity(self):
+        admission = Admission({'word': (1, 0), 'pdf': (1, 0), 'image': (1, 0)})
+        with admission.admit('cv.docx'):
+            with self.assertRaises(Busy), admission.admit('other.doc'):
+                pass
+            with admission.admit('cv.pdf'), admission.admit('scan.jpg'):
+                pass
+        with admission.admit('cv.docx'):
+            pass
+
+    def test_conversion_kind(self):
+        self.assertEqual(conversion_kind('CV.DOCX'), 'word')
+        self.assertEqual(conversion_kind('cv.doc'), 'word')
+        self.assertEqual(conversion_kind('scan.png'), 'image')
+        self.assertEqual(conversion_kind('cv.pdf'), 'pdf')
+        self.assertEqual(conversion_kind('cv.txt'), 'pdf')
+
+    def test_packet_uses_costliest_kind(self):
+        self.assertEqual(conversion_kind(['cv.pdf', 'scan.jpg']), 'image')
+        self.assertEqual(conversion_kind(['cv.pdf', 'scan.jpg', 'offer.docx']), 'word')
+        self.assertEqual(conversion_kind(['cv.pdf', 'offer.pdf']), 'pdf')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,23 @@
 import unittest
 import os
 import io
+import pstats
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import zipfile
+from unittest import mock
+from PIL import Image
+from pypdf import PdfReader
+from reportlab.pdfgen import canvas
 from app import app
+from utils.admission import Admission
+from utils.warmup import warm_up
+
+MINIMAL_PDF = b'%PDF-1.0\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj 2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj 3 0 obj<</Type/Page/MediaBox[0 0 3 3]>>endobj\nxref\n0 4\n0000000000 65535 f\n0000000010 00000 n\n0000000060 00000 n\n0000000111 00000 n\ntrailer<</Size 4/Root 1 0 R>>\nstartxref\n178\n%%EOF'
 
 class TalentWrapTestCase(unittest.TestCase):
     def setUp(self):
@@ -9,13 +25,22 @@ class TalentWrapTestCase(unittest.TestCase):
         app.config['WTF_CSRF_ENABLED'] = False
         app.config['UPLOAD_FOLDER'] = 'tests/uploads'
         os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+        # A fresh conversion cache per test, so no test sees another's hits
+        self.cache_dir = tempfile.mkdtemp()
+        app.config['CONVERSION_CACHE_DIR'] = self.cache_dir
+        sys.modules['app']._conversion_cache = None
         self.app = app.test_client()
 
     def tearDown(self):
+        # Let the search indexer finish with the files before they go
+        if sys.modules['app']._search_index is not None:
+            sys.modules['app']._search_index.wait_idle()
         # Cleanup uploaded files in tests/uploads
         for f in os.listdir(app.config['UPLOAD_FOLDER']):
             os.remove(os.path.join(app.config['UPLOAD_FOLDER'], f))
         os.rmdir(app.config['UPLOAD_FOLDER'])
+        sys.modules['app']._conversion_cache = None
+        shutil.rmtree(self.cache_dir)
 
     def login(self, password):
         return self.app.post('/login', data=dict(
@@ -77,5 +102,393 @@ class TalentWrapTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'Ready to Download', response.data)
 
+        # Only the final profile (and its edit record) is written;
+        # intermediates stay in memory
+        files = [f for f in os.listdir(app.config['UPLOAD_FOLDER']) if '.sqlite3' not in f]
+        self.assertEqual(len(files), 2)
+        self.assertEqual(sum(f.startswith('TalentWrap_Profile_') for f in files), 1)
+        self.assertEqual(sum(f.endswith('_form.json') for f in files), 1)
+
+    def test_conversion_cache_defaults_to_upload_folder(self):
+        app.config['CONVERSION_CACHE_DIR'] = None
+        cache = sys.modules['app'].get_conversion_cache()
+        self.assertEqual(cache.directory, os.path.join(app.config['UPLOAD_FOLDER'], '.conversion-cache'))
+        shutil.rmtree(cache.directory)
+
+    def test_form_submission_streamed(self):
+        self.login('admin')
+        data = {
+            'candidate_name': 'Test User',
+            'resume_file': (io.BytesIO(MINIMAL_PDF), 'test_resume.pdf'),
+        }
+        response = self.app.post('/form?stream=1', data=data, content_type='multipart/form-data')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/pdf')
+        self.assertTrue(response.data.startswith(b'%PDF'))
+        self.assertEqual(os.listdir(app.config['UPLOAD_FOLDER']), [])
+
+    def test_async_form_submission(self):
+        self.login('admin')
+        data = {
+            'candidate_name': 'Test User',
+            'async': '1',
+            'resume_file': (io.BytesIO(MINIMAL_PDF), 'test_resume.pdf'),
+        }
+        response = self.app.post('/form', data=data, content_type='multipart/form-data',
+                                 headers={'Accept': 'application/json'})
+        self.assertEqual(response.status_code, 202)
+        status_url = response.get_json()['status_url']
+
+        for _ in range(200):
+            status = self.app.get(status_url).get_json()
+            if status['status'] in ('done', 'failed'):
+                break
+            time.sleep(0.05)
+        self.assertEqual(status['status'], 'done')
+        response = self.app.get(status['download_url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data.startswith(b'%PDF'))
+
+    def test_job_status_unknown(self):
+        self.login('admin')
+        response = self.app.get('/jobs/does-not-exist')
+        self.assertEqual(response.status_code, 404)
+
+    def test_bulk_import(self):
+        self.login('admin')
+        resumes = io.BytesIO()
+        with zipfile.ZipFile(resumes, 'w') as z:
+            z.writestr('jane.pdf', MINIMAL_PDF)
+        resumes.seek(0)
+        manifest = b"candidate_name,resume_file\nJane,jane.pdf\nJohn,john.pdf\n"
+        data = {
+            'manifest': (io.BytesIO(manifest), 'batch.csv'),
+            'resumes': (resumes, 'resumes.zip'),
+        }
+        response = self.app.post('/bulk', data=data, content_type='multipart/form-data')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/zip')
+        result = zipfile.ZipFile(io.BytesIO(response.data))
+        self.assertIn('TalentWrap_Profile_0001_Jane.pdf', result.namelist())
+        self.assertIn('"failed": 1', result.read('manifest.json').decode())
+
+    def test_bulk_rejects_bad_manifest(self):
+        self.login('admin')
+        data = {
+            'manifest': (io.BytesIO(b'x'), 'batch.txt'),
+            'resumes': (io.BytesIO(b'not a zip'), 'resumes.zip'),
+        }
+        response = self.app.post('/bulk', data=data, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 400)
+
+    def test_edit_profile(self):
+        self.login('admin')
+        data = {
+            'candidate_name': 'Test User',
+            'current_salary': '50000',
+            'resume_file': (io.BytesIO(MINIMAL_PDF), 'test_resume.pdf'),
+        }
+        response = self.app.post('/form', data=data, content_type='multipart/form-data')
+        filename = response.location.rsplit('/', 1)[-1]
+        session_id = filename[len('TalentWrap_Profile_'):-len('.pdf')]
+
+        response = self.app.get(f'/edit/{session_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'value="50000"', response.data)
+
+        response = self.app.post(f'/edit/{session_id}', data={'candidate_name': 'Test User', 'current_salary': '65000'},
+                                 content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(filename, response.location)
+        text = PdfReader(os.path.join(app.config['UPLOAD_FOLDER'], filename)).pages[0].extract_text()
+        self.assertIn('65000', text)
+
+    def test_failed_resume_replacement_keeps_profile(self):
+        self.login('admin')
+        data = {
+            'candidate_name': 'Test User',
+            'resume_file': (io.BytesIO(MINIMAL_PDF), 'test_resume.pdf'),
+        }
+        response = self.app.post('/form', data=data, content_type='multipart/form-data')
+        filename = response.location.rsplit('/', 1)[-1]
+        session_id = filename[len('TalentWrap_Profile_'):-len('.pdf')]
+        path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        with open(path, 'rb') as f:
+            original = f.read()
+
+        def failing_merge(summary, resume, output, **kwargs):
+            with open(output, 'wb') as f:
+                f.write(b'%PDF-1.7 partial')
+            raise RuntimeError('merge failed')
+
+        with mock.patch('utils.pdf_generator.merge_pdfs', side_effect=failing_merge):
+            response = self.app.post(f'/edit/{session_id}', data={
+                'candidate_name': 'Test User',
+                'resume_file': (io.BytesIO(MINIMAL_PDF), 'new_resume.pdf'),
+            }, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 500)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), original)
+        self.assertFalse(any(f.endswith('.tmp') for f in os.listdir(app.config['UPLOAD_FOLDER'])))
+
+    def test_edit_unknown_profile(self):
+        self.login('admin')
+        response = self.app.get(f'/edit/{uuid.uuid4()}')
+        self.assertEqual(response.status_code, 404)
+
+    def generate_profile(self):
+        self.login('admin')
+        data = {
+            'candidate_name': 'Test User',
+            'resume_file': (io.BytesIO(MINIMAL_PDF), 'test_resume.pdf'),
+        }
+        response = self.app.post('/form', data=data, content_type='multipart/form-data')
+        filename = response.location.rsplit('/', 1)[-1]
+        page = self.app.get(f'/download/{filename}').data.decode()
+        link = page[page.index('/files/'):].split('"', 1)[0].replace('&amp;', '&')
+        return filename, link
+
+    def test_serve_file_caching(self):
+        filename, link = self.generate_profile()
+        self.assertIn('?v=', link)
+
+        response = self.app.get(link)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertIn('private', response.headers['Cache-Control'])
+        etag = response.headers['ETag']
+        self.assertFalse(etag.startswith('W/'))
+
+        response = self.app.get(link, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        # Unversioned links must always revalidate
+        response = self.app.get(f'/files/{filename}')
+        self.assertIn('no-cache', response.headers['Cache-Control'])
+        self.assertEqual(response.headers['ETag'], etag)
+
+    def test_serve_file_range(self):
+        filename, link = self.generate_profile()
+        response = self.app.get(link, headers={'Range': 'bytes=0-99'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(len(response.data), 100)
+        self.assertTrue(response.data.startswith(b'%PDF'))
+
+    def test_serve_file_only_serves_profiles(self):
+        filename, link = self.generate_profile()
+        session_id = filename[len('TalentWrap_Profile_'):-len('.pdf')]
+        sys.modules['app'].get_search_index().wait_idle()
+        for name in ('search.sqlite3', f'{session_id}_form.json'):
+            self.assertTrue(os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], name)))
+            self.assertEqual(self.app.get(f'/files/{name}').status_code, 404)
+
+    def test_serve_file_x_accel(self):
+        filename, link = self.generate_profile()
+        app.config['FILE_SENDFILE_MODE'] = 'x-accel'
+        try:
+            response = self.app.get(link)
+        finally:
+            app.config['FILE_SENDFILE_MODE'] = None
+        self.assertEqual(response.headers['X-Accel-Redirect'], f'/protected-uploads/{filename}')
+        self.assertEqual(response.data, b'')
+        self.assertIn('ETag', response.headers)
+
+    def test_profiled_submission(self):
+        self.login('admin')
+        data = {
+            'candidate_name': 'Test User',
+            'resume_file': (io.BytesIO(MINIMAL_PDF), 'test_resume.pdf'),
+        }
+        response = self.app.post('/form', data=data, content_type='multipart/form-data',
+                                 headers={'X-Profile': '1'})
+        self.assertEqual(response.status_code, 302)
+        session_id = response.headers['X-Session-Id']
+        stats_link = response.headers['X-Profile-Stats']
+        self.assertIn(f'{session_id}_profile.pstats', stats_link)
+
+        stats = self.app.get(stats_link)
+        self.assertEqual(stats.status_code, 200)
+        path = os.path.join(app.config['UPLOAD_FOLDER'], f'{session_id}_profile.pstats')
+        functions = {func[2] for func in pstats.Stats(path).stats}
+        # PDF uploads are passed through, so there is no convert_to_pdf call
+        self.assertTrue({'build_profile', 'generate_summary_pdf', 'merge_pdfs'} <= functions)
+
+        page = self.app.get(response.location).data.decode()
+        self.assertIn('Download Profiling Stats', page)
+
+    def test_overlapping_profiled_submission_runs_unprofiled(self):
+        self.login('admin')
+        data = {
+            'candidate_name': 'Test User',
+            'resume_file': (io.BytesIO(MINIMAL_PDF), 'test_resume.pdf'),
+        }
+        # Another build is being profiled
+        with sys.modules['utils.profiling']._profiling:
+            response = self.app.post('/form', data=data, content_type='multipart/form-data',
+                                     headers={'X-Profile': '1'})
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn('X-Profile-Stats', response.headers)
+        session_id = response.headers['X-Session-Id']
+        self.assertFalse(os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], f'{session_id}_profile.pstats')))
+
+    def test_resume_over_page_limit(self):
+        self.login('admin')
+        app.config['RESUME_MAX_PAGES'] = 1
+        try:
+            buffer = io.BytesIO()
+            c = canvas.Canvas(buffer)
+            c.showPage()
+            c.showPage()
+            c.save()
+            data = {'candidate_name': 'Long', 'resume_file': (io.BytesIO(buffer.getvalue()), 'portfolio.pdf')}
+            response = self.app.post('/form', data=data, content_type='multipart/form-data')
+            self.assertEqual(response.status_code, 413)
+            self.assertIn(b'limit is 1', response.data)
+
+            app.config['RESUME_PAGE_LIMIT_MODE'] = 'truncate'
+            data = {'candidate_name': 'Long', 'resume_file': (io.BytesIO(buffer.getvalue()), 'portfolio.pdf')}
+            response = self.app.post('/form', data=data, content_type='multipart/form-data')
+            self.assertEqual(response.status_code, 302)
+            self.assertEqual(response.headers['X-Resume-Pages-Truncated'], '1')
+        finally:
+            app.config['RESUME_MAX_PAGES'] = 300
+            app.config['RESUME_PAGE_LIMIT_MODE'] = 'reject'
+
+    def test_multi_image_submission(self):
+        self.login('admin')
+        pages = []
+        for color in ('white', 'gray'):
+            buffer = io.BytesIO()
+            Image.new('RGB', (300, 400), color).save(buffer, format='JPEG')
+            pages.append((io.BytesIO(buffer.getvalue()), f'page_{color}.jpg'))
+        data = {'candidate_name': 'Photo', 'resume_file': pages}
+        response = self.app.post('/form?stream=1', data=data, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(PdfReader(io.BytesIO(response.data)).pages), 3)
+
+        data = {'candidate_name': 'Mixed', 'resume_file': [(io.BytesIO(MINIMAL_PDF), 'resume.pdf'),
+                                                           (io.BytesIO(buffer.getvalue()), 'page.jpg')]}
+        response = self.app.post('/form', data=data, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 400)
+
+    def test_packet_submission(self):
+        self.login('admin')
+        letter = io.BytesIO()
+        c = canvas.Canvas(letter)
+        c.drawString(72, 750, "Offer letter")
+        c.save()
+        image = io.BytesIO()
+        Image.new('RGB', (200, 300), 'white').save(image, format='PNG')
+        data = {
+            'candidate_name': 'Test User',
+            'resume_file': (io.BytesIO(MINIMAL_PDF), 'test_resume.pdf'),
+            'attachments': [(io.BytesIO(image.getvalue()), 'certificate.png'),
+                            (io.BytesIO(letter.getvalue()), 'offer.pdf')],
+        }
+        response = self.app.post('/form?stream=1', data=data, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        reader = PdfReader(io.BytesIO(response.data))
+        self.assertEqual(len(reader.pages), 4)
+        self.assertEqual([item.title for item in reader.outline], ['Summary', 'Resume', 'certificate.png', 'offer.pdf'])
+
+        data['resume_file'] = (io.BytesIO(MINIMAL_PDF), 'test_resume.pdf')
+        data['attachments'] = [(io.BytesIO(b'notes'), 'notes.txt')]
+        response = self.app.post('/form', data=data, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 400)
+
+    def test_busy_returns_503(self):
+        self.login('admin')
+        full = Admission({'word': (0, 0), 'pdf': (0, 0), 'image': (0, 0)})
+        with mock.patch.object(sys.modules['app'], '_admission', full):
+            data = {'candidate_name': 'Busy', 'resume_file': (io.BytesIO(MINIMAL_PDF), 'resume.pdf')}
+            response = self.app.post('/form', data=data, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], str(app.config['ADMISSION_RETRY_AFTER']))
+
+    def test_search(self):
+        filename, link = self.generate_profile()
+        sys.modules['app'].get_search_index().wait_idle()
+        response = self.app.get('/search?q=name:test', headers={'Accept': 'application/json'})
+        self.assertEqual(response.status_code, 200)
+        results = response.get_json()['results']
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results[0]['download_url'].endswith(filename))
+        self.assertIn(b'Test User', self.app.get('/search?q=test').data)
+
+    def test_duplicate_candidate(self):
+        self.login('admin')
+
+        def submit(**extra):
+            data = dict(candidate_name='Test User', email='Test@Example.com',
+                        resume_file=(io.BytesIO(MINIMAL_PDF), 'test_resume.pdf'), **extra)
+            return self.app.post('/form', data=data, content_type='multipart/form-data')
+
+        first = submit().location.rsplit('/', 1)[-1]
+        original = first[len('TalentWrap_Profile_'):-len('.pdf')]
+        sys.modules['app'].get_search_index().wait_idle()
+
+        response = submit()
+        self.assertEqual(response.headers['X-Possible-Duplicates'], original)
+        page = self.app.get(response.location).data
+        self.assertIn(b'Possibly the same candidate', page)
+        self.assertIn(first.encode(), page)
+
+        # Replacing the resume keeps the flag
+        duplicate = response.headers['X-Session-Id']
+        response = self.app.post(f'/edit/{duplicate}', data={
+            'candidate_name': 'Test User', 'email': 'Test@Example.com',
+            'resume_file': (io.BytesIO(MINIMAL_PDF), 'new_resume.pdf'),
+        }, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(b'Possibly the same candidate', self.app.get(response.location).data)
+
+        def profiles():
+            return [f for f in os.listdir(app.config['UPLOAD_FOLDER']) if f.startswith('TalentWrap_Profile_')]
+
+        count = len(profiles())
+        sys.modules['app'].get_search_index().wait_idle()
+        response = submit(reuse_duplicate='1')
+        self.assertEqual(response.headers['X-Duplicate-Of'], original)
+        self.assertTrue(response.location.endswith(first))
+        self.assertEqual(len(profiles()), count)
+
+    def test_unprofiled_submission(self):
+        filename, link = self.generate_profile()
+        files = os.listdir(app.config['UPLOAD_FOLDER'])
+        self.assertFalse(any(f.endswith('.pstats') for f in files))
+
+    def test_import_does_not_load_pdf_stack(self):
+        code = "import sys, app; print(any(m in sys.modules for m in ('reportlab', 'pypdf', 'img2pdf')))"
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), 'False')
+
+    def test_health_and_readiness(self):
+        self.assertEqual(self.app.get('/healthz').status_code, 200)
+        warm_up()
+        response = self.app.get('/ready')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['status'], 'ready')
+
+    def test_metrics(self):
+        self.login('admin')
+        self.generate_profile()
+        response = self.app.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        text = response.get_data(as_text=True)
+        for stage in ('save', 'summary', 'convert', 'merge'):
+            self.assertIn(f'talentwrap_stage_duration_seconds_count{{stage="{stage}",input_type="pdf",pages="1"}}', text)
+        self.assertIn('talentwrap_jobs_in_flight{mode="sync"} 0', text)
+
+    def test_metrics_token(self):
+        app.config['METRICS_TOKEN'] = 'secret'
+        try:
+            self.assertEqual(self.app.get('/metrics').status_code, 401)
+            response = self.app.get('/metrics', headers={'Authorization': 'Bearer secret'})
+            self.assertEqual(response.status_code, 200)
+        finally:
+            app.config['METRICS_TOKEN'] = None
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,169 @@
+import unittest
+import io
+import json
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from reportlab.pdfgen import canvas
+from utils import bulk
+from utils.admission import Admission
+from utils.limits import ResumeLimits
+from utils.metrics import JOBS_IN_FLIGHT
+from utils.bulk import ManifestError, parse_manifest, stream_bulk_zip
+
+
+def make_pdf_bytes():
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer)
+    c.drawString(100, 750, "Resume")
+    c.save()
+    return buffer.getvalue()
+
+
+def make_resumes_zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as z:
+        for name, data in files.items():
+            z.writestr(name, data)
+    buffer.seek(0)
+    return zipfile.ZipFile(buffer)
+
+
+class ParseManifestTestCase(unittest.TestCase):
+    def test_csv(self):
+        data = b"candidate_name,email,resume_file\nJane,jane@example.com,jane.pdf\nJohn,,john.docx\n"
+        rows = parse_manifest(io.BytesIO(data), 'batch.csv')
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['resume_file'], 'jane.pdf')
+
+    def test_jsonl(self):
+        data = b'{"candidate_name": "Jane", "resume_file": "jane.pdf"}\n\n{"candidate_name": "John"}\n'
+        rows = parse_manifest(io.BytesIO(data), 'batch.jsonl')
+        self.assertEqual([row['candidate_name'] for row in rows], ['Jane', 'John'])
+
+    def test_invalid_jsonl(self):
+        with self.assertRaises(ManifestError):
+            parse_manifest(io.BytesIO(b'{"candidate_name": \n'), 'batch.jsonl')
+
+    def test_unsupported_format(self):
+        with self.assertRaises(ManifestError):
+            parse_manifest(io.BytesIO(b'data'), 'batch.xlsx')
+
+
+class StreamBulkZipTestCase(unittest.TestCase):
+    def test_failures_are_reported_without_aborting(self):
+        rows = [
+            {'candidate_name': 'Jane Doe', 'resume_file': 'jane.pdf'},
+            {'candidate_name': 'Missing', 'resume_file': 'nobody.pdf'},
+            {'candidate_name': 'Broken', 'resume_file': 'broken.txt'},
+            {'candidate_name': 'John', 'resume_file': 'resumes/JOHN.PDF'},
+        ]
+        resumes = make_resumes_zip({
+            'jane.pdf': make_pdf_bytes(),
+            'broken.txt': b'plain text',
+            'resumes/john.pdf': make_pdf_bytes(),
+        })
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            data = b''.join(stream_bulk_zip(rows, resumes, executor, max_in_flight=2))
+
+        result = zipfile.ZipFile(io.BytesIO(data))
+        manifest = json.loads(result.read('manifest.json'))
+        self.assertEqual(manifest['total'], 4)
+        self.assertEqual(manifest['succeeded'], 2)
+        self.assertEqual([row['status'] for row in manifest['rows']], ['ok', 'failed', 'failed', 'ok'])
+        self.assertIn('not found', manifest['rows'][1]['error'])
+        self.assertIn('Unsupported file format', manifest['rows'][2]['error'])
+        profiles = [name for name in result.namelist() if name.startswith('TalentWrap_Profile_')]
+        self.assertEqual(sorted(profiles), [
+            'TalentWrap_Profile_0001_Jane_Doe.pdf',
+            'TalentWrap_Profile_0004_John.pdf',
+        ])
+
+    def test_oversized_member_fails_row(self):
+        rows = [
+            {'candidate_name': 'Jane Doe', 'resume_file': 'jane.pdf'},
+            {'candidate_name': 'Huge', 'resume_file': 'huge.pdf'},
+        ]
+        resumes = make_resumes_zip({'jane.pdf': make_pdf_bytes(), 'huge.pdf': b'%PDF' + b'0' * 200000})
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            data = b''.join(stream_bulk_zip(rows, resumes, executor, max_in_flight=2,
+                                            limits=ResumeLimits(max_bytes=100000)))
+
+        manifest = json.loads(zipfile.ZipFile(io.BytesIO(data)).read('manifest.json'))
+        self.assertEqual([row['status'] for row in manifest['rows']], ['ok', 'failed'])
+        self.assertIn('limit', manifest['rows'][1]['error'])
+
+    def test_unreadable_member_fails_row(self):
+        rows = [
+            {'candidate_name': 'Corrupt', 'resume_file': 'corrupt.pdf'},
+            {'candidate_name': 'Jane Doe', 'resume_file': 'jane.pdf'},
+        ]
+        pdf = make_pdf_bytes()
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as z:
+            z.writestr('corrupt.pdf', pdf)
+            z.writestr('jane.pdf', pdf)
+        # Flip a byte of the first member's data so its CRC no longer matches
+        data = bytearray(buffer.getvalue())
+        data[zipfile.sizeFileHeader + len('corrupt.pdf') + 10] ^= 0xFF
+        resumes = zipfile.ZipFile(io.BytesIO(bytes(data)))
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            data = b''.join(stream_bulk_zip(rows, resumes, executor, max_in_flight=2))
+
+        manifest = json.loads(zipfile.ZipFile(io.BytesIO(data)).read('manifest.json'))
+        self.assertEqual([row['status'] for row in manifest['rows']], ['failed', 'ok'])
+        self.assertIn('Cannot read', manifest['rows'][0]['error'])
+
+    def test_rows_share_admission_slots(self):
+        rows = [{'candidate_name': f'Candidate {i}', 'resume_file': 'jane.pdf'} for i in range(4)]
+        resumes = make_resumes_zip({'jane.pdf': make_pdf_bytes()})
+        admission = Admission({'word': (1, 0), 'pdf': (1, 0), 'image': (1, 0)})
+        running, overlap = [0], [0]
+        lock = threading.Lock()
+        build_row = bulk._build_row
+
+        def tracked_build_row(*args):
+            with lock:
+                running[0] += 1
+                overlap[0] = max(overlap[0], running[0])
+            time.sleep(0.05)
+            try:
+                return build_row(*args)
+            finally:
+                with lock:
+                    running[0] -= 1
+
+        with mock.patch.object(bulk, '_build_row', tracked_build_row), \
+                ThreadPoolExecutor(max_workers=4) as executor:
+            data = b''.join(stream_bulk_zip(rows, resumes, executor, max_in_flight=4, admission=admission))
+
+        manifest = json.loads(zipfile.ZipFile(io.BytesIO(data)).read('manifest.json'))
+        self.assertEqual(manifest['succeeded'], 4)
+        self.assertEqual(overlap[0], 1)
+        self.assertEqual(admission.gates['pdf'].active, 0)
+
+    def test_disconnect_cancels_pending_rows(self):
+        rows = [{'candidate_name': f'Candidate {i}', 'resume_file': 'jane.pdf'} for i in range(6)]
+        resumes = make_resumes_zip({'jane.pdf': make_pdf_bytes()})
+        built = []
+        build_row = bulk._build_row
+
+        def slow_build_row(*args):
+            built.append(args[2])
+            time.sleep(0.05)
+            return build_row(*args)
+
+        in_flight = JOBS_IN_FLIGHT.value(mode='bulk')
+        with mock.patch.object(bulk, '_build_row', slow_build_row), \
+                ThreadPoolExecutor(max_workers=1) as executor:
+            stream = stream_bulk_zip(rows, resumes, executor, max_in_flight=4)
+            next(stream)
+            stream.close()
+        self.assertEqual(JOBS_IN_FLIGHT.value(mode='bulk'), in_flight)
+        self.assertLess(len(built), len(rows))
+
+
+if __name__ == '__main__':
+    unittest.main()
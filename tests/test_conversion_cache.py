@@ -0,0 +1,86 @@
+import unittest
+import io
+import os
+import time
+import shutil
+import tempfile
+from unittest import mock
+from PIL import Image
+from reportlab.pdfgen import canvas
+from utils.conversion_cache import ConversionCache
+from utils.pipeline import build_profile
+
+
+def make_png_bytes():
+    buffer = io.BytesIO()
+    Image.new('RGB', (200, 300), 'white').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class ConversionCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_get_after_put(self):
+        cache = ConversionCache(self.tmp)
+        key = cache.key(b'resume bytes', '.docx')
+        self.assertIsNone(cache.get(key))
+        cache.put(key, b'%PDF converted')
+        self.assertEqual(cache.get(key), b'%PDF converted')
+
+    def test_key_depends_on_content_and_format(self):
+        cache = ConversionCache(self.tmp)
+        self.assertNotEqual(cache.key(b'a', '.docx'), cache.key(b'b', '.docx'))
+        self.assertNotEqual(cache.key(b'a', '.docx'), cache.key(b'a', '.png'))
+
+    def test_image_key_depends_on_image_settings(self):
+        cache = ConversionCache(self.tmp)
+        with mock.patch.dict(os.environ, {'IMAGE_DPI': '200', 'IMAGE_QUALITY': '85'}):
+            png, docx = cache.key(b'a', '.png'), cache.key(b'a', '.docx')
+        with mock.patch.dict(os.environ, {'IMAGE_DPI': '150', 'IMAGE_QUALITY': '85'}):
+            self.assertNotEqual(cache.key(b'a', '.png'), png)
+            self.assertEqual(cache.key(b'a', '.docx'), docx)
+        with mock.patch.dict(os.environ, {'IMAGE_DPI': '200', 'IMAGE_QUALITY': '70'}):
+            self.assertNotEqual(cache.key(b'a', '.PNG'), png)
+
+    def test_least_recently_used_evicted(self):
+        cache = ConversionCache(self.tmp, max_bytes=250)
+        keys = [cache.key(bytes([i]), '.png') for i in range(3)]
+        for i, key in enumerate(keys[:2]):
+            cache.put(key, b'x' * 100)
+            os.utime(cache._path(key), (time.time() - 100 + i, time.time() - 100 + i))
+        cache.get(keys[0])  # refreshes the oldest entry
+        cache.put(keys[2], b'x' * 100)
+
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNotNone(cache.get(keys[2]))
+        self.assertLessEqual(cache.size(), 250)
+
+    def test_pipeline_skips_conversion_on_hit(self):
+        cache = ConversionCache(self.tmp)
+        image = make_png_bytes()
+        first = build_profile({'candidate_name': 'Jane'}, image, 'scan.png', io.BytesIO(), cache=cache)
+        with mock.patch('utils.pdf_generator.convert_to_pdf') as convert:
+            second = build_profile({'candidate_name': 'Jane'}, image, 'scan.png', io.BytesIO(), cache=cache)
+        convert.assert_not_called()
+        self.assertEqual(first['conversion_cache'], 'miss')
+        self.assertEqual(second['conversion_cache'], 'hit')
+
+    def test_pdf_uploads_bypass_cache(self):
+        cache = ConversionCache(self.tmp)
+        output = io.BytesIO()
+        resume = io.BytesIO()
+        c = canvas.Canvas(resume)
+        c.drawString(100, 750, "Resume")
+        c.save()
+        info = build_profile({}, resume.getvalue(), 'resume.pdf', output, cache=cache)
+        self.assertEqual(info['conversion_cache'], 'skip')
+        self.assertEqual(cache.size(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from reportlab.pdfgen import canvas
+from utils.fingerprint import (DuplicateIndex, Fingerprint, normalize_email, normalize_phone, signature,
+                               similarity, upload_text)
+
+RESUME = " ".join(
+    f"Led enterprise account {i} to renewal, grew pipeline by {i * 3} percent and mentored {i % 7} reps."
+    for i in range(60)
+)
+
+
+def revised(text, every=60):
+    words = text.split()
+    return " ".join("updated" if i % every == 0 else word for i, word in enumerate(words))
+
+
+class SignatureTestCase(unittest.TestCase):
+    def test_similar_texts_score_high(self):
+        self.assertGreaterEqual(similarity(signature(RESUME), signature(revised(RESUME))), 0.8)
+        self.assertEqual(similarity(signature(RESUME), signature(RESUME.upper())), 1.0)
+
+    def test_unrelated_texts_score_low(self):
+        other = " ".join(f"Designed turbine blade {i} using finite element method {i * 2}" for i in range(60))
+        self.assertLess(similarity(signature(RESUME), signature(other)), 0.1)
+
+    def test_short_text_has_no_signature(self):
+        self.assertIsNone(signature("Jane Doe"))
+        self.assertEqual(len(signature("one two three four five six")), 64)
+
+    def test_contact_normalization(self):
+        self.assertEqual(normalize_phone('+91 98765-43210'), '9876543210')
+        self.assertIsNone(normalize_phone('n/a'))
+        self.assertEqual(normalize_email(' Jane@Example.COM '), 'jane@example.com')
+        self.assertIsNone(normalize_email('none'))
+
+
+class UploadTextTestCase(unittest.TestCase):
+    def test_pdf_text_layer(self):
+        buffer = io.BytesIO()
+        c = canvas.Canvas(buffer)
+        c.drawString(72, 750, "Enterprise account executive")
+        c.save()
+        stream = io.BytesIO(buffer.getvalue())
+        self.assertIn("Enterprise account executive", upload_text(stream, 'cv.pdf'))
+        self.assertEqual(stream.tell(), 0)
+
+    def test_docx_body(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as z:
+            z.writestr('word/document.xml', '<w:document><w:p><w:r><w:t>Sales</w:t></w:r></w:p>'
+                                            '<w:p><w:r><w:t>lead</w:t></w:r></w:p></w:document>')
+        self.assertEqual(upload_text(buffer.getvalue(), 'cv.docx').split(), ['Sales', 'lead'])
+
+    def test_unreadable_upload(self):
+        self.assertEqual(upload_text(b'not a pdf', 'cv.pdf'), '')
+        self.assertEqual(upload_text([b'image'], 'scan.jpg'), '')
+
+
+class DuplicateIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.index = DuplicateIndex(os.path.join(self.tmp, 'search.sqlite3'), threshold=0.8)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_revised_resume_found(self):
+        self.index.add('original', Fingerprint.from_profile({'email': 'jane@example.com'}, RESUME))
+        self.index.add('other', Fingerprint.from_profile({}, "Turbine design engineer " * 40))
+        matches = self.index.find(Fingerprint.from_profile({}, revised(RESUME)))
+        self.assertEqual([match['session_id'] for match in matches], ['original'])
+        self.assertEqual(matches[0]['reasons'], ['resume'])
+
+    def test_contact_match_without_text(self):
+        self.index.add('original', Fingerprint.from_profile({'phone': '98765 43210'}, RESUME))
+        matches = self.index.find(Fingerprint.from_profile({'phone': '+919876543210'}, ''))
+        self.assertEqual(matches, [{'session_id': 'original', 'similarity': None, 'reasons': ['phone']}])
+
+    def test_removed_and_excluded(self):
+        self.index.add('original', Fingerprint.from_profile({'email': 'jane@example.com'}, RESUME))
+        fingerprint = Fingerprint.from_profile({'email': 'JANE@example.com'}, RESUME)
+        self.assertEqual(self.index.find(fingerprint, exclude='original'), [])
+        self.index.remove('original')
+        self.assertEqual(self.index.find(fingerprint), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import io
+from PIL import Image
+from pypdf import PdfReader
+from utils.images import EXIF_ORIENTATION, images_to_pdf, prepare_image, target_size
+
+
+def image_bytes(size, fmt='JPEG', mode='RGB', color='white', orientation=None):
+    image = Image.new(mode, size, color)
+    buffer = io.BytesIO()
+    if orientation is not None:
+        exif = Image.Exif()
+        exif[EXIF_ORIENTATION] = orientation
+        image.save(buffer, format=fmt, exif=exif)
+    else:
+        image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+class PrepareImageTestCase(unittest.TestCase):
+    def test_target_size_keeps_aspect_and_never_upscales(self):
+        width, height = target_size((4000, 3000), 200)
+        self.assertLessEqual(width, round(0.78 * 612 / 72 * 200))
+        self.assertAlmostEqual(width / height, 4 / 3, places=2)
+        self.assertEqual(target_size((300, 200), 200), (300, 200))
+
+    def test_large_photo_downscaled(self):
+        prepared = Image.open(io.BytesIO(prepare_image(image_bytes((4032, 3024)), dpi=150)))
+        self.assertEqual(prepared.size, target_size((4032, 3024), 150))
+        self.assertEqual(prepared.format, 'JPEG')
+
+    def test_small_jpeg_kept_as_is(self):
+        data = image_bytes((400, 600))
+        self.assertIs(prepare_image(data), data)
+
+    def test_small_png_kept_as_is(self):
+        data = image_bytes((600, 800), fmt='PNG', mode='L')
+        self.assertIs(prepare_image(data), data)
+
+    def test_exif_rotation_applied(self):
+        data = image_bytes((600, 400), orientation=6)
+        prepared = Image.open(io.BytesIO(prepare_image(data)))
+        self.assertEqual(prepared.size, (400, 600))
+        self.assertNotIn(EXIF_ORIENTATION, prepared.getexif())
+
+    def test_transparency_flattened_to_white(self):
+        data = image_bytes((50, 50), fmt='PNG', mode='RGBA', color=(0, 0, 0, 0))
+        prepared = Image.open(io.BytesIO(prepare_image(data)))
+        self.assertEqual(prepared.mode, 'RGB')
+        self.assertGreater(min(prepared.getpixel((25, 25))), 250)
+        self.assertEqual(prepared.format, 'PNG')
+
+    def test_bilevel_scan_stays_png(self):
+        data = image_bytes((200, 300), fmt='PNG', mode='1')
+        self.assertEqual(Image.open(io.BytesIO(prepare_image(data))).format, 'PNG')
+
+
+class ImagesToPdfTestCase(unittest.TestCase):
+    def test_one_page_per_image_in_order(self):
+        images = [image_bytes((300, 400)), image_bytes((800, 400), fmt='PNG'), image_bytes((300, 400))]
+        reader = PdfReader(io.BytesIO(images_to_pdf(images)))
+        self.assertEqual(len(reader.pages), 3)
+        widths = [float(page.mediabox.width) for page in reader.pages]
+        self.assertGreater(widths[1], widths[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
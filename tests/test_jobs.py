@@ -0,0 +1,113 @@
+import unittest
+import os
+import io
+import time
+import shutil
+import tempfile
+from unittest import mock
+from reportlab.pdfgen import canvas
+from utils.jobs import JobStore, JobQueue, QueueFull
+
+
+def make_pdf_bytes():
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer)
+    c.drawString(100, 750, "Resume")
+    c.save()
+    return buffer.getvalue()
+
+
+def wait_for(queue, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = queue.get(job_id)
+        if status['status'] in ('done', 'failed'):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+class JobQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.store = JobStore(os.path.join(self.tmp, 'jobs.sqlite3'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_job_runs_to_completion(self):
+        queue = JobQueue(self.store, self.tmp, workers=1)
+        job_id = queue.submit({'candidate_name': 'Jane'}, make_pdf_bytes(), 'resume.pdf')
+        status = wait_for(queue, job_id)
+        queue.shutdown()
+
+        self.assertEqual(status['status'], 'done')
+        self.assertEqual(status['progress'], 1.0)
+        self.assertEqual(set(status['stages'].values()), {'done'})
+        self.assertTrue(os.path.exists(os.path.join(self.tmp, status['result'])))
+        # The saved upload is removed once the profile exists
+        self.assertFalse(any('_upload' in name for name in os.listdir(self.tmp)))
+
+    def test_failed_job_reports_error(self):
+        queue = JobQueue(self.store, self.tmp, workers=1)
+        job_id = queue.submit({}, b'not a document', 'resume.txt')
+        status = wait_for(queue, job_id)
+        queue.shutdown()
+
+        self.assertEqual(status['status'], 'failed')
+        self.assertIn('Unsupported file format', status['error'])
+
+    def test_failed_bookkeeping_fails_job(self):
+        search = mock.Mock()
+        search.enqueue.side_effect = OSError('index is read-only')
+        queue = JobQueue(self.store, self.tmp, workers=1, search=search)
+        job_id = queue.submit({'candidate_name': 'Jane'}, make_pdf_bytes(), 'resume.pdf')
+        status = wait_for(queue, job_id, timeout=10)
+        queue.shutdown()
+
+        self.assertEqual(status['status'], 'failed')
+        self.assertIn('index is read-only', status['error'])
+
+    def test_queue_is_bounded(self):
+        queue = JobQueue(self.store, self.tmp, workers=1, max_pending=0)
+        with self.assertRaises(QueueFull):
+            queue.submit({}, make_pdf_bytes(), 'resume.pdf')
+
+    def test_unfinished_jobs_recovered_after_restart(self):
+        # A job claimed by a process that has since died
+        input_path = os.path.join(self.tmp, 'job-1_upload.pdf')
+        with open(input_path, 'wb') as f:
+            f.write(make_pdf_bytes())
+        self.store.create('job-1', {'candidate_name': 'Jane'}, 'resume.pdf', input_path)
+        self.store.claim('job-1', owner=2 ** 22 + 1)
+        self.store.set_stage('job-1', 'convert')
+
+        queue = JobQueue(self.store, self.tmp, workers=1)
+        queue.recover()
+        status = wait_for(queue, 'job-1')
+        queue.shutdown()
+        self.assertEqual(status['status'], 'done')
+
+    def test_recover_skips_jobs_that_moved_on(self):
+        input_path = os.path.join(self.tmp, 'job-1_upload.pdf')
+        with open(input_path, 'wb') as f:
+            f.write(make_pdf_bytes())
+        self.store.create('job-1', {'candidate_name': 'Jane'}, 'resume.pdf', input_path)
+        self.store.claim('job-1', owner=2 ** 22 + 1)
+        snapshot = self.store.unfinished()
+
+        # Another process recovers and claims the job after the snapshot
+        self.assertTrue(self.store.requeue('job-1', 'running', 2 ** 22 + 1))
+        self.store.claim('job-1', owner=2 ** 22 + 2)
+        self.assertFalse(self.store.requeue('job-1', 'running', 2 ** 22 + 1))
+
+        queue = JobQueue(self.store, self.tmp, workers=1)
+        queue.store.unfinished = lambda: snapshot
+        queue.recover()
+        queue.shutdown()
+        job = self.store.get('job-1')
+        self.assertEqual((job['status'], job['owner']), ('running', 2 ** 22 + 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
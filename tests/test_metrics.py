@@ -0,0 +1,64 @@
+import unittest
+from utils.metrics import Registry, PipelineTrace, STAGE_ERRORS, STAGE_SECONDS, input_type, page_bucket
+
+
+class RegistryTestCase(unittest.TestCase):
+    def test_histogram_rendering(self):
+        registry = Registry()
+        histogram = registry.histogram('demo_seconds', 'Demo', ['stage'], buckets=(0.1, 1))
+        histogram.observe(0.05, stage='merge')
+        histogram.observe(0.5, stage='merge')
+        histogram.observe(5, stage='merge')
+        text = registry.render()
+
+        self.assertIn('# TYPE demo_seconds histogram', text)
+        self.assertIn('demo_seconds_bucket{stage="merge",le="0.1"} 1', text)
+        self.assertIn('demo_seconds_bucket{stage="merge",le="1"} 2', text)
+        self.assertIn('demo_seconds_bucket{stage="merge",le="+Inf"} 3', text)
+        self.assertIn('demo_seconds_count{stage="merge"} 3', text)
+
+    def test_label_values_escaped(self):
+        registry = Registry()
+        counter = registry.counter('demo_total', 'Demo', ['name'])
+        counter.inc(name='a "b"\n')
+        self.assertIn('demo_total{name="a \\"b\\"\\n"} 1', registry.render())
+
+    def test_wrong_labels_rejected(self):
+        counter = Registry().counter('demo_total', 'Demo', ['stage'])
+        with self.assertRaises(ValueError):
+            counter.inc(kind='x')
+
+
+class PipelineTraceTestCase(unittest.TestCase):
+    def test_labels(self):
+        self.assertEqual(input_type('CV.DOCX'), 'docx')
+        self.assertEqual(input_type('photo.jpeg'), 'image')
+        self.assertEqual(page_bucket(1), '1')
+        self.assertEqual(page_bucket(12), '6-20')
+        self.assertEqual(page_bucket(500), '100+')
+        self.assertEqual(page_bucket(None), 'unknown')
+
+    def test_records_on_finish(self):
+        trace = PipelineTrace('resume.doc', session_id='abc')
+        before = STAGE_SECONDS.count(stage='convert', input_type='doc', pages='2-5')
+        with trace.stage('convert'):
+            pass
+        self.assertEqual(STAGE_SECONDS.count(stage='convert', input_type='doc', pages='2-5'), before)
+        with self.assertLogs('talentwrap.pipeline') as logs:
+            trace.finish(3)
+        self.assertEqual(STAGE_SECONDS.count(stage='convert', input_type='doc', pages='2-5'), before + 1)
+        self.assertIn('"session_id": "abc"', logs.output[0])
+
+    def test_counts_failing_stage(self):
+        trace = PipelineTrace('resume.doc', session_id='abc')
+        before = STAGE_ERRORS.value(stage='convert', input_type='doc')
+        with self.assertLogs('talentwrap.pipeline') as logs:
+            with self.assertRaises(RuntimeError):
+                with trace.stage('convert'):
+                    raise RuntimeError("soffice failed")
+        self.assertEqual(STAGE_ERRORS.value(stage='convert', input_type='doc'), before + 1)
+        self.assertIn('"stage": "convert"', logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
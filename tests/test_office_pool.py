@@ -0,0 +1,80 @@
+import unittest
+import threading
+import time
+from utils.office_pool import OfficePool, OfficePoolError, ConversionTimeout
+
+
+class FakeWorker:
+    """Stands in for a LibreOffice process; behaviour is driven by the input name."""
+
+    def __init__(self, name):
+        self.name = name
+        self.starts = 0
+        self.alive = False
+        self.jobs_done = 0
+        self.release = threading.Event()
+
+    def start(self):
+        self.starts += 1
+        self.alive = True
+        self.jobs_done = 0
+
+    def stop(self):
+        self.alive = False
+        self.release.set()
+
+    def is_alive(self):
+        return self.alive
+
+    def convert(self, input_path, output_path):
+        if input_path == 'hang.docx':
+            self.release.wait()
+            raise OfficePoolError("bridge disposed")
+        if input_path == 'broken.docx':
+            raise ValueError("load failed")
+        self.jobs_done += 1
+
+
+class OfficePoolTestCase(unittest.TestCase):
+    def make_pool(self, **kwargs):
+        pool = OfficePool(size=1, worker_factory=FakeWorker, **kwargs)
+        pool.start()
+        return pool, pool._workers[0]
+
+    def test_convert_uses_warm_worker(self):
+        pool, worker = self.make_pool()
+        pool.convert('ok.docx', 'ok.pdf')
+        pool.convert('ok.docx', 'ok.pdf')
+        self.assertEqual(worker.starts, 1)
+        self.assertEqual(worker.jobs_done, 2)
+
+    def test_hung_job_times_out_and_restarts_worker(self):
+        pool, worker = self.make_pool(job_timeout=0.2)
+        started = time.monotonic()
+        with self.assertRaises(ConversionTimeout):
+            pool.convert('hang.docx', 'hang.pdf')
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(worker.starts, 2)
+        self.assertTrue(worker.is_alive())
+
+    def test_failed_job_restarts_worker(self):
+        pool, worker = self.make_pool()
+        with self.assertRaises(OfficePoolError):
+            pool.convert('broken.docx', 'broken.pdf')
+        self.assertEqual(worker.starts, 2)
+
+    def test_dead_worker_is_restarted_before_next_job(self):
+        pool, worker = self.make_pool()
+        worker.alive = False
+        pool.convert('ok.docx', 'ok.pdf')
+        self.assertEqual(worker.starts, 2)
+
+    def test_worker_recycled_after_max_jobs(self):
+        pool, worker = self.make_pool(max_jobs_per_worker=2)
+        for _ in range(3):
+            pool.convert('ok.docx', 'ok.pdf')
+        self.assertEqual(worker.starts, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
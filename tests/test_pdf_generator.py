@@ -0,0 +1,401 @@
+import unittest
+import os
+import io
+import tempfile
+import shutil
+import threading
+import time
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+import pikepdf
+from pypdf import PdfReader
+from reportlab.pdfgen import canvas
+from utils import pdf_generator
+from utils.limits import DocumentTooLarge, ResumeLimits
+from utils.pdf_generator import OverlayCache, generate_summary_pdf, convert_to_pdf, merge_pdfs
+from utils.pipeline import build_profile, profile_name, save_profile_record, load_profile_record, update_profile
+
+
+def make_pdf(path_or_buffer, pages=1, text="Resume page"):
+    c = canvas.Canvas(path_or_buffer)
+    for i in range(pages):
+        c.drawString(100, 750, f"{text} {i + 1}")
+        c.showPage()
+    c.save()
+
+
+SAMPLE_DATA = {
+    'candidate_name': 'Test Candidate',
+    'department': 'Sales',
+    'email': 'test@example.com',
+    'remarks': 'Available immediately',
+}
+
+
+class OverlayCacheTestCase(unittest.TestCase):
+    def test_overlay_is_built_once(self):
+        cache = OverlayCache()
+        self.assertIs(cache.get_page(), cache.get_page())
+
+    def test_overlay_rebuilt_when_footer_changes(self):
+        cache = OverlayCache()
+        first = cache.get_page(footer_text="Footer A")
+        second = cache.get_page(footer_text="Footer B")
+        self.assertIsNot(first, second)
+        self.assertIn("Footer B", second.extract_text())
+
+
+    def test_overlay_without_liberation_fonts(self):
+        missing = {name: '/nonexistent/' + name + '.ttf' for name in pdf_generator.FONT_PATHS}
+        with mock.patch.object(pdf_generator, 'FONT_PATHS', missing), \
+                mock.patch.object(pdf_generator, '_fonts', None):
+            self.assertEqual(pdf_generator.register_fonts()['Arial-Bold'], 'Helvetica-Bold')
+            buffer = io.BytesIO()
+            pdf_generator.create_overlay(buffer)
+        self.assertIn('Triumph consultants', PdfReader(buffer).pages[0].extract_text())
+
+
+class MergeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.summary = os.path.join(self.tmp, 'summary.pdf')
+        self.resume = os.path.join(self.tmp, 'resume.pdf')
+        generate_summary_pdf(SAMPLE_DATA, self.summary)
+        make_pdf(self.resume, pages=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_merge_leaves_no_overlay_file(self):
+        output = os.path.join(self.tmp, 'final.pdf')
+        merge_pdfs(self.summary, self.resume, output)
+        self.assertEqual(len(PdfReader(output).pages), 4)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, 'overlay.pdf')))
+
+    def image_objects(self, reader):
+        images = set()
+
+        def visit(resources):
+            for ref in resources.get('/XObject', {}).values():
+                xobject = ref.get_object()
+                if xobject['/Subtype'] == '/Image':
+                    images.add(ref.idnum)
+                elif '/Resources' in xobject:
+                    visit(xobject['/Resources'])
+
+        for page in reader.pages:
+            visit(page['/Resources'])
+        return images
+
+    def test_overlay_stored_once(self):
+        make_pdf(self.resume, pages=10)
+        output = os.path.join(self.tmp, 'final.pdf')
+        info = merge_pdfs(self.summary, self.resume, output)
+
+        reader = PdfReader(output)
+        self.assertEqual(len(self.image_objects(reader)), 1)
+        for page in reader.pages:
+            self.assertIn('Triumph consultants', page.extract_text())
+        self.assertEqual(info['output_bytes'], os.path.getsize(output))
+        self.assertEqual(info['input_bytes'], os.path.getsize(self.summary) + os.path.getsize(self.resume))
+
+    def test_remerge_deduplicates_overlay(self):
+        first = os.path.join(self.tmp, 'first.pdf')
+        merge_pdfs(self.summary, self.resume, first)
+        second = io.BytesIO()
+        info = merge_pdfs(self.summary, first, second, resume_prepared=True, resume_start=1)
+        self.assertEqual(len(self.image_objects(PdfReader(second))), 1)
+        self.assertEqual(info['output_bytes'], len(second.getvalue()))
+
+    def test_linearized_output(self):
+        make_pdf(self.resume, pages=10)
+        output = io.BytesIO()
+        info = merge_pdfs(self.summary, self.resume, output, linearize=True)
+        self.assertEqual(info['output_bytes'], len(output.getvalue()))
+        with pikepdf.open(io.BytesIO(output.getvalue())) as pdf:
+            self.assertTrue(pdf.is_linearized)
+            self.assertTrue(pdf.check_linearization(io.StringIO()))
+        self.assertIn('PROFILE SUMMARY', PdfReader(output).pages[0].extract_text())
+
+    def test_linearize_without_pikepdf(self):
+        output = io.BytesIO()
+        with mock.patch.object(pdf_generator, 'pikepdf', None), self.assertLogs('utils.pdf_generator'):
+            merge_pdfs(self.summary, self.resume, output, linearize=True)
+        with pikepdf.open(io.BytesIO(output.getvalue())) as pdf:
+            self.assertFalse(pdf.is_linearized)
+
+    def test_page_limit_rejects(self):
+        with self.assertRaises(DocumentTooLarge):
+            merge_pdfs(self.summary, self.resume, io.BytesIO(), limits=ResumeLimits(max_pages=2))
+
+    def test_page_limit_truncates(self):
+        output = io.BytesIO()
+        info = merge_pdfs(self.summary, self.resume, output, limits=ResumeLimits(max_pages=2, truncate=True))
+        self.assertEqual(info['resume_pages'], 2)
+        self.assertEqual(info['resume_pages_truncated'], 1)
+        reader = PdfReader(output)
+        self.assertEqual(len(reader.pages), 3)
+        self.assertIn('Resume page 2', reader.pages[2].extract_text())
+
+    def test_links_survive_merge(self):
+        resume = io.BytesIO()
+        c = canvas.Canvas(resume)
+        c.drawString(100, 700, "linkedin.com/in/jane")
+        c.linkURL('https://linkedin.com/in/jane', (100, 695, 220, 715), relative=0)
+        c.save()
+        output = io.BytesIO()
+        merge_pdfs(self.summary, io.BytesIO(resume.getvalue()), output)
+        page = PdfReader(output).pages[-1]
+        links = [annotation.get_object() for annotation in page['/Annots']]
+        self.assertEqual(len(links), 1)
+        self.assertEqual(links[0]['/A']['/URI'], 'https://linkedin.com/in/jane')
+        # Moved and scaled with the page content, still inside the page
+        left, bottom, right, top = (float(value) for value in links[0]['/Rect'])
+        self.assertLess(right - left, 120)
+        self.assertGreater(left, 0)
+        self.assertLess(top, 792)
+        self.assertEqual(links[0].raw_get('/P').idnum, page.indirect_reference.idnum)
+
+    def test_packet_merged_in_order_with_outline(self):
+        letter = io.BytesIO()
+        make_pdf(letter, pages=2, text="Offer letter")
+        output = io.BytesIO()
+        info = merge_pdfs(self.summary, [self.resume, letter], output, outline=['Resume', 'offer.pdf'])
+        self.assertEqual(info['resume_pages'], 5)
+        reader = PdfReader(output)
+        self.assertIn('Offer letter 1', reader.pages[4].extract_text())
+        bookmarks = [(item.title, reader.get_destination_page_number(item)) for item in reader.outline]
+        self.assertEqual(bookmarks, [('Summary', 0), ('Resume', 1), ('offer.pdf', 4)])
+
+    def test_packet_page_limit_counts_every_document(self):
+        letter = io.BytesIO()
+        make_pdf(letter, pages=2, text="Offer letter")
+        certificate = io.BytesIO()
+        make_pdf(certificate, text="Certificate")
+        with self.assertRaises(DocumentTooLarge):
+            merge_pdfs(self.summary, [self.resume, letter], io.BytesIO(), limits=ResumeLimits(max_pages=4))
+        output = io.BytesIO()
+        info = merge_pdfs(self.summary, [self.resume, letter, certificate], output,
+                          limits=ResumeLimits(max_pages=4, truncate=True), outline=['Resume', 'offer', 'cert'])
+        self.assertEqual(info['resume_pages_truncated'], 2)
+        reader = PdfReader(output)
+        self.assertEqual([item.title for item in reader.outline], ['Summary', 'Resume', 'offer'])
+
+    def test_concurrent_merges_share_overlay(self):
+        pdf_generator.overlay_cache.clear()
+
+        def merge(i):
+            output = os.path.join(self.tmp, f'final_{i}.pdf')
+            merge_pdfs(self.summary, self.resume, output)
+            return PdfReader(output)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            readers = list(pool.map(merge, range(16)))
+        for reader in readers:
+            self.assertEqual(len(reader.pages), 4)
+            self.assertIn("Triumph consultants", reader.pages[-1].extract_text())
+
+
+class InMemoryPipelineTestCase(unittest.TestCase):
+    def test_build_profile_from_bytes(self):
+        resume = io.BytesIO()
+        make_pdf(resume, pages=2)
+        output = io.BytesIO()
+        with self.assertLogs('talentwrap.pipeline') as logs:
+            info = build_profile(SAMPLE_DATA, resume.getvalue(), 'resume.pdf', output)
+        reader = PdfReader(io.BytesIO(output.getvalue()))
+        self.assertEqual(len(reader.pages), 3)
+        self.assertEqual(info['output_bytes'], len(output.getvalue()))
+        self.assertIn(f'"output_bytes": {info["output_bytes"]}', logs.output[-1])
+        self.assertIn("PROFILE SUMMARY", reader.pages[0].extract_text())
+
+    def test_build_packet(self):
+        from PIL import Image
+        resume = io.BytesIO()
+        make_pdf(resume, pages=2)
+        certificate = io.BytesIO()
+        Image.new('RGB', (200, 300), 'white').save(certificate, format='PNG')
+        letter = io.BytesIO()
+        make_pdf(letter, text="Offer letter")
+        output = io.BytesIO()
+        with mock.patch.dict(os.environ, {'CONVERT_WORKERS': '2'}):
+            info = build_profile(SAMPLE_DATA, resume.getvalue(), 'resume.pdf', output,
+                                 attachments=[(certificate.getvalue(), 'scans/certificate.png'),
+                                              (letter, 'offer.pdf')], outline=True)
+        self.assertEqual(info['documents'], 3)
+        reader = PdfReader(io.BytesIO(output.getvalue()))
+        self.assertEqual(len(reader.pages), 5)
+        self.assertIn('Offer letter', reader.pages[4].extract_text())
+        bookmarks = [(item.title, reader.get_destination_page_number(item)) for item in reader.outline]
+        self.assertEqual(bookmarks, [('Summary', 0), ('Resume', 1), ('certificate.png', 3), ('offer.pdf', 4)])
+
+    def test_packet_size_limit_counts_attachments(self):
+        with self.assertRaises(DocumentTooLarge):
+            build_profile(SAMPLE_DATA, b'x' * 600, 'resume.pdf', io.BytesIO(),
+                          attachments=[(b'x' * 600, 'offer.pdf')], limits=ResumeLimits(max_bytes=1024))
+
+    def test_convert_image_stream(self):
+        from PIL import Image
+        image = io.BytesIO()
+        Image.new('RGB', (200, 300), 'white').save(image, format='PNG')
+        image.seek(0)
+        output = io.BytesIO()
+        convert_to_pdf(image, output, filename='scan.png')
+        self.assertEqual(len(PdfReader(io.BytesIO(output.getvalue())).pages), 1)
+
+    def test_pdf_passed_through(self):
+        resume = io.BytesIO()
+        make_pdf(resume, pages=2)
+        output = io.BytesIO()
+        convert_to_pdf(io.BytesIO(resume.getvalue()), output, filename='resume.pdf')
+        self.assertEqual(output.getvalue(), resume.getvalue())
+
+    def test_size_limit_checked_first(self):
+        with mock.patch.object(pdf_generator, 'generate_summary_pdf') as summary, \
+                self.assertRaises(DocumentTooLarge):
+            build_profile(SAMPLE_DATA, b'x' * 2048, 'resume.pdf', io.BytesIO(),
+                          limits=ResumeLimits(max_bytes=1024))
+        summary.assert_not_called()
+
+    def test_page_limit_checked_before_summary(self):
+        resume = io.BytesIO()
+        make_pdf(resume, pages=3)
+        with mock.patch.object(pdf_generator, 'generate_summary_pdf') as summary, \
+                self.assertRaises(DocumentTooLarge):
+            build_profile(SAMPLE_DATA, resume.getvalue(), 'resume.pdf', io.BytesIO(),
+                          attachments=[(b'image', 'scan.png')], limits=ResumeLimits(max_pages=3))
+        summary.assert_not_called()
+
+    def test_soffice_timeout_kills_process_group(self):
+        # The shell stands in for soffice, its background sleep for soffice.bin
+        started = time.monotonic()
+        with self.assertRaises(RuntimeError):
+            pdf_generator._run_soffice(['sh', '-c', 'sleep 30 & sleep 30'], timeout=0.2)
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_one_shot_soffice_runs_get_their_own_profile(self):
+        commands = []
+
+        def fake_soffice(cmd, timeout):
+            commands.append(cmd)
+            out_dir = cmd[cmd.index('--outdir') + 1]
+            make_pdf(os.path.join(out_dir, 'resume.pdf'))
+
+        with mock.patch.object(pdf_generator, 'get_office_pool', return_value=None), \
+                mock.patch.object(pdf_generator, '_run_soffice', side_effect=fake_soffice):
+            for _ in range(2):
+                convert_to_pdf(b'docx', io.BytesIO(), filename='resume.docx')
+        profiles = [arg for cmd in commands for arg in cmd if arg.startswith('-env:UserInstallation=')]
+        self.assertEqual(len(set(profiles)), 2)
+        for profile in profiles:
+            self.assertFalse(os.path.exists(profile.split('file://', 1)[1]))
+
+    def test_packet_converts_word_documents_one_at_a_time(self):
+        active = []
+        overlap = []
+
+        def fake_convert(source, output, filename=None):
+            active.append(filename)
+            overlap.append(len(active))
+            time.sleep(0.05)
+            make_pdf(output)
+            active.remove(filename)
+
+        documents = [(b'docx %d' % i, f'doc{i}.docx') for i in range(3)]
+        with mock.patch.object(pdf_generator, 'convert_to_pdf', side_effect=fake_convert):
+            info = build_profile(SAMPLE_DATA, b'resume', 'resume.docx', io.BytesIO(), attachments=documents)
+        self.assertEqual(info['resume_pages'], 4)
+        self.assertEqual(max(overlap), 1)
+
+    def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            convert_to_pdf(b'data', io.BytesIO(), filename='resume.txt')
+
+class UpdateProfileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_update_reuses_resume_pages(self):
+        resume = io.BytesIO()
+        make_pdf(resume, pages=30)
+        final_path = os.path.join(self.tmp, profile_name('abc'))
+        info = build_profile(SAMPLE_DATA, resume.getvalue(), 'resume.pdf', final_path)
+        save_profile_record(self.tmp, 'abc', SAMPLE_DATA, info)
+
+        edited = dict(SAMPLE_DATA, remarks='Joining in two weeks')
+        with mock.patch('utils.pdf_generator.convert_to_pdf') as convert:
+            update_profile(self.tmp, 'abc', edited)
+        convert.assert_not_called()
+
+        reader = PdfReader(final_path)
+        self.assertEqual(len(reader.pages), 31)
+        self.assertIn('Joining in two weeks', reader.pages[0].extract_text())
+        self.assertIn('Resume page 30', reader.pages[-1].extract_text())
+        self.assertEqual(load_profile_record(self.tmp, 'abc')['form_data']['remarks'], 'Joining in two weeks')
+        self.assertEqual(sorted(os.listdir(self.tmp)),
+                         ['TalentWrap_Profile_abc.pdf', 'abc_form.json', 'abc_form.json.lock'])
+
+    def test_update_keeps_bookmarks(self):
+        resume = io.BytesIO()
+        make_pdf(resume, pages=2)
+        letter = io.BytesIO()
+        make_pdf(letter, text="Offer letter")
+        final_path = os.path.join(self.tmp, profile_name('abc'))
+        info = build_profile(SAMPLE_DATA, resume.getvalue(), 'resume.pdf', final_path,
+                             attachments=[(letter.getvalue(), 'offer.pdf')], outline=True)
+        save_profile_record(self.tmp, 'abc', SAMPLE_DATA, info)
+
+        update_profile(self.tmp, 'abc', dict(SAMPLE_DATA, remarks='Joining in two weeks'))
+        reader = PdfReader(final_path)
+        bookmarks = [(item.title, reader.get_destination_page_number(item)) for item in reader.outline]
+        self.assertEqual(bookmarks, [('Summary', 0), ('Resume', 1), ('offer.pdf', 3)])
+        self.assertIn('Offer letter', reader.pages[3].extract_text())
+
+    def test_concurrent_edits_are_serialised(self):
+        resume = io.BytesIO()
+        make_pdf(resume, pages=5)
+        final_path = os.path.join(self.tmp, profile_name('abc'))
+        info = build_profile(SAMPLE_DATA, resume.getvalue(), 'resume.pdf', final_path)
+        save_profile_record(self.tmp, 'abc', SAMPLE_DATA, info)
+        growing = dict(SAMPLE_DATA, **{field: 'Long remarks. ' * 100
+                                       for field in ('remarks', 'reason_change', 'tech_expertise', 'education')})
+
+        # The shrinking edit stops after reading the record; the growing one
+        # must not replace the profile under it
+        paused, resume_shrink = threading.Event(), threading.Event()
+        generate = pdf_generator.generate_summary_pdf
+
+        def generate_summary(form_data, output):
+            if form_data is SAMPLE_DATA:
+                paused.set()
+                resume_shrink.wait(10)
+            return generate(form_data, output)
+
+        with mock.patch.object(pdf_generator, 'generate_summary_pdf', side_effect=generate_summary):
+            shrink = threading.Thread(target=update_profile, args=(self.tmp, 'abc', SAMPLE_DATA))
+            shrink.start()
+            paused.wait(10)
+            grow = threading.Thread(target=update_profile, args=(self.tmp, 'abc', growing))
+            grow.start()
+            time.sleep(0.3)
+            resume_shrink.set()
+            shrink.join()
+            grow.join()
+
+        record = load_profile_record(self.tmp, 'abc')
+        self.assertGreater(record['summary_pages'], 1)
+        reader = PdfReader(final_path)
+        self.assertEqual(len(reader.pages), record['summary_pages'] + 5)
+        self.assertIn('Resume page', reader.pages[record['summary_pages']].extract_text())
+        self.assertNotIn('Resume page', reader.pages[record['summary_pages'] - 1].extract_text())
+
+    def test_update_missing_profile(self):
+        with self.assertRaises(FileNotFoundError):
+            update_profile(self.tmp, 'missing', SAMPLE_DATA)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import io
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from unittest import mock
+from reportlab.pdfgen import canvas
+from utils.pipeline import build_profile, profile_name, save_profile_record
+from utils.search import SearchIndex, build_query
+
+
+def make_resume(text):
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer)
+    c.drawString(72, 750, text)
+    c.save()
+    return buffer.getvalue()
+
+
+class BuildQueryTestCase(unittest.TestCase):
+    def test_terms_fields_and_phrases(self):
+        self.assertEqual(build_query('enterprise location:Pune notice_period:"30 days"'),
+                         '"enterprise" AND location : "Pune" AND notice_period : "30 days"')
+
+    def test_prefix_and_aliases(self):
+        self.assertEqual(build_query('name:jan* resume:kubernetes'),
+                         'candidate_name : "jan"* AND resume_text : "kubernetes"')
+
+    def test_fts_syntax_is_quoted(self):
+        self.assertEqual(build_query('a OR b) NEAR("'), '"a" AND "OR" AND "b)" AND "NEAR("')
+        self.assertEqual(build_query('unknown:field'), '"unknown field"')
+        self.assertIsNone(build_query('  "" '))
+
+
+class SearchIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.index = SearchIndex(self.folder, os.path.join(self.folder, 'search.sqlite3'))
+
+    def tearDown(self):
+        self.index.stop()
+        shutil.rmtree(self.folder)
+
+    def add_profile(self, form_data, resume_text):
+        session_id = str(uuid.uuid4())
+        info = build_profile(form_data, make_resume(resume_text), 'resume.pdf',
+                             os.path.join(self.folder, profile_name(session_id)))
+        save_profile_record(self.folder, session_id, form_data, info)
+        return session_id
+
+    def test_search_fields_and_resume_text(self):
+        pune = self.add_profile({'candidate_name': 'Jane Doe', 'department': 'Enterprise Sales',
+                                 'location': 'Pune', 'notice_period': '30 days'},
+                                "Closed deals selling Kubernetes platforms")
+        mumbai = self.add_profile({'candidate_name': 'John Roe', 'department': 'Enterprise Sales',
+                                   'location': 'Mumbai', 'notice_period': '90 days'}, "Inside sales")
+        self.assertEqual(self.index.reconcile(), (2, 0))
+
+        total, hits = self.index.search('enterprise sales location:pune notice_period:"30 days"')
+        self.assertEqual(total, 1)
+        self.assertEqual(hits[0]['session_id'], pune)
+        self.assertEqual(hits[0]['candidate_name'], 'Jane Doe')
+
+        total, hits = self.index.search('kubernetes sell')
+        self.assertEqual([hit['session_id'] for hit in hits], [pune])
+        self.assertIn('[Kubernetes]', hits[0]['snippet'])
+        self.assertNotIn('Triumph', hits[0]['snippet'])
+
+        total, hits = self.index.search('')
+        self.assertEqual(total, 2)
+        self.assertEqual({hit['session_id'] for hit in hits}, {pune, mumbai})
+
+    def test_reconcile_is_incremental(self):
+        session_id = self.add_profile({'candidate_name': 'Jane Doe', 'location': 'Pune'}, "Resume")
+        self.assertEqual(self.index.reconcile(), (1, 0))
+        self.assertEqual(self.index.reconcile(), (0, 0))
+
+        # An edit rewrites the record
+        record = os.path.join(self.folder, f'{session_id}_form.json')
+        save_profile_record(self.folder, session_id, {'candidate_name': 'Jane Doe', 'location': 'Nagpur'},
+                            {'summary_pages': 1})
+        os.utime(record, (time.time() + 5, time.time() + 5))
+        self.assertEqual(self.index.reconcile(), (1, 0))
+        self.assertEqual(self.index.search('location:pune')[0], 0)
+        self.assertEqual(self.index.search('location:nagpur')[0], 1)
+
+        os.remove(record)
+        self.assertEqual(self.index.reconcile(), (0, 1))
+        self.assertEqual(self.index.search('jane')[0], 0)
+
+    def test_background_indexing(self):
+        self.index.start()
+        session_id = self.add_profile({'candidate_name': 'Queued Candidate'}, "Resume")
+        self.index.enqueue(session_id)
+        self.index.wait_idle()
+        self.assertEqual(self.index.search('queued')[1][0]['session_id'], session_id)
+
+    def test_reconcile_runs_under_steady_traffic(self):
+        self.index.reconcile_interval = 0.2
+        session_id = self.add_profile({'candidate_name': 'Busy Candidate'}, "Resume")
+        with mock.patch.object(self.index, 'reconcile', wraps=self.index.reconcile) as reconcile:
+            self.index.start()
+            # The queue never stays empty for a whole interval
+            deadline = time.monotonic() + 1
+            while time.monotonic() < deadline:
+                self.index.enqueue(session_id)
+                time.sleep(0.02)
+            self.index.wait_idle()
+        self.assertGreaterEqual(reconcile.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import os
+import time
+import uuid
+import shutil
+import tempfile
+from utils.storage import StorageManager, classify, servable, FINAL, SIDECAR, INTERMEDIATE
+
+
+class StorageManagerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.storage = StorageManager(self.tmp, os.path.join(self.tmp, 'storage.sqlite3'),
+                                      ttl=3600, quota_bytes=10_000, intermediate_ttl=600)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write(self, name, size=100):
+        with open(os.path.join(self.tmp, name), 'wb') as f:
+            f.write(b'x' * size)
+        return name
+
+    def make_session(self, size=100, now=None):
+        sid = str(uuid.uuid4())
+        for name in (f"TalentWrap_Profile_{sid}.pdf", f"{sid}_form.json"):
+            self.write(name, size)
+            self.storage.register(name, now=now)
+        return sid
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.tmp, name))
+
+    def test_classify(self):
+        sid = str(uuid.uuid4())
+        self.assertEqual(classify(f"TalentWrap_Profile_{sid}.pdf"), (sid, FINAL))
+        self.assertEqual(classify(f"{sid}_form.json"), (sid, SIDECAR))
+        self.assertEqual(classify(f"{sid}_form.json.lock"), (sid, SIDECAR))
+        self.assertEqual(classify(f"{sid}_profile.pstats"), (sid, SIDECAR))
+        self.assertEqual(classify(f"{sid}_upload.docx"), (sid, INTERMEDIATE))
+        self.assertIsNone(classify('jobs.sqlite3'))
+
+
+    def test_servable(self):
+        sid = str(uuid.uuid4())
+        self.assertTrue(servable(f"TalentWrap_Profile_{sid}.pdf"))
+        self.assertTrue(servable(f"{sid}_profile.pstats"))
+        for name in (f"{sid}_form.json", f"{sid}_upload.pdf", 'search.sqlite3', 'storage.sqlite3'):
+            self.assertFalse(servable(name))
+    def test_intermediates_deleted_after_merge(self):
+        sid = str(uuid.uuid4())
+        upload = self.write(f"{sid}_upload.pdf")
+        self.storage.register(upload)
+        final = self.write(f"TalentWrap_Profile_{sid}.pdf")
+        self.storage.merge_succeeded(sid, final)
+
+        self.assertFalse(self.exists(upload))
+        self.assertTrue(self.exists(final))
+
+    def test_expired_sessions_removed(self):
+        old = self.make_session(now=time.time() - 7200)
+        fresh = self.make_session()
+        self.storage.sweep()
+
+        self.assertFalse(self.exists(f"TalentWrap_Profile_{old}.pdf"))
+        self.assertFalse(self.exists(f"{old}_form.json"))
+        self.assertTrue(self.exists(f"TalentWrap_Profile_{fresh}.pdf"))
+
+    def test_quota_evicts_least_recently_downloaded(self):
+        now = time.time()
+        sessions = [self.make_session(size=2000, now=now - 100 + i) for i in range(3)]
+        self.storage.touch(f"TalentWrap_Profile_{sessions[0]}.pdf")
+        self.make_session(size=2000)  # 16000 bytes in total, quota is 10000
+        self.storage.sweep()
+
+        self.assertTrue(self.exists(f"TalentWrap_Profile_{sessions[0]}.pdf"))
+        self.assertFalse(self.exists(f"TalentWrap_Profile_{sessions[1]}.pdf"))
+        self.assertFalse(self.exists(f"TalentWrap_Profile_{sessions[2]}.pdf"))
+        self.assertLessEqual(self.storage.total_bytes(), 10_000)
+
+    def test_adopt_indexes_existing_files(self):
+        sid = str(uuid.uuid4())
+        self.write(f"{sid}_summary.pdf")
+        self.write(f"{sid}_converted.pdf")
+        self.write('notes.txt')
+        self.assertEqual(self.storage.adopt(), 2)
+        self.storage.sweep(now=time.time() + 3600)
+        self.assertTrue(self.exists('notes.txt'))
+        self.assertFalse(self.exists(f"{sid}_summary.pdf"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import io
+import json
+import os
+import tempfile
+import shutil
+from unittest import mock
+from pypdf import PdfReader
+from utils.summary_template import SummaryTemplate, LayoutError
+
+DATA = {
+    'candidate_name': 'Jane Doe',
+    'email': 'jane@example.com',
+    'sales_target': '10 Cr',
+    'tech_expertise': 'Salesforce, HubSpot and enterprise negotiation across APAC',
+    'remarks': 'Available to join within thirty days of an offer. ' * 5,
+}
+
+
+def text_positions(buffer):
+    positions = []
+
+    def visitor(text, cm, tm, font_dict, font_size):
+        if text.strip():
+            positions.append((round(cm[4] + tm[4], 2), round(cm[5] + tm[5], 2), text.strip()))
+
+    buffer.seek(0)
+    PdfReader(buffer).pages[0].extract_text(visitor_text=visitor)
+    return sorted(positions)
+
+
+class SummaryTemplateTestCase(unittest.TestCase):
+    def setUp(self):
+        self.template = SummaryTemplate()
+
+    def test_fast_path_matches_table_layout(self):
+        rows = self.template.rows(DATA)
+        drawn, built = io.BytesIO(), io.BytesIO()
+        self.template._draw(self.template._single_page_layout(rows), drawn)
+        self.template._build(rows, built)
+        self.assertEqual(text_positions(drawn), text_positions(built))
+
+    def test_render_uses_fast_path_when_it_fits(self):
+        with mock.patch.object(SummaryTemplate, '_build') as build:
+            self.template.render(DATA, io.BytesIO())
+        build.assert_not_called()
+
+    def test_long_or_marked_up_values_use_table_layout(self):
+        for data in (dict(DATA, remarks='Led regional sales. ' * 100), dict(DATA, remarks='R&amp;D <b>lead</b>')):
+            with mock.patch.object(SummaryTemplate, '_build') as build:
+                self.template.render(data, io.BytesIO())
+            build.assert_called_once()
+
+    def test_long_summary_spans_pages(self):
+        output = io.BytesIO()
+        data = {key: 'Led regional sales. ' * 20 for key, label in self.template.fields}
+        self.template.render(data, output)
+        self.assertGreater(len(PdfReader(output).pages), 1)
+
+    def test_rows_sequential_numbering_skips_empty(self):
+        rows = self.template.rows({'candidate_name': 'Jane', 'phone': ' ', 'email': 'jane@example.com'})
+        self.assertEqual(rows, [('1', 'Candidate Name', 'Jane'), ('2', 'Email', 'jane@example.com')])
+
+
+class LayoutFileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write(self, layout):
+        path = os.path.join(self.tmp, 'layout.json')
+        with open(path, 'w') as f:
+            json.dump(layout, f)
+        return path
+
+    def test_custom_layout(self):
+        template = SummaryTemplate.from_file(self.write({
+            'title': 'CANDIDATE BRIEF',
+            'numbering': 'fixed',
+            'fields': [{'key': 'candidate_name', 'label': 'Name'},
+                       {'key': 'phone', 'label': 'Phone'},
+                       {'key': 'notice_period', 'label': 'Notice'}],
+        }))
+        self.assertEqual(template.rows({'candidate_name': 'Jane', 'notice_period': '30 days'}),
+                         [('1', 'Name', 'Jane'), ('3', 'Notice', '30 days')])
+        output = io.BytesIO()
+        template.render({'candidate_name': 'Jane', 'notice_period': '30 days'}, output)
+        text = PdfReader(output).pages[0].extract_text()
+        self.assertIn('CANDIDATE BRIEF', text)
+        self.assertNotIn('Evaluation Criteria\nPhone', text)
+
+    def test_invalid_layouts(self):
+        for layout in ({'fields': []}, {'fields': [{'label': 'No key'}]}, {'numbering': 'roman'},
+                       {'column_widths': [1, 2]}, ['not', 'an', 'object']):
+            with self.assertRaises(LayoutError):
+                SummaryTemplate.from_file(self.write(layout))
+
+
+if __name__ == '__main__':
+    unittest.main()
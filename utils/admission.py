@@ -0,0 +1,125 @@
+"""
+Admission control for profile builds.
+
+Each kind of conversion has its own capacity, so a burst of Word documents
+(LibreOffice, seconds each) cannot take the slots that PDF and image
+resumes need. A build runs when its kind has a free slot; otherwise it
+waits in that kind's bounded queue, and when the queue is full, or the wait
+times out, it is turned away with Busy so the client can retry later.
+"""
+import contextlib
+import threading
+import time
+
+from utils.metrics import ADMISSION_REJECTED, ADMISSION_WAITING, input_type
+
+KINDS = ('word', 'pdf', 'image')
+
+
+class Busy(Exception):
+    """Raised when a build cannot be admitted; the client should retry later."""
+
+
+def conversion_kind(filename):
+    """
+    Which capacity a resume uses: 'word', 'image' or 'pdf' (anything else is
+    cheap to turn down, so it shares the PDF capacity). A list of names (a
+    packet of documents) uses the costliest kind among them.
+    """
+    if isinstance(filename, (list, tuple)):
+        kinds = {conversion_kind(name) for name in filename}
+        return next(kind for kind in ('word', 'image', 'pdf') if kind in kinds)
+    kind = input_type(filename)
+    if kind in ('doc', 'docx'):
+        return 'word'
+    return 'image' if kind == 'image' else 'pdf'
+
+
+class Gate:
+    """
+    ``capacity`` builds at a time, with at most ``max_waiting`` more queued
+    for up to ``wait_timeout`` seconds.
+    """
+
+    def __init__(self, kind, capacity, max_waiting, wait_timeout=30):
+        self.kind = kind
+        self.capacity = capacity
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.active = 0
+        self.waiting = 0
+        # Unbounded (background) waiters; kept apart so they never fill the queue
+        self.waiting_unbounded = 0
+        self._cond = threading.Condition()
+
+    def _reject(self, message):
+        ADMISSION_REJECTED.inc(kind=self.kind)
+        raise Busy(message)
+
+    def acquire(self, bounded=True):
+        """
+        Takes a slot. With ``bounded`` False the caller waits as long as it
+        takes and does not count against the queue (background jobs, whose
+        own queue is already bounded).
+        """
+        with self._cond:
+            if self.active < self.capacity:
+                self.active += 1
+                return
+            if bounded and self.waiting >= self.max_waiting:
+                self._reject(f"Too many {self.kind} resumes are being processed, please retry shortly")
+            if bounded:
+                self.waiting += 1
+            else:
+                self.waiting_unbounded += 1
+            ADMISSION_WAITING.inc(kind=self.kind)
+            try:
+                deadline = time.monotonic() + self.wait_timeout if bounded else None
+                while self.active >= self.capacity:
+                    remaining = deadline - time.monotonic() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        self._reject(f"Timed out waiting to process a {self.kind} resume, please retry shortly")
+                    self._cond.wait(remaining)
+                self.active += 1
+            finally:
+                if bounded:
+                    self.waiting -= 1
+                else:
+                    self.waiting_unbounded -= 1
+                ADMISSION_WAITING.dec(kind=self.kind)
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+
+class Admission:
+    """
+    One Gate per kind. ``limits`` maps each kind in KINDS to
+    ``(capacity, max_waiting)``.
+    """
+
+    def __init__(self, limits, wait_timeout=30):
+        self.gates = {kind: Gate(kind, capacity, max_waiting, wait_timeout)
+                      for kind, (capacity, max_waiting) in limits.items()}
+
+    def gate(self, filename):
+        """
+        The Gate whose slots builds of ``filename`` (or list of filenames)
+        take, for callers that cannot hold a slot in one block.
+        """
+        return self.gates[conversion_kind(filename)]
+
+    @contextlib.contextmanager
+    def admit(self, filename, bounded=True):
+        """
+        Holds a slot of the kind of ``filename`` (or list of filenames) for
+        the duration of the block; raises Busy when none can be had.
+        """
+        gate = self.gate(filename)
+        gate.acquire(bounded)
+        try:
+            yield
+        finally:
+            gate.release()
@@ -0,0 +1,262 @@
+"""
+Bulk candidate import: one manifest (CSV or JSONL) plus a ZIP of resumes in,
+a ZIP of generated profiles out.
+
+Rows are built on a process pool and each profile is written to the output
+archive as soon as it is ready, so only a handful of PDFs are ever held in
+memory. Rows that fail are recorded in ``manifest.json`` inside the archive
+instead of aborting the batch.
+"""
+import csv
+import io
+import json
+import multiprocessing
+import os
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.utils import secure_filename
+from utils.limits import DocumentTooLarge
+from utils.metrics import JOBS_IN_FLIGHT, STAGE_ERRORS, PipelineTrace, input_type, record_run
+from utils.pipeline import FORM_FIELDS, build_profile
+
+RESUME_COLUMN = 'resume_file'
+
+
+class ManifestError(ValueError):
+    """Raised when the uploaded manifest cannot be read."""
+
+
+class RowFailed(Exception):
+    """Raised by a worker when a row fails; carries the failing stage."""
+
+    def __init__(self, message, stage):
+        super().__init__(message, stage)
+        self.message = message
+        self.stage = stage
+
+    def __str__(self):
+        return self.message
+
+
+def parse_manifest(stream, filename):
+    """
+    Reads candidate rows from a CSV or JSONL manifest. Each row holds the
+    form fields plus a ``resume_file`` column naming a file in the ZIP.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        if ext == '.csv':
+            rows = list(csv.DictReader(text))
+        elif ext in ('.jsonl', '.ndjson'):
+            rows = []
+            for line_no, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ManifestError(f"Line {line_no}: {e.msg}")
+                if not isinstance(row, dict):
+                    raise ManifestError(f"Line {line_no}: expected a JSON object")
+                rows.append(row)
+        else:
+            raise ManifestError(f"Unsupported manifest format: {ext or filename}")
+    except UnicodeDecodeError:
+        raise ManifestError("Manifest must be UTF-8 encoded")
+    finally:
+        text.detach()
+
+    if not rows:
+        raise ManifestError("Manifest has no candidate rows")
+    return rows
+
+
+def _build_row(form_data, resume, filename, cache=None, limits=None):
+    # Runs in a worker process, whose metrics are never scraped: timings and
+    # the failing stage go back to the parent, which records them.
+    output = io.BytesIO()
+    trace = PipelineTrace(filename)
+    try:
+        info = build_profile(form_data, resume, filename, output, cache=cache, trace=trace, limits=limits)
+    except Exception as e:
+        stage = list(trace.timings)[-1] if trace.timings else 'summary'
+        raise RowFailed(str(e) or type(e).__name__, stage) from None
+    return output.getvalue(), info
+
+
+class _ChunkWriter:
+    """
+    Write-only file object that hands written bytes back to a generator.
+    Having no tell()/seek() makes ZipFile write in streaming mode.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _profile_name(row_no, form_data):
+    name = secure_filename(form_data.get('candidate_name') or '') or 'candidate'
+    return f"TalentWrap_Profile_{row_no:04d}_{name}.pdf"
+
+
+def stream_bulk_zip(rows, resumes, executor, max_in_flight=4, cache=None, limits=None, admission=None):
+    """
+    Generator yielding the bytes of a ZIP archive with one profile per row
+    and a ``manifest.json`` describing every row's outcome.
+
+    ``resumes`` is an open ZipFile with the uploaded resumes, matched to rows
+    by file name (case-insensitive, directories ignored). ``cache`` is an
+    optional ConversionCache shared with the worker processes; ``limits`` a
+    ResumeLimits applied to every row (oversized members are never read).
+    With ``admission``, each row holds a slot of its kind while it is built,
+    waiting for one rather than failing, so a batch shares the capacity of
+    single uploads instead of taking it all.
+    """
+    members = {}
+    for info in resumes.infolist():
+        if not info.is_dir():
+            members.setdefault(os.path.basename(info.filename).lower(), info)
+
+    out = _ChunkWriter()
+    manifest = []
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_STORED) as archive:
+        pending = {}
+        rows_iter = iter(enumerate(rows, start=1))
+        exhausted = False
+
+        try:
+            while pending or not exhausted:
+                # Keep a bounded number of rows in flight
+                while not exhausted and len(pending) < max_in_flight:
+                    try:
+                        row_no, row = next(rows_iter)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    form_data = {field: row.get(field) for field in FORM_FIELDS}
+                    resume_name = os.path.basename(str(row.get(RESUME_COLUMN) or ''))
+                    entry = {
+                        'row': row_no,
+                        'candidate_name': form_data.get('candidate_name'),
+                        'resume_file': resume_name,
+                    }
+                    info = members.get(resume_name.lower())
+                    if not resume_name or info is None:
+                        entry.update(status='failed', error=f"Resume '{resume_name}' not found in ZIP")
+                        manifest.append(entry)
+                        continue
+                    if limits is not None:
+                        try:
+                            limits.check_bytes(info.file_size)
+                        except DocumentTooLarge as e:
+                            entry.update(status='failed', error=str(e))
+                            manifest.append(entry)
+                            continue
+                    try:
+                        resume = resumes.read(info)
+                    except (zipfile.BadZipFile, RuntimeError, NotImplementedError, zlib.error, EOFError, OSError) as e:
+                        # Corrupt, encrypted or unsupported-compression member
+                        entry.update(status='failed', error=f"Cannot read '{resume_name}' from ZIP: {e}")
+                        manifest.append(entry)
+                        continue
+                    gate = admission.gate(resume_name) if admission is not None else None
+                    if gate is not None:
+                        gate.acquire(bounded=False)
+                    try:
+                        future = executor.submit(_build_row, form_data, resume, resume_name, cache, limits)
+                    except BrokenProcessPool:
+                        if gate is not None:
+                            gate.release()
+                        entry.update(status='failed', error="Worker pool crashed")
+                        manifest.append(entry)
+                        continue
+                    if gate is not None:
+                        # Released from the executor's thread, so the slot frees up
+                        # even while this generator is waiting for another one
+                        future.add_done_callback(lambda _, gate=gate: gate.release())
+                    pending[future] = (entry, form_data)
+                    JOBS_IN_FLIGHT.inc(mode='bulk')
+
+                if not pending:
+                    continue
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    entry, form_data = pending.pop(future)
+                    JOBS_IN_FLIGHT.dec(mode='bulk')
+                    kind = input_type(entry['resume_file'])
+                    try:
+                        pdf_bytes, info = future.result()
+                    except RowFailed as e:
+                        STAGE_ERRORS.inc(stage=e.stage, input_type=kind)
+                        entry.update(status='failed', error=str(e))
+                    except Exception as e:
+                        entry.update(status='failed', error=str(e) or type(e).__name__)
+                    else:
+                        record_run(info['timings'], kind, info['resume_pages'],
+                                   input_bytes=info['input_bytes'], output_bytes=info['output_bytes'])
+                        entry.update(status='ok', profile=_profile_name(entry['row'], form_data),
+                                     conversion_cache=info['conversion_cache'])
+                        archive.writestr(entry['profile'], pdf_bytes)
+                    manifest.append(entry)
+                yield out.drain()
+        finally:
+            # The client went away mid-stream (the generator was closed at a
+            # yield): drop rows not yet started and stop counting them all
+            for future in pending:
+                future.cancel()
+                JOBS_IN_FLIGHT.dec(mode='bulk')
+
+        manifest.sort(key=lambda item: item['row'])
+        summary = {
+            'total': len(manifest),
+            'succeeded': sum(1 for item in manifest if item['status'] == 'ok'),
+            'failed': sum(1 for item in manifest if item['status'] == 'failed'),
+            'rows': manifest,
+        }
+        archive.writestr('manifest.json', json.dumps(summary, indent=2))
+    yield out.drain()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _init_worker():
+    # A worker builds one row at a time, so one warm soffice is enough; the
+    # default pool would start SOFFICE_POOL_SIZE of them in every worker
+    size = int(os.environ.get('SOFFICE_POOL_SIZE', '2'))
+    os.environ['SOFFICE_POOL_SIZE'] = str(min(size, 1))
+
+
+def get_bulk_executor(workers=None):
+    """
+    Returns the shared process pool used for bulk imports, sized to the
+    number of cores unless ``workers`` says otherwise. Workers are spawned
+    rather than forked so they never inherit the web server's threads.
+    """
+    global _executor
+    with _executor_lock:
+        # A worker killed mid-job (e.g. by the OOM killer) breaks the pool
+        if _executor is None or getattr(_executor, '_broken', False):
+            _executor = ProcessPoolExecutor(
+                max_workers=workers or os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+        return _executor
@@ -0,0 +1,109 @@
+"""
+Content-addressed cache of converted resumes.
+
+Converted PDFs are stored under the SHA-256 of the uploaded bytes (and, for
+images, the IMAGE_DPI/IMAGE_QUALITY they were prepared with), so the same
+Word document or image uploaded again skips LibreOffice / img2pdf. Files
+are written atomically and eviction is serialised with a lock file, so
+several worker processes can share one cache directory.
+"""
+import contextlib
+import fcntl
+import hashlib
+import os
+import tempfile
+
+# Bump when conversion output changes so stale entries are not served
+CACHE_VERSION = b'3'
+
+# PDFs are passed through, not converted, so caching them would only cost disk
+CACHED_EXTENSIONS = {'.doc', '.docx', '.jpg', '.jpeg', '.png'}
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+
+class ConversionCache:
+    """
+    Directory of ``<sha256>.pdf`` files bounded to ``max_bytes``, evicting
+    the least recently used entries first (a hit refreshes the file's mtime).
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, data, ext):
+        ext = ext.lower()
+        digest = hashlib.sha256()
+        digest.update(CACHE_VERSION + b'\0' + ext.encode() + b'\0')
+        if ext in IMAGE_EXTENSIONS:
+            # Changing the image settings changes the output
+            from utils.images import settings
+            digest.update(('%d,%d' % settings()).encode() + b'\0')
+        digest.update(data)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.pdf')
+
+    def get(self, key):
+        """
+        Returns the cached PDF bytes, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return data
+
+    def put(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def _entries(self):
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith('.pdf'):
+                    with contextlib.suppress(FileNotFoundError):
+                        st = entry.stat()
+                        yield entry.path, st.st_size, st.st_mtime
+
+    def size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """
+        Deletes least recently used entries until the cache fits its limit.
+        """
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                entries = list(self._entries())
+                total = sum(size for _, size, _ in entries)
+                if total <= self.max_bytes:
+                    return
+                for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(path)
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
@@ -0,0 +1,22 @@
+"""
+Small helpers for the SQLite files kept next to the uploads.
+"""
+import contextlib
+import sqlite3
+
+
+@contextlib.contextmanager
+def connect(path, schema):
+    """
+    Opens a short-lived connection, makes sure ``schema`` exists and commits
+    on success. A connection per call keeps stores safe to share between
+    threads and processes.
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.executescript(schema)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
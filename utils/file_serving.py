@@ -0,0 +1,105 @@
+"""
+Serving generated profiles efficiently.
+
+Profiles get a strong ETag derived from their content, so clients can
+revalidate with If-None-Match and PDF viewers can fetch byte ranges. Links
+carry a ``v`` query parameter with the ETag prefix; a request for the current
+version is cacheable forever because that URL's content can never change
+(editing a profile changes its ETag and therefore its link).
+
+Optionally the body is left to a front proxy (nginx X-Accel-Redirect or
+Apache/lighttpd X-Sendfile) for zero-copy delivery.
+"""
+import collections
+import hashlib
+import mimetypes
+import os
+import threading
+from flask import Response, send_file
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+VERSION_LENGTH = 16
+
+_etags = collections.OrderedDict()
+_etags_lock = threading.Lock()
+_ETAG_CACHE_SIZE = 4096
+
+
+def file_etag(path):
+    """
+    SHA-256 of the file's content, cached per (path, mtime, size).
+    """
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _etags_lock:
+        etag = _etags.get(key)
+        if etag is not None:
+            _etags.move_to_end(key)
+            return etag
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    etag = digest.hexdigest()
+
+    with _etags_lock:
+        _etags[key] = etag
+        while len(_etags) > _ETAG_CACHE_SIZE:
+            _etags.popitem(last=False)
+    return etag
+
+
+def file_version(folder, filename):
+    """
+    Version token for links to ``filename``, or None if it does not exist.
+    """
+    path = safe_join(folder, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    return file_etag(path)[:VERSION_LENGTH]
+
+
+def send_profile(request, folder, filename, sendfile_mode=None, accel_prefix='/protected-uploads'):
+    """
+    Sends ``filename`` from ``folder`` with a strong ETag, conditional and
+    Range request support, and long-lived caching for versioned URLs.
+
+    ``sendfile_mode`` may be 'x-accel' (nginx) or 'x-sendfile'; the proxy
+    then delivers the body and handles ranges itself.
+    """
+    path = safe_join(folder, filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+    path = os.path.abspath(path)
+    etag = file_etag(path)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if sendfile_mode in ('x-accel', 'x-sendfile'):
+        response = Response(mimetype=mimetype)
+        if sendfile_mode == 'x-accel':
+            response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{filename}"
+        else:
+            response.headers['X-Sendfile'] = path
+        response.set_etag(etag)
+        response = response.make_conditional(request, accept_ranges=False)
+        if response.status_code == 304:
+            response.headers.pop('X-Accel-Redirect', None)
+            response.headers.pop('X-Sendfile', None)
+    else:
+        response = send_file(path, mimetype=mimetype, etag=etag, conditional=True)
+
+    # Only logged-in users may fetch profiles, so shared caches must not keep them
+    response.cache_control.private = True
+    response.cache_control.public = False
+    if request.args.get('v') == etag[:VERSION_LENGTH]:
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        # Unversioned or stale link: always revalidate (cheap, thanks to the ETag)
+        response.cache_control.no_cache = True
+        response.cache_control.max_age = 0
+    return response
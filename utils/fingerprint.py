@@ -0,0 +1,273 @@
+"""
+Near-duplicate detection for resumes.
+
+A fingerprint is the candidate's normalized email and phone plus a MinHash
+signature of the resume text's word shingles. Signatures are stored in an
+LSH index: each is cut into BANDS bands and a resume is a candidate
+duplicate of every earlier one that shares at least one band exactly, so a
+lookup reads a handful of index rows instead of comparing against every
+profile. Candidates are then confirmed by their estimated similarity (or a
+matching email or phone).
+
+The signature uses one-permutation hashing: each shingle is hashed once and
+the hash picks both the signature slot and the value competing for its
+minimum, which costs one pass over the text instead of one per slot. Empty
+slots (short texts) borrow from the next filled slot.
+"""
+import hashlib
+import io
+import re
+import struct
+import time
+import zipfile
+from utils.db import connect
+
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+SHINGLE_WORDS = 5
+# Only the start of a resume is fingerprinted: enough to tell versions apart
+# without extracting every page of a long portfolio
+MAX_WORDS = 3000
+# Estimated share of shingles two resumes must have in common to be flagged
+DEFAULT_THRESHOLD = 0.8
+
+_SLOT_BITS = NUM_HASHES.bit_length() - 1
+_VALUE_BITS = 64 - _SLOT_BITS
+_VALUE_MASK = (1 << _VALUE_BITS) - 1
+_WORD = re.compile(r'[a-z0-9]+')
+_DOCX_TAG = re.compile(r'<[^<]+>')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    session_id TEXT PRIMARY KEY,
+    signature BLOB,
+    email TEXT,
+    phone TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fingerprints_email ON fingerprints (email) WHERE email IS NOT NULL;
+CREATE INDEX IF NOT EXISTS fingerprints_phone ON fingerprints (phone) WHERE phone IS NOT NULL;
+CREATE TABLE IF NOT EXISTS lsh_bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    session_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lsh_bands_bucket ON lsh_bands (band, bucket);
+CREATE INDEX IF NOT EXISTS lsh_bands_session ON lsh_bands (session_id);
+"""
+
+
+def normalize_email(value):
+    value = (value or '').strip().lower()
+    return value if '@' in value else None
+
+
+def normalize_phone(value):
+    """
+    The last ten digits, so '+91 98765-43210' and '9876543210' agree.
+    """
+    digits = re.sub(r'\D', '', value or '')
+    return digits[-10:] if len(digits) >= 7 else None
+
+
+def _hash64(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def signature(text):
+    """
+    MinHash signature (a tuple of NUM_HASHES ints) of the text's word
+    shingles, or None when the text has too few words.
+    """
+    words = _WORD.findall((text or '').lower())[:MAX_WORDS]
+    if len(words) < SHINGLE_WORDS:
+        return None
+    slots = [None] * NUM_HASHES
+    for i in range(len(words) - SHINGLE_WORDS + 1):
+        h = _hash64(' '.join(words[i:i + SHINGLE_WORDS]).encode())
+        slot, value = h >> _VALUE_BITS, h & _VALUE_MASK
+        if slots[slot] is None or value < slots[slot]:
+            slots[slot] = value
+    # Densify: an empty slot takes the next filled one's value, offset by
+    # the distance so that borrowed values only match borrowed values
+    filled = list(slots)
+    for slot in range(NUM_HASHES):
+        distance = 1
+        while slots[slot] is None:
+            borrowed = filled[(slot + distance) % NUM_HASHES]
+            if borrowed is not None:
+                slots[slot] = (distance << _VALUE_BITS) + borrowed
+            distance += 1
+    return tuple(slots)
+
+
+def similarity(a, b):
+    """
+    Estimated Jaccard similarity of the shingle sets behind two signatures.
+    """
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+
+def band_buckets(sig):
+    """
+    One bucket id per band; signatures sharing any bucket are candidates.
+    """
+    buckets = []
+    for band in range(BANDS):
+        rows = sig[band * ROWS:(band + 1) * ROWS]
+        data = struct.pack(f'<{ROWS}Q', *rows)
+        buckets.append(int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little', signed=True))
+    return buckets
+
+
+class Fingerprint:
+    def __init__(self, email=None, phone=None, sig=None):
+        self.email = email
+        self.phone = phone
+        self.signature = sig
+
+    @classmethod
+    def from_profile(cls, form_data, text):
+        return cls(normalize_email(form_data.get('email')), normalize_phone(form_data.get('phone')),
+                   signature(text))
+
+    def is_empty(self):
+        return not (self.email or self.phone or self.signature)
+
+
+def _pack(sig):
+    return struct.pack(f'<{NUM_HASHES}Q', *sig)
+
+
+def _unpack(blob):
+    return struct.unpack(f'<{NUM_HASHES}Q', blob)
+
+
+def upload_text(resume, filename, max_words=MAX_WORDS):
+    """
+    Text of an upload, as far as it can be had without converting it: the
+    text layer of a PDF (only as many pages as the fingerprint needs) or the
+    body of a .docx. Other formats (and lists of images) give ''.
+    """
+    name = filename.lower()
+    if isinstance(resume, list):
+        return ''
+    try:
+        if name.endswith('.pdf'):
+            from pypdf import PdfReader  # heavy; imported on first use
+            source = io.BytesIO(resume) if isinstance(resume, (bytes, bytearray)) else resume
+            parts = []
+            words = 0
+            for page in PdfReader(source).pages:
+                text = page.extract_text() or ''
+                parts.append(text)
+                words += len(text.split())
+                if words >= max_words:
+                    break
+            if hasattr(source, 'seek'):
+                source.seek(0)
+            return '\n'.join(parts)
+        if name.endswith('.docx'):
+            source = io.BytesIO(resume) if isinstance(resume, (bytes, bytearray)) else resume
+            with zipfile.ZipFile(source) as z:
+                xml = z.read('word/document.xml').decode('utf-8', 'replace')
+            if hasattr(source, 'seek'):
+                source.seek(0)
+            # Paragraph ends become spaces so words do not run together
+            return _DOCX_TAG.sub('', xml.replace('</w:p>', ' </w:p>'))
+    except Exception:
+        # An unreadable upload still gets its contact fields checked
+        return ''
+    return ''
+
+
+class DuplicateIndex:
+    """
+    Fingerprints of generated profiles, stored next to the search index.
+    """
+
+    def __init__(self, db_path, threshold=DEFAULT_THRESHOLD, max_candidates=200):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.max_candidates = max_candidates
+
+    def _connect(self):
+        return connect(self.db_path, SCHEMA)
+
+    def add(self, session_id, fingerprint):
+        """
+        Stores (or replaces) the fingerprint of a generated profile.
+        """
+        sig = fingerprint.signature
+        with self._connect() as conn:
+            # An edited profile keeps its place as the older of two matches
+            row = conn.execute("SELECT created_at FROM fingerprints WHERE session_id = ?", (session_id,)).fetchone()
+            self._remove(conn, session_id)
+            if fingerprint.is_empty():
+                return
+            conn.execute(
+                "INSERT INTO fingerprints (session_id, signature, email, phone, created_at) VALUES (?, ?, ?, ?, ?)",
+                (session_id, _pack(sig) if sig else None, fingerprint.email, fingerprint.phone,
+                 row['created_at'] if row else time.time())
+            )
+            if sig:
+                conn.executemany("INSERT INTO lsh_bands (band, bucket, session_id) VALUES (?, ?, ?)",
+                                 [(band, bucket, session_id) for band, bucket in enumerate(band_buckets(sig))])
+
+    def remove(self, session_id):
+        with self._connect() as conn:
+            self._remove(conn, session_id)
+
+    def _remove(self, conn, session_id):
+        conn.execute("DELETE FROM fingerprints WHERE session_id = ?", (session_id,))
+        conn.execute("DELETE FROM lsh_bands WHERE session_id = ?", (session_id,))
+
+    def find(self, fingerprint, exclude=None):
+        """
+        Profiles that are likely the same candidate, best first (oldest
+        first among equals, so the original profile leads). Each match
+        is a dict with ``session_id``, ``similarity`` (of the resume text,
+        None when either side has none) and ``reasons``: any of 'email',
+        'phone' and 'resume'.
+        """
+        if fingerprint.is_empty():
+            return []
+        sig = fingerprint.signature
+        with self._connect() as conn:
+            candidates = set()
+            for column in ('email', 'phone'):
+                value = getattr(fingerprint, column)
+                if value:
+                    candidates.update(row[0] for row in conn.execute(
+                        f"SELECT session_id FROM fingerprints WHERE {column} = ? LIMIT ?",
+                        (value, self.max_candidates)
+                    ))
+            if sig:
+                buckets = band_buckets(sig)
+                where = ' OR '.join(['(band = ? AND bucket = ?)'] * BANDS)
+                params = [value for pair in enumerate(buckets) for value in pair]
+                candidates.update(row[0] for row in conn.execute(
+                    f"SELECT DISTINCT session_id FROM lsh_bands WHERE {where} LIMIT ?",
+                    params + [self.max_candidates]
+                ))
+            candidates.discard(exclude)
+            if not candidates:
+                return []
+            rows = conn.execute(
+                f"SELECT session_id, signature, email, phone, created_at FROM fingerprints "
+                f"WHERE session_id IN ({', '.join('?' * len(candidates))})",
+                list(candidates)
+            ).fetchall()
+
+        matches = []
+        for row in sorted(rows, key=lambda row: row['created_at']):
+            score = similarity(sig, _unpack(row['signature'])) if sig and row['signature'] else None
+            reasons = [column for column in ('email', 'phone')
+                       if getattr(fingerprint, column) and getattr(fingerprint, column) == row[column]]
+            if score is not None and score >= self.threshold:
+                reasons.append('resume')
+            if reasons:
+                matches.append({'session_id': row['session_id'], 'similarity': score, 'reasons': reasons})
+        matches.sort(key=lambda match: (len(match['reasons']), match['similarity'] or 0), reverse=True)
+        return matches
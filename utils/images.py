@@ -0,0 +1,111 @@
+"""
+Image resumes: phone photos and scans turned into PDF pages.
+
+A resume page is shown at most RESUME_AREA_PT on the final Letter page (see
+merge_pdfs()), so pixels beyond the target DPI for that area are never
+seen. Images are rotated upright from their EXIF orientation, transparency
+is flattened onto white, and anything larger than needed is resampled and
+recompressed before img2pdf embeds it. JPEGs and PNGs that already fit
+are embedded as they are.
+
+Settings: ``IMAGE_DPI`` (default 200) and ``IMAGE_QUALITY`` (JPEG quality,
+default 85).
+"""
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import img2pdf
+from PIL import Image, ImageOps
+
+# Largest area a resume page occupies on the final page, in points: 78% of
+# the Letter width, and the height between the footer and the logo
+RESUME_AREA_PT = (0.78 * 612, 792 - 110 - 45)
+
+EXIF_ORIENTATION = 0x0112
+
+
+def settings():
+    return int(os.environ.get('IMAGE_DPI', '200')), int(os.environ.get('IMAGE_QUALITY', '85'))
+
+
+def target_size(size, dpi):
+    """
+    Largest pixel size, with the aspect ratio of ``size``, that is still
+    useful at ``dpi`` on the resume area. Never larger than ``size``.
+    """
+    width, height = size
+    max_w, max_h = (points / 72 * dpi for points in RESUME_AREA_PT)
+    scale = min(max_w / width, max_h / height, 1)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _flatten(image):
+    """
+    img2pdf cannot embed transparency: composite it onto white.
+    """
+    if image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    if image.mode not in ('1', 'L', 'RGB'):
+        return image.convert('RGB')
+    return image
+
+
+def prepare_image(data, dpi=None, quality=None):
+    """
+    Returns image bytes ready for img2pdf: upright, opaque and no larger
+    than ``dpi`` needs. Bilevel scans and PNGs that fit are stored as PNG,
+    everything else that had to be re-encoded as JPEG at ``quality``.
+    """
+    default_dpi, default_quality = settings()
+    dpi = dpi or default_dpi
+    quality = quality or default_quality
+
+    image = Image.open(io.BytesIO(data))
+    source_format = image.format
+    source_mode = image.mode
+    transparent = 'transparency' in image.info
+    orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+    rotated = orientation in (5, 6, 7, 8)
+    width, height = image.size
+    shown = (height, width) if rotated else (width, height)
+    target = target_size(shown, dpi)
+    resize = target != shown
+
+    if resize and source_format == 'JPEG':
+        # Let the decoder scale by 1/2, 1/4 or 1/8: far less to decode
+        image.draft(image.mode, target[::-1] if rotated else target)
+
+    if orientation != 1:
+        image = ImageOps.exif_transpose(image)
+    image = _flatten(image)
+    if resize and image.size != target:
+        image = image.resize(target, Image.LANCZOS, reducing_gap=3.0)
+
+    if not resize and orientation == 1 and source_format in ('JPEG', 'PNG') and image.mode == source_mode \
+            and not transparent:
+        return data
+
+    output = io.BytesIO()
+    if image.mode == '1' or (source_format == 'PNG' and not resize):
+        image.save(output, format='PNG', dpi=(dpi, dpi))
+    else:
+        image.save(output, format='JPEG', quality=quality, dpi=(dpi, dpi))
+    return output.getvalue()
+
+
+def images_to_pdf(images, dpi=None, quality=None):
+    """
+    Converts image bytes to one PDF, one page per image in order. Images are
+    prepared in parallel (Pillow releases the GIL while decoding, resizing
+    and encoding). Returns the PDF bytes.
+    """
+    if len(images) == 1:
+        prepared = [prepare_image(images[0], dpi, quality)]
+    else:
+        with ThreadPoolExecutor(max_workers=min(len(images), os.cpu_count() or 1)) as pool:
+            prepared = list(pool.map(lambda data: prepare_image(data, dpi, quality), images))
+    return img2pdf.convert(prepared)
@@ -0,0 +1,285 @@
+"""
+Background job queue for profile generation.
+
+Jobs are recorded in a small SQLite database next to the uploads, so their
+state survives a worker restart: on startup, unfinished jobs whose owning
+process is gone are queued again from their saved input.
+"""
+import contextlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from utils.db import connect
+from utils.metrics import JOBS_IN_FLIGHT, JOBS_QUEUED, STAGE_SECONDS, PipelineTrace, input_type
+from utils.pipeline import STAGES, build_profile, profile_name, record_name, save_profile_record
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    stage TEXT,
+    form_data TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    input_path TEXT NOT NULL,
+    result TEXT,
+    conversion_cache TEXT,
+    error TEXT,
+    owner INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class QueueFull(Exception):
+    """Raised when too many jobs are already waiting."""
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """
+    SQLite-backed record of jobs. Each call opens its own connection, so the
+    store can be shared between threads and processes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+
+    def _connect(self):
+        return connect(self.path, SCHEMA)
+
+    def create(self, job_id, form_data, filename, input_path):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, form_data, filename, input_path, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, json.dumps(form_data), filename, input_path, now, now)
+            )
+
+    def claim(self, job_id, owner):
+        """
+        Marks a queued job as running. Returns False if someone else has it.
+        """
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'queued'",
+                (owner, time.time(), job_id)
+            )
+            return cur.rowcount == 1
+
+    def requeue(self, job_id, status, owner):
+        """
+        Marks a job queued again, unless it has moved on from ``status`` and
+        ``owner`` (the snapshot it was picked from). Returns whether it did.
+        """
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'queued', stage = NULL, owner = NULL, updated_at = ? "
+                "WHERE id = ? AND status = ? AND owner IS ?",
+                (time.time(), job_id, status, owner)
+            )
+            return cur.rowcount == 1
+
+    def set_stage(self, job_id, stage):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET stage = ?, updated_at = ? WHERE id = ?", (stage, time.time(), job_id))
+
+    def finish(self, job_id, result, conversion_cache=None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', stage = NULL, result = ?, conversion_cache = ?, "
+                "updated_at = ? WHERE id = ?",
+                (result, conversion_cache, time.time(), job_id)
+            )
+
+    def fail(self, job_id, error):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                (error, time.time(), job_id)
+            )
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['form_data'] = json.loads(job['form_data'])
+        return job
+
+    def unfinished(self):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def job_status(job):
+    """
+    Public view of a job: overall status plus the state of each stage.
+    """
+    stages = {}
+    current = job['stage']
+    reached = STAGES.index(current) if current in STAGES else None
+    for i, name in enumerate(STAGES):
+        if job['status'] == 'done':
+            stages[name] = 'done'
+        elif reached is None or i > reached:
+            stages[name] = 'queued'
+        elif i < reached:
+            stages[name] = 'done'
+        else:
+            stages[name] = 'failed' if job['status'] == 'failed' else 'running'
+    done = sum(1 for state in stages.values() if state == 'done')
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'stage': current,
+        'stages': stages,
+        'progress': round(done / len(STAGES), 2),
+        'error': job['error'],
+        'result': job['result'],
+        'conversion_cache': job['conversion_cache'],
+    }
+
+
+class JobQueue:
+    """
+    Runs profile jobs on a bounded thread pool. At most ``max_pending`` jobs
+    may be queued or running in this process; beyond that submit() raises
+    QueueFull.
+    """
+
+    def __init__(self, store, upload_folder, workers=2, max_pending=50, cache=None, storage=None,
+                 linearize=False, limits=None, admission=None, search=None):
+        self.store = store
+        self.upload_folder = upload_folder
+        self.cache = cache
+        self.storage = storage
+        self.linearize = linearize
+        self.limits = limits
+        self.admission = admission
+        self.search = search
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='talentwrap-job')
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def submit(self, form_data, resume, filename):
+        """
+        Saves the upload and queues a job for it. Returns the job id, which
+        doubles as the session id of the generated profile.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFull("Too many profiles are being generated, please retry shortly")
+            self._pending += 1
+
+        try:
+            job_id = str(uuid.uuid4())
+            ext = os.path.splitext(filename)[1].lower()
+            # The upload is kept on disk until the job finishes so that it
+            # can be retried after a restart.
+            input_path = os.path.join(self.upload_folder, f"{job_id}_upload{ext}")
+            started = time.perf_counter()
+            with open(input_path, "wb") as f:
+                if isinstance(resume, (bytes, bytearray)):
+                    f.write(resume)
+                else:
+                    shutil.copyfileobj(resume, f)
+            # The page count is not known yet
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage='save',
+                                  input_type=input_type(filename), pages='unknown')
+            self.store.create(job_id, form_data, filename, input_path)
+            if self.storage is not None:
+                self.storage.register(os.path.basename(input_path))
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+        JOBS_QUEUED.inc()
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def recover(self):
+        """
+        Re-queues jobs left unfinished by a process that is no longer running.
+        """
+        for job in self.store.unfinished():
+            owner = job['owner']
+            if job['status'] == 'running' and owner and owner != os.getpid() and _pid_alive(owner):
+                continue
+            if not os.path.exists(job['input_path']):
+                self.store.fail(job['id'], "Upload was lost before the job could run")
+                continue
+            if not self.store.requeue(job['id'], job['status'], owner):
+                # Claimed, finished or requeued by another process meanwhile
+                continue
+            with self._lock:
+                self._pending += 1
+            JOBS_QUEUED.inc()
+            self._executor.submit(self._run, job['id'])
+
+    def get(self, job_id):
+        job = self.store.get(job_id)
+        return job_status(job) if job else None
+
+    def _run(self, job_id):
+        JOBS_QUEUED.dec()
+        try:
+            if not self.store.claim(job_id, os.getpid()):
+                return
+            job = self.store.get(job_id)
+            result = profile_name(job_id)
+            output_path = os.path.join(self.upload_folder, result)
+            trace = PipelineTrace(job['filename'], session_id=job_id)
+            try:
+                # Jobs share the conversion capacity of synchronous builds,
+                # waiting as long as it takes (the job queue is bounded)
+                admitted = (self.admission.admit(job['filename'], bounded=False) if self.admission is not None
+                            else contextlib.nullcontext())
+                with admitted, JOBS_IN_FLIGHT.track(mode='async'):
+                    info = build_profile(
+                        job['form_data'], job['input_path'], job['filename'], output_path,
+                        on_stage=lambda stage: self.store.set_stage(job_id, stage),
+                        cache=self.cache, trace=trace, linearize=self.linearize, limits=self.limits
+                    )
+                # Finished last: a job is only 'done' once its bookkeeping is,
+                # and an error here must not leave it 'running' until restart
+                save_profile_record(self.upload_folder, job_id, job['form_data'], info)
+                if self.storage is not None:
+                    self.storage.merge_succeeded(job_id, result, record_name(job_id))
+                else:
+                    with contextlib.suppress(OSError):
+                        os.remove(job['input_path'])
+                if self.search is not None:
+                    self.search.enqueue(job_id)
+                self.store.finish(job_id, result, info['conversion_cache'])
+            except Exception as e:
+                self.store.fail(job_id, str(e) or type(e).__name__)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,66 @@
+"""
+Page and size limits for uploaded resumes.
+
+Scanned portfolios can run to hundreds of pages; limits stop them before
+they are converted or merged, with an error that says what was exceeded.
+"""
+import io
+import os
+
+
+class DocumentTooLarge(ValueError):
+    """Raised when a resume exceeds the configured page or size limit."""
+
+
+def byte_size(source):
+    """
+    Size of a document given as a path, bytes or seekable file object, or
+    the total of a list of them (None if it cannot be told).
+    """
+    if isinstance(source, (list, tuple)):
+        sizes = [byte_size(part) for part in source]
+        return None if None in sizes else sum(sizes)
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    try:
+        position = source.tell()
+        size = source.seek(0, io.SEEK_END)
+        source.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return None
+
+
+class ResumeLimits:
+    """
+    ``max_pages`` and ``max_bytes`` may be None (no limit). With ``truncate``
+    a resume over the page limit is cut to its first ``max_pages`` pages
+    instead of rejected.
+    """
+
+    def __init__(self, max_pages=None, max_bytes=None, truncate=False):
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.truncate = truncate
+
+    def check_bytes(self, size):
+        if self.max_bytes and size is not None and size > self.max_bytes:
+            raise DocumentTooLarge(
+                f"The resume is {size / 1024 / 1024:.1f} MB; the limit is {self.max_bytes / 1024 / 1024:.0f} MB"
+            )
+
+    def check_size(self, source):
+        if self.max_bytes:
+            self.check_bytes(byte_size(source))
+
+    def pages_to_keep(self, count):
+        """
+        Number of leading pages to use from a ``count``-page resume.
+        """
+        if not self.max_pages or count <= self.max_pages:
+            return count
+        if self.truncate:
+            return self.max_pages
+        raise DocumentTooLarge(f"The resume has {count} pages; the limit is {self.max_pages}")
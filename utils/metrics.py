@@ -0,0 +1,244 @@
+"""
+In-process metrics for the profile pipeline, exposed in the Prometheus text
+format, plus structured (JSON) log lines per generated profile.
+
+Metrics live in the process that records them. Bulk imports run on worker
+processes, so their timings are sent back with each result and recorded by
+the web process (see record_run()).
+"""
+import bisect
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger('talentwrap.pipeline')
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+                                for key, value in items]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextlib.contextmanager
+    def track(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state['counts'][index] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state['count'] if state else 0
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, dict(state, counts=list(state['counts']))) for key, state in self._values.items())
+        lines = self.header()
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state['counts']):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {state['count']}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {state['sum']}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'talentwrap_stage_duration_seconds', 'Time spent in each profile pipeline stage',
+    ['stage', 'input_type', 'pages']
+)
+STAGE_ERRORS = REGISTRY.counter(
+    'talentwrap_stage_errors_total', 'Profile pipeline failures by stage',
+    ['stage', 'input_type']
+)
+JOBS_IN_FLIGHT = REGISTRY.gauge(
+    'talentwrap_jobs_in_flight', 'Profiles currently being generated',
+    ['mode']
+)
+JOBS_QUEUED = REGISTRY.gauge(
+    'talentwrap_jobs_queued', 'Background jobs waiting for a worker'
+)
+ADMISSION_WAITING = REGISTRY.gauge(
+    'talentwrap_admission_waiting', 'Builds waiting for a conversion slot',
+    ['kind']
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    'talentwrap_admission_rejected_total', 'Builds turned away because their queue was full',
+    ['kind']
+)
+
+
+def input_type(filename):
+    ext = os.path.splitext(filename or '')[1].lower()
+    if ext in ('.jpg', '.jpeg', '.png'):
+        return 'image'
+    if ext in ('.pdf', '.docx', '.doc'):
+        return ext[1:]
+    return 'other'
+
+
+def page_bucket(pages):
+    """
+    Coarse page-count label, to keep the number of series bounded.
+    """
+    if pages is None:
+        return 'unknown'
+    for limit, label in ((1, '1'), (5, '2-5'), (20, '6-20'), (100, '21-100')):
+        if pages <= limit:
+            return label
+    return '100+'
+
+
+class PipelineTrace:
+    """
+    Times the stages of one profile build. Durations are recorded when the
+    build finishes, once the resume's page count is known; a failing stage
+    is counted and logged straight away.
+    """
+
+    def __init__(self, filename, session_id=None, on_stage=None):
+        self.input_type = input_type(filename)
+        self.session_id = session_id
+        self.on_stage = on_stage
+        self.timings = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if self.on_stage is not None:
+            self.on_stage(name)
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            STAGE_ERRORS.inc(stage=name, input_type=self.input_type)
+            log_event('profile_failed', session_id=self.session_id, stage=name,
+                      input_type=self.input_type, error=str(e) or type(e).__name__)
+            raise
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - started
+
+    def finish(self, pages, **fields):
+        record_run(self.timings, self.input_type, pages, self.session_id, **fields)
+
+
+def record_run(timings, input_type, pages, session_id=None, **fields):
+    """
+    Records stage timings of a finished build and logs one line for it,
+    including any extra ``fields``.
+    """
+    bucket = page_bucket(pages)
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, stage=stage, input_type=input_type, pages=bucket)
+    log_event('profile_built', session_id=session_id, input_type=input_type, pages=pages,
+              stages_ms={stage: round(seconds * 1000, 1) for stage, seconds in timings.items()},
+              total_ms=round(sum(timings.values()) * 1000, 1), **fields)
+
+
+def log_event(event, **fields):
+    logger.info(json.dumps(dict(event=event, **fields), default=str))
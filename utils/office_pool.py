@@ -0,0 +1,284 @@
+"""
+Pool of warm headless LibreOffice instances used to convert Word resumes.
+
+Starting ``soffice`` costs several seconds per document, so instead of one
+process per upload we keep a few instances running, each with its own user
+profile (so they never contend for the profile lock), and hand them documents
+over a UNO pipe connection. Workers that crash or hang are restarted.
+
+The pool needs the ``uno`` bindings that ship with LibreOffice. When they are
+not importable, or the pool is disabled, ``get_office_pool()`` returns None and
+callers fall back to the one-shot ``soffice --convert-to`` subprocess.
+"""
+import atexit
+import logging
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    from com.sun.star.connection import NoConnectException
+except ImportError:  # LibreOffice python bindings are optional
+    uno = None
+
+logger = logging.getLogger(__name__)
+
+
+class OfficePoolError(RuntimeError):
+    """Raised when a document could not be converted by the pool."""
+
+
+class OfficePoolUnavailable(OfficePoolError):
+    """Raised when no LibreOffice worker can take the job."""
+
+
+class ConversionTimeout(OfficePoolError):
+    """Raised when a worker did not finish a job within its timeout."""
+
+
+def _prop(name, value):
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+
+class OfficeWorker:
+    """
+    A single headless LibreOffice process listening on a private UNO pipe.
+    """
+
+    def __init__(self, name, soffice='soffice', startup_timeout=30):
+        self.name = name
+        self.soffice = soffice
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self.profile_dir = None
+        self.desktop = None
+        self.jobs_done = 0
+
+    def start(self):
+        # Each instance gets its own profile and pipe, so several pools (one
+        # per server process) can run side by side.
+        self.profile_dir = tempfile.mkdtemp(prefix='talentwrap-lo-')
+        pipe_name = f"talentwrap_{os.getpid()}_{self.name}_{uuid.uuid4().hex[:8]}"
+        cmd = [
+            self.soffice, '--headless', '--invisible', '--nologo', '--nodefault',
+            '--norestore', '--nolockcheck',
+            f"-env:UserInstallation={Path(self.profile_dir).as_uri()}",
+            f"--accept=pipe,name={pipe_name};urp;StarOffice.ComponentContext",
+        ]
+        try:
+            self.process = subprocess.Popen(
+                cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                start_new_session=True
+            )
+        except FileNotFoundError:
+            self.stop()
+            raise OfficePoolUnavailable("LibreOffice (soffice) not found")
+        self.desktop = self._connect(pipe_name)
+        self.jobs_done = 0
+
+    def _connect(self, pipe_name):
+        local_ctx = uno.getComponentContext()
+        resolver = local_ctx.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_ctx
+        )
+        url = f"uno:pipe,name={pipe_name};urp;StarOffice.ComponentContext"
+        deadline = time.monotonic() + self.startup_timeout
+        while True:
+            if self.process.poll() is not None:
+                self.stop()
+                raise OfficePoolUnavailable("LibreOffice exited during startup")
+            try:
+                ctx = resolver.resolve(url)
+                return ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+            except NoConnectException:
+                if time.monotonic() > deadline:
+                    self.stop()
+                    raise OfficePoolUnavailable("Timed out waiting for LibreOffice to start")
+                time.sleep(0.25)
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def convert(self, input_path, output_path):
+        input_url = Path(input_path).resolve().as_uri()
+        output_url = Path(output_path).resolve().as_uri()
+        doc = self.desktop.loadComponentFromURL(
+            input_url, "_blank", 0, (_prop("Hidden", True), _prop("ReadOnly", True))
+        )
+        if doc is None:
+            raise OfficePoolError(f"LibreOffice could not open {os.path.basename(input_path)}")
+        try:
+            doc.storeToURL(output_url, (_prop("FilterName", "writer_pdf_Export"),))
+        finally:
+            doc.close(True)
+        self.jobs_done += 1
+
+    def stop(self):
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            self.desktop = None
+        if self.process is not None:
+            if self.process.poll() is None:
+                # soffice forks soffice.bin, so kill the whole process group
+                try:
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                except (ProcessLookupError, PermissionError):
+                    pass
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                pass
+            self.process = None
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+
+class OfficePool:
+    """
+    Keeps ``size`` OfficeWorkers warm and runs one conversion per worker at a
+    time. A job that exceeds ``job_timeout`` seconds gets its worker killed and
+    restarted; workers are also recycled after ``max_jobs_per_worker`` jobs to
+    keep LibreOffice's memory growth in check.
+    """
+
+    def __init__(self, size=2, job_timeout=60, acquire_timeout=120,
+                 max_jobs_per_worker=200, worker_factory=OfficeWorker):
+        self.size = size
+        self.job_timeout = job_timeout
+        self.acquire_timeout = acquire_timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.worker_factory = worker_factory
+        self._idle = queue.Queue()
+        self._workers = []
+
+    def start(self):
+        for i in range(self.size):
+            worker = self.worker_factory(f"w{i}")
+            try:
+                worker.start()
+            except OfficePoolError:
+                if not self._workers:
+                    raise
+                continue
+            self._workers.append(worker)
+            self._idle.put(worker)
+
+    def shutdown(self):
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+
+    def _restart(self, worker):
+        worker.stop()
+        try:
+            worker.start()
+        except OfficePoolError:
+            # Leave it stopped; the next job that picks it up will retry.
+            pass
+
+    def convert(self, input_path, output_path, timeout=None):
+        """
+        Converts ``input_path`` to PDF at ``output_path`` on a free worker.
+        """
+        try:
+            worker = self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise OfficePoolUnavailable("No LibreOffice worker became free")
+
+        try:
+            if not worker.is_alive() or worker.jobs_done >= self.max_jobs_per_worker:
+                self._restart(worker)
+            if not worker.is_alive():
+                raise OfficePoolUnavailable("LibreOffice worker could not be restarted")
+            self._run_with_timeout(worker, input_path, output_path, timeout or self.job_timeout)
+        except OfficePoolUnavailable:
+            raise
+        except ConversionTimeout:
+            self._restart(worker)
+            raise
+        except Exception as e:
+            # A UNO error usually means the instance is in a bad state.
+            self._restart(worker)
+            if isinstance(e, OfficePoolError):
+                raise
+            raise OfficePoolError(f"LibreOffice conversion failed: {e}") from e
+        finally:
+            self._idle.put(worker)
+
+    def _run_with_timeout(self, worker, input_path, output_path, timeout):
+        outcome = {}
+
+        def target():
+            try:
+                worker.convert(input_path, output_path)
+            except BaseException as e:
+                outcome['error'] = e
+
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        thread.join(timeout)
+        if thread.is_alive():
+            # Killing the process makes the blocked UNO call return with an error.
+            worker.stop()
+            raise ConversionTimeout(f"LibreOffice did not finish within {timeout}s")
+        if 'error' in outcome:
+            raise outcome['error']
+
+
+_pool = None
+_pool_failed = False
+_pool_lock = threading.Lock()
+
+
+def get_office_pool():
+    """
+    Returns the process-wide pool, starting it on first use.
+
+    Configured through ``SOFFICE_POOL_SIZE`` (0 disables the pool),
+    ``SOFFICE_JOB_TIMEOUT`` and ``SOFFICE_MAX_JOBS_PER_WORKER``. Returns None
+    when the pool is disabled or LibreOffice could not be started.
+    """
+    global _pool, _pool_failed
+    if _pool is not None or _pool_failed:
+        return _pool
+
+    with _pool_lock:
+        if _pool is not None or _pool_failed:
+            return _pool
+        size = int(os.environ.get('SOFFICE_POOL_SIZE', '2'))
+        if uno is None or size <= 0:
+            if uno is None and size > 0:
+                logger.warning("LibreOffice python bindings (uno) are not importable; "
+                               "Word documents are converted by one-shot soffice processes")
+            _pool_failed = True
+            return None
+        pool = OfficePool(
+            size=size,
+            job_timeout=float(os.environ.get('SOFFICE_JOB_TIMEOUT', '60')),
+            max_jobs_per_worker=int(os.environ.get('SOFFICE_MAX_JOBS_PER_WORKER', '200')),
+        )
+        try:
+            pool.start()
+        except OfficePoolError as e:
+            logger.warning("LibreOffice pool could not start (%s); using one-shot soffice processes", e)
+            _pool_failed = True
+            return None
+        atexit.register(pool.shutdown)
+        _pool = pool
+        return _pool
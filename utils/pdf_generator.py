@@ -1,195 +1,250 @@
+import contextlib
+import io
+import logging
 import os
+import pathlib
+import shutil
+import signal
 import subprocess
-import img2pdf
+import tempfile
+import threading
 from pypdf import PdfWriter, PdfReader
+from pypdf.generic import (ArrayObject, ContentStream, DecodedStreamObject, DictionaryObject, FloatObject,
+                           IndirectObject, NameObject, StreamObject)
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image as ReportLabImage
 from reportlab.lib.units import inch
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
+from utils.office_pool import get_office_pool, OfficePoolError, OfficePoolUnavailable
+from utils.images import images_to_pdf
+from utils.limits import ResumeLimits, byte_size
+from utils.summary_template import SummaryTemplate
 
-# Register Arial (using Liberation Sans as replacement in Linux)
 try:
-    # Regular
-    font_path = "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf"
-    if os.path.exists(font_path):
-        pdfmetrics.registerFont(TTFont('Arial', font_path))
+    import pikepdf
+except ImportError:  # only needed for linearized output
+    pikepdf = None
+
+logger = logging.getLogger(__name__)
+
+# Arial is replaced by Liberation Sans on Linux. Fonts are registered on first
+# use (or by warm_up()) rather than at import time, since parsing the TTF
+# files is a noticeable part of a worker's start-up.
+FONT_PATHS = {
+    'Arial': "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    'Arial-Bold': "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+}
+# Built-in fonts used when Liberation Sans is not installed
+FALLBACK_FONTS = {'Arial': 'Helvetica', 'Arial-Bold': 'Helvetica-Bold'}
+
+_fonts = None
+_fonts_lock = threading.Lock()
+
+def register_fonts():
+    """
+    Registers the TTF fonts once per process. Returns a mapping from the
+    font names used here to the name to draw with.
+    """
+    global _fonts
+    if _fonts is None:
+        with _fonts_lock:
+            if _fonts is None:
+                fonts = {}
+                for name, path in FONT_PATHS.items():
+                    try:
+                        pdfmetrics.registerFont(TTFont(name, path))
+                        fonts[name] = name
+                    except Exception:
+                        fonts[name] = FALLBACK_FONTS[name]
+                _fonts = fonts
+    return _fonts
+
+_template = None
+_template_lock = threading.Lock()
+
+def get_summary_template():
+    """
+    Returns the process-wide compiled summary layout: the JSON file named by
+    SUMMARY_LAYOUT, or the built-in layout.
+    """
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                path = os.environ.get('SUMMARY_LAYOUT')
+                _template = SummaryTemplate.from_file(path) if path else SummaryTemplate()
+    return _template
+
+def generate_summary_pdf(data, output_path, template=None):
+    """
+    Generates a PDF summary matching the specific table layout.
+    ``output_path`` may be a file path or a writable binary file object;
+    ``template`` is a SummaryTemplate (default: get_summary_template()).
+    """
+    (template or get_summary_template()).render(data, output_path)
+
+def _is_path(obj):
+    return isinstance(obj, (str, os.PathLike))
+
+def _read_bytes(source):
+    """
+    Returns the contents of a path, bytes object or binary file object.
+    """
+    if _is_path(source):
+        with open(source, "rb") as f:
+            return f.read()
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    return source.read()
+
+def _write_bytes(output, data):
+    if _is_path(output):
+        with open(output, "wb") as f:
+            f.write(data)
     else:
-        pdfmetrics.registerFont(TTFont('Arial', 'Helvetica'))
-    
-    # Bold
-    font_bold_path = "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf"
-    if os.path.exists(font_bold_path):
-        pdfmetrics.registerFont(TTFont('Arial-Bold', font_bold_path))
+        output.write(data)
+
+def _copy(source, output):
+    """
+    Copies a path, bytes or binary file object to a path or file object in
+    chunks, without holding the whole document in memory.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        _write_bytes(output, source)
+    elif _is_path(source) and _is_path(output):
+        shutil.copyfile(source, output)
     else:
-        pdfmetrics.registerFont(TTFont('Arial-Bold', 'Helvetica-Bold'))
-except Exception:
-    pass
+        with contextlib.ExitStack() as stack:
+            src = stack.enter_context(open(source, "rb")) if _is_path(source) else source
+            dst = stack.enter_context(open(output, "wb")) if _is_path(output) else output
+            shutil.copyfileobj(src, dst)
 
-def generate_summary_pdf(data, output_path):
+def _pdf_source(source):
     """
-    Generates a PDF summary matching the specific table layout.
+    PdfReader accepts paths and seekable streams; wrap raw bytes.
     """
-    # Set small margins to allow more content on the first page
-    doc = SimpleDocTemplate(
-        output_path, 
-        pagesize=letter,
-        topMargin=0.3*inch,
-        bottomMargin=0.3*inch,
-        leftMargin=0.3*inch,
-        rightMargin=0.3*inch
-    )
-    story = []
-    styles = getSampleStyleSheet()
-
-    # 1. Header Space (Header is now handled by overlay)
-    # Removed spacer to minimize empty space before title
-    
-    # Title: PROFILE SUMMARY
-    title_style = ParagraphStyle(
-        'ProfileSummary',
-        parent=styles['Heading2'],
-        fontSize=16,
-        alignment=1, # Center
-        spaceAfter=5,
-        fontName='Helvetica-Bold',
-        textColor=colors.black
-    )
-    story.append(Paragraph("PROFILE SUMMARY", title_style))
-    story.append(Spacer(1, 5))
-
-    # 2. Data Table
-    # Columns: SNO, Evaluation Criteria, Detail
-    table_data = [
-        ["SNO", "Evaluation Criteria", "Detail"] # Header Row
-    ]
-
-    # Custom style for table content to increase font size
-    table_content_style = ParagraphStyle(
-        'TableContent',
-        parent=styles['BodyText'],
-        fontSize=12,
-        leading=13
-    )
-
-    # Field Mapping (Order matters)
-    all_fields = [
-        ("1", "Candidate Name", data.get('candidate_name', '')),
-        ("2", "Department/Function", data.get('department', '')),
-        ("3", "Phone No", data.get('phone', '')),
-        ("4", "Email", data.get('email', '')),
-        ("5", "Current location", data.get('location', '')),
-        ("6", "Age", data.get('age', '')),
-        ("7", "Education Qualification", data.get('education', '')),
-        ("8", "Technical Expertise", data.get('tech_expertise', '')),
-        ("9", "Industry Exposure", data.get('industry', '')),
-        ("10", "Current Company", data.get('current_company', '')),
-        ("11", "Product Selling", data.get('product_selling', '')),
-        ("12", "Ticket Size", data.get('ticket_size', '')),
-        ("13", "Current Company’s Annual\nSales Target", data.get('sales_target', '')),
-        ("14", "Achieved Sales Target", data.get('sales_achieved', '')),
-        ("15", "Communication", data.get('communication', '')),
-        ("16", "Reason for the job change", data.get('reason_change', '')),
-        ("17", "Total Experience", data.get('total_exp', '')),
-        ("18", "Current salary(Per month)", data.get('current_salary', '')),
-        ("19", "Expected Salary (Per month)", data.get('expected_salary', '')),
-        ("20", "Notice Period", data.get('notice_period', '')),
-        ("21", "Remarks if any", data.get('remarks', ''))
-    ]
-
-    # Filter out empty fields (except for required ones, but here we just check if value exists)
-    # We re-number them based on visible fields
-    visible_fields = []
-    counter = 1
-    for _, label, value in all_fields:
-        if value and str(value).strip():
-            visible_fields.append((str(counter), label, value))
-            counter += 1
-
-    for sno, label, value in visible_fields:
-        # Wrap text
-        label_p = Paragraph(label, table_content_style)
-        value_p = Paragraph(str(value), table_content_style)
-        table_data.append([sno, label_p, value_p])
-
-    # Table Styling
-    # Col widths: SNO (0.5), Evaluation Criteria (3.0), Detail (3.5)
-    t = Table(table_data, colWidths=[0.5*inch, 3*inch, 3.5*inch])
-    t.setStyle(TableStyle([
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('BACKGROUND', (0, 0), (-1, 0), colors.whitesmoke), # Header bg
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('ALIGN', (0, 0), (0, -1), 'CENTER'), # Center SNO
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('TOPPADDING', (0, 0), (-1, -1), 7),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 7), # Reverted to previous stable value
-        ('LEFTPADDING', (0, 0), (-1, -1), 10),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-    ]))
-    story.append(t)
-
-    # Footer (Now handled by overlay)
-    # story.append(Spacer(1, 30))
-    
-    doc.build(story)
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return source
 
-def convert_to_pdf(input_path, output_path):
+def page_count(source):
+    """
+    Number of pages of a PDF (path, bytes or seekable stream). Only the
+    cross-reference table and page tree are read, not the pages.
+    """
+    return len(PdfReader(_pdf_source(source)).pages)
+
+def convert_to_pdf(input_path, output_path, filename=None):
     """
     Converts the input file (Image or Docx) to PDF.
+
+    ``input_path`` and ``output_path`` may also be bytes / binary file
+    objects, in which case ``filename`` supplies the original name used to
+    detect the format. Only Word documents touch the disk (LibreOffice needs
+    a real file), and then only inside a private temporary directory.
     """
-    ext = os.path.splitext(input_path)[1].lower()
+    name = filename or (input_path if _is_path(input_path) else getattr(input_path, 'name', ''))
+    ext = os.path.splitext(str(name))[1].lower()
 
     if ext == '.pdf':
+        # Already a PDF: pass it through untouched
         if input_path != output_path:
-             reader = PdfReader(input_path)
-             writer = PdfWriter()
-             for page in reader.pages:
-                 writer.add_page(page)
-             with open(output_path, "wb") as f:
-                 writer.write(f)
+            _copy(input_path, output_path)
         return
 
     if ext in ['.jpg', '.jpeg', '.png']:
-        with open(output_path, "wb") as f:
-            f.write(img2pdf.convert(input_path))
+        _write_bytes(output_path, images_to_pdf([_read_bytes(input_path)]))
         return
 
     if ext in ['.docx', '.doc']:
-        try:
-            out_dir = os.path.dirname(output_path)
-            cmd = ['soffice', '--headless', '--convert-to', 'pdf', input_path, '--outdir', out_dir]
-            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            base_name = os.path.splitext(os.path.basename(input_path))[0]
-            generated_pdf = os.path.join(out_dir, base_name + '.pdf')
-            
-            if generated_pdf != output_path:
-                if os.path.exists(output_path):
-                    os.remove(output_path)
-                os.rename(generated_pdf, output_path)
-                
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            raise RuntimeError("LibreOffice not found or failed. Please run in Docker for Word support.")
+        if _is_path(input_path) and _is_path(output_path):
+            _convert_word_file(input_path, output_path)
+            return
+        with tempfile.TemporaryDirectory(prefix='talentwrap-') as tmp_dir:
+            tmp_input = os.path.join(tmp_dir, 'resume' + ext)
+            tmp_output = os.path.join(tmp_dir, 'resume.pdf')
+            _write_bytes(tmp_input, _read_bytes(input_path))
+            _convert_word_file(tmp_input, tmp_output)
+            _write_bytes(output_path, _read_bytes(tmp_output))
         return
 
     raise ValueError(f"Unsupported file format: {ext}")
 
-    with open(output_path, "wb") as f:
-        writer.write(f)
+def convert_images_to_pdf(sources, output_path):
+    """
+    Converts several images (paths, bytes or binary file objects, one resume
+    page each) to a single PDF, in order.
+    """
+    _write_bytes(output_path, images_to_pdf([_read_bytes(source) for source in sources]))
+
+def _convert_word_file(input_path, output_path):
+    """
+    Converts a .doc/.docx file on disk with LibreOffice.
+    """
+    pool = get_office_pool()
+    if pool is not None:
+        try:
+            pool.convert(input_path, output_path)
+            return
+        except OfficePoolUnavailable:
+            pass  # fall back to the one-shot soffice process below
+        except OfficePoolError as e:
+            raise RuntimeError(f"LibreOffice failed to convert the document: {e}")
+
+    # A private user profile per run: instances sharing the default profile
+    # lock each other out, and the loser exits without writing anything
+    profile_dir = tempfile.mkdtemp(prefix='talentwrap-lo-')
+    try:
+        out_dir = os.path.dirname(output_path)
+        cmd = ['soffice', '--headless', f"-env:UserInstallation={pathlib.Path(profile_dir).as_uri()}",
+               '--convert-to', 'pdf', input_path, '--outdir', out_dir]
+        _run_soffice(cmd, float(os.environ.get('SOFFICE_JOB_TIMEOUT', '60')))
+
+        base_name = os.path.splitext(os.path.basename(input_path))[0]
+        generated_pdf = os.path.join(out_dir, base_name + '.pdf')
+        
+        if generated_pdf != output_path:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            os.rename(generated_pdf, output_path)
+            
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        raise RuntimeError("LibreOffice not found or failed. Please run in Docker for Word support.")
+    finally:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+def _run_soffice(cmd, timeout):
+    """
+    Runs a one-shot soffice command in its own process group. soffice forks
+    soffice.bin, so on timeout the whole group is killed, not just the
+    launcher.
+    """
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+    try:
+        process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        with contextlib.suppress(ProcessLookupError, PermissionError):
+            os.killpg(process.pid, signal.SIGKILL)
+        process.communicate()
+        raise RuntimeError(f"LibreOffice did not finish within {timeout:g}s")
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+
+LOGO_PATH = "static/images/logo.jpg"
+FOOTER_TEXT = "Triumph consultants"
 
-def create_overlay(output_path):
+def create_overlay(output, logo_path=LOGO_PATH, footer_text=FOOTER_TEXT):
     """
     Creates a single-page PDF with the Header (Logo) and Footer.
+    ``output`` may be a file path or a writable binary file object.
     """
-    c = canvas.Canvas(output_path, pagesize=letter)
+    c = canvas.Canvas(output, pagesize=letter)
     width, height = letter
 
     # Header (Logo)
-    logo_path = os.path.abspath("static/images/logo.jpg")
+    logo_path = os.path.abspath(logo_path)
     if os.path.exists(logo_path):
         # Draw image at top left (x=30, y=height-100)
         # Reduced size to prevent pixelation: Width 1.5 inch
@@ -200,57 +255,279 @@ def create_overlay(output_path):
         c.drawString(30, height - 50, "Triumph Consultants")
 
     # Footer
-    footer_text = "Triumph consultants"
     # Use Arial-Bold for a bolder look
-    c.setFont("Arial-Bold", 13)
+    footer_font = register_fonts()['Arial-Bold']
+    c.setFont(footer_font, 13)
     c.setFillColor(colors.HexColor('#222222')) # Grayish black
     c.setStrokeColor(colors.HexColor('#00008B')) # Darker Blue underline
     c.setLineWidth(3) # 3/4th of 5.0pt as requested
     
-    text_width = c.stringWidth(footer_text, "Arial-Bold", 13)
+    text_width = c.stringWidth(footer_text, footer_font, 13)
     c.drawString(30, 30, footer_text)
     # Draw the underline slightly below the text
     c.line(30, 24, 30 + text_width, 24) 
     
     c.save()
 
-def merge_pdfs(summary_path, resume_path, output_path):
+def _resolve_all(obj, seen=None):
+    """
+    Loads every object reachable from ``obj`` into the reader's cache, so that
+    later reads never touch the underlying stream (which is not thread-safe).
+    """
+    if seen is None:
+        seen = set()
+    if isinstance(obj, IndirectObject):
+        if obj.idnum in seen:
+            return
+        seen.add(obj.idnum)
+        obj = obj.get_object()
+    if isinstance(obj, StreamObject):
+        obj.get_data()
+    if isinstance(obj, DictionaryObject):
+        for value in obj.values():
+            _resolve_all(value, seen)
+    elif isinstance(obj, ArrayObject):
+        for value in obj:
+            _resolve_all(value, seen)
+
+class OverlayCache:
+    """
+    Process-wide cache of the header/footer overlay page.
+
+    The overlay is rendered in memory once and rebuilt only when the logo file
+    or the footer text changes. The cached page is fully loaded up front, so
+    it can be merged from several threads at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entry = None  # (key, page)
+
+    def _key(self, logo_path, footer_text):
+        path = os.path.abspath(logo_path)
+        try:
+            st = os.stat(path)
+            logo = (path, st.st_mtime_ns, st.st_size)
+        except OSError:
+            logo = (path, None, None)
+        return (logo, footer_text)
+
+    def get_page(self, logo_path=LOGO_PATH, footer_text=FOOTER_TEXT):
+        key = self._key(logo_path, footer_text)
+        entry = self._entry
+        if entry is not None and entry[0] == key:
+            return entry[1]
+
+        with self._lock:
+            entry = self._entry
+            if entry is None or entry[0] != key:
+                buffer = io.BytesIO()
+                create_overlay(buffer, logo_path, footer_text)
+                buffer.seek(0)
+                page = PdfReader(buffer).pages[0]
+                _resolve_all(page.indirect_reference)
+                entry = (key, page)
+                self._entry = entry
+            return entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entry = None
+
+overlay_cache = OverlayCache()
+
+def get_overlay_page():
+    """
+    Returns the shared header/footer overlay page.
+    """
+    return overlay_cache.get_page()
+
+def warm_up():
+    """
+    Does the one-off work of the first profile up front: fonts, the summary
+    template, reportlab's lazily loaded modules (by rendering a throwaway
+    summary) and the overlay page.
+    """
+    register_fonts()
+    get_summary_template()
+    generate_summary_pdf({'candidate_name': 'Warm-up'}, io.BytesIO())
+    get_overlay_page()
+
+OVERLAY_XOBJECT = NameObject('/TwOverlay')
+
+def _add_overlay_xobject(writer, overlay_page):
+    """
+    Adds the overlay to ``writer`` as a form XObject and returns a reference
+    to it. Every page draws that one object, so the logo and footer are
+    stored once per document instead of once per page.
+    """
+    form = DecodedStreamObject()
+    form.set_data(overlay_page.get_contents().get_data())
+    form.update({
+        NameObject('/Type'): NameObject('/XObject'),
+        NameObject('/Subtype'): NameObject('/Form'),
+        NameObject('/BBox'): ArrayObject(FloatObject(value) for value in overlay_page.mediabox),
+        NameObject('/Resources'): overlay_page['/Resources'].clone(writer),
+    })
+    return writer._add_object(form)
+
+PAGE_XOBJECT = NameObject('/TwPage')
+
+def _page_xobject(writer, page):
+    """
+    Adds a source page to ``writer`` as a form XObject and returns a
+    reference to it. The content stream is copied still encoded and the
+    page's images and fonts are shared, so nothing is decoded or re-parsed.
+    """
+    contents = page.get('/Contents')
+    contents = contents.get_object() if contents is not None else None
+    if isinstance(contents, StreamObject):
+        form = contents.clone(writer, force_duplicate=True)
+    else:
+        # No content, or several streams that have to be joined
+        form = DecodedStreamObject()
+        form.set_data(page.get_contents().get_data() if contents is not None else b'')
+        form = writer._add_object(form).get_object()
+    resources = page.get('/Resources')
+    form.update({
+        NameObject('/Type'): NameObject('/XObject'),
+        NameObject('/Subtype'): NameObject('/Form'),
+        NameObject('/BBox'): ArrayObject(FloatObject(value) for value in page.mediabox),
+        NameObject('/Resources'): resources.clone(writer) if resources is not None else DictionaryObject(),
+    })
+    return form.indirect_reference
+
+def _transform_points(values, matrix):
+    a, b, c, d, e, f = matrix
+    points = []
+    for x, y in zip(values[0::2], values[1::2]):
+        x, y = float(x), float(y)
+        points += [a * x + c * y + e, b * x + d * y + f]
+    return points
+
+def _copy_annotations(writer, page, new_page, matrix):
+    """
+    Copies the source page's annotations (hyperlinks above all) onto its
+    composed page, moved and scaled by ``matrix`` like the content. Links
+    to pages of the source document and form fields cannot follow the page
+    into the profile and are left out.
+    """
+    annotations = ArrayObject()
+    for annotation in page.get('/Annots') or []:
+        annotation = annotation.get_object()
+        if annotation.get('/Subtype') in ('/Widget', '/Popup') or '/Dest' in annotation:
+            continue
+        action = annotation.get('/A')
+        if action is not None and action.get_object().get('/S') == '/GoTo':
+            continue
+        copy = annotation.clone(writer, force_duplicate=True, ignore_fields=('/P', '/Parent', '/Popup'))
+        # All four corners, so the rectangle stays right under any matrix
+        corners = _transform_points([annotation['/Rect'][i] for i in (0, 1, 2, 1, 0, 3, 2, 3)], matrix)
+        xs, ys = corners[0::2], corners[1::2]
+        copy[NameObject('/Rect')] = ArrayObject(FloatObject(v) for v in (min(xs), min(ys), max(xs), max(ys)))
+        if '/QuadPoints' in annotation:
+            copy[NameObject('/QuadPoints')] = ArrayObject(
+                FloatObject(v) for v in _transform_points(annotation['/QuadPoints'], matrix))
+        copy[NameObject('/P')] = new_page.indirect_reference
+        annotations.append(copy.indirect_reference)
+    if annotations:
+        new_page[NameObject('/Annots')] = annotations
+
+def _compose_page(writer, page_ref, matrix, overlay_ref, width, height, source_page=None):
+    """
+    Adds an output page that draws ``page_ref`` transformed by ``matrix``
+    with the shared overlay on top, keeping ``source_page``'s annotations.
+    """
+    new_page = writer.add_blank_page(width=width, height=height)
+    new_page[NameObject('/Resources')] = DictionaryObject({
+        NameObject('/XObject'): DictionaryObject({PAGE_XOBJECT: page_ref, OVERLAY_XOBJECT: overlay_ref}),
+    })
+    cm = ' '.join(f"{value:.6f}".rstrip('0').rstrip('.') for value in matrix)
+    stream = ContentStream(None, None)
+    stream.set_data(f"q {cm} cm {PAGE_XOBJECT} Do Q q {OVERLAY_XOBJECT} Do Q\n".encode())
+    new_page.replace_contents(stream)
+    if source_page is not None:
+        _copy_annotations(writer, source_page, new_page, matrix)
+    return new_page
+
+def _compact(writer):
+    """
+    Compresses content streams, merges identical objects (images and fonts
+    repeated in the source resume, copies of the overlay) and drops objects
+    nothing refers to any more.
+    """
+    for page in writer.pages:
+        page.compress_content_streams()
+    writer.compress_identical_objects(remove_duplicates=True, remove_unreferenced=True)
+
+def _linearize(data):
+    """
+    Rewrites a PDF linearized ("fast web view"), so a viewer fetching it with
+    range requests can show the first page before the rest has arrived. The
+    result is checked with qpdf; if pikepdf is missing or the check fails the
+    PDF is returned unchanged.
+    """
+    if pikepdf is None:
+        logger.warning("pikepdf is not installed; writing the profile without linearization")
+        return data
+    output = io.BytesIO()
+    with pikepdf.open(io.BytesIO(data)) as pdf:
+        pdf.save(output, linearize=True)
+    linearized = output.getvalue()
+    problems = io.StringIO()
+    with pikepdf.open(io.BytesIO(linearized)) as pdf:
+        valid = pdf.is_linearized and pdf.check_linearization(problems)
+    if not valid:
+        logger.warning("linearized profile failed validation, writing it unlinearized: %s", problems.getvalue())
+        return data
+    return linearized
+
+def merge_pdfs(summary_path, resume_path, output_path, resume_prepared=False, resume_start=0, linearize=False,
+               limits=None, outline=None):
     """
     Merges summary and resume, applying header/footer overlay to ALL pages.
     Scales content pages to fit within margins to avoid overlap.
-    """
-    from pypdf import Transformation
+    Inputs and output may be file paths or binary file objects.
+    ``resume_path`` may also be a list of documents (a candidate packet:
+    resume, certificates, offer letters...), placed in order in one pass.
+
+    Each source page is placed on its output page as a form XObject, so its
+    content is never decoded and memory stays close to the size of the
+    inputs whatever the page count. ``limits`` (a ResumeLimits) is checked
+    against the total page count before any page is processed.
+
+    ``outline``, a list of titles (one per document), adds a bookmark for
+    the summary and for the first page of each document.
 
+    With ``resume_prepared`` the resume pages (from ``resume_start`` on) are
+    taken from an earlier merge output and copied as they are, along with
+    its bookmarks, so editing a profile only re-renders the summary. With
+    ``linearize`` the output is written linearized (see _linearize()).
+    Returns the page counts, the number of resume pages dropped by
+    truncation, and the combined input size against the (compacted) output
+    size.
+    """
     writer = PdfWriter()
     
-    # Generate Overlay
-    overlay_path = os.path.join(os.path.dirname(output_path), "overlay.pdf")
-    create_overlay(overlay_path)
-    reader_overlay = PdfReader(overlay_path)
-    overlay_page = reader_overlay.pages[0]
+    # Shared overlay (built once per process, see OverlayCache), embedded
+    # once in this document
+    overlay_ref = _add_overlay_xobject(writer, get_overlay_page())
 
     # Helper to process and add pages
-    def add_pages_with_overlay(reader, base_scale=0.83, ty_val=35):
+    def add_pages_with_overlay(pages, base_scale=0.83, ty_val=35):
         target_w, target_h = 612, 792 # Letter size
         # Safe area: 
         # Bottom: ty_val (e.g., 45)
         # Top: target_h - 110 (e.g., 682) to stay well below logo
         safe_h = (target_h - 110) - ty_val 
 
-        for page in reader.pages:
-            # Create a blank Letter-sized page
-            new_page = writer.add_blank_page(width=target_w, height=target_h)
-            
+        for page in pages:
             # Original dimensions and origin
             orig_w = float(page.mediabox.width)
             orig_h = float(page.mediabox.height)
             orig_left = float(page.mediabox.left)
             orig_bottom = float(page.mediabox.bottom)
 
-            # 1. Normalize origin to (0,0)
-            page.add_transformation(Transformation().translate(tx=-orig_left, ty=-orig_bottom))
-            
-            # 2. Calculate scale factor
             # Scale to fit width (user's preferred proportion)
             scale_w = base_scale * (target_w / orig_w)
             # Scale to fit height (stay within safe_h)
@@ -259,42 +536,73 @@ def merge_pdfs(summary_path, resume_path, output_path):
             # Use the smaller of the two to ensure it fits both ways
             scale_factor = min(scale_w, scale_h)
             
-            # 3. Calculate tx to center horizontally
+            # Center horizontally; the origin is normalized to (0,0) first
             tx = (target_w - (orig_w * scale_factor)) / 2
             ty = ty_val
-            
-            # Apply transformation
-            op = Transformation().scale(scale_factor).translate(tx=tx, ty=ty)
-            page.add_transformation(op)
-            
-            # Merge scaled content
-            new_page.merge_page(page)
-            
-            # Merge overlay (header/footer) on top
-            new_page.merge_page(overlay_page)
-
-    # Add Summary (Already has header/footer from generate_summary_pdf, 
-    # but user wants "Every page". 
-    # Actually, generate_summary_pdf already adds them using ReportLab. 
-    # If we overlay again, it will double up.
-    # So for summary, we might NOT need to scale/overlay if it's already correct.
-    # BUT, to be consistent, maybe we should remove header/footer from generate_summary_pdf 
-    # and use this global overlay? 
-    # Let's keep generate_summary_pdf as is for now, assuming it's Page 1 and looks good.
-    # The user said "Every page". 
-    # Let's apply the overlay ONLY to the resume pages.
-    
+            matrix = (scale_factor, 0, 0, scale_factor,
+                      tx - orig_left * scale_factor, ty - orig_bottom * scale_factor)
+
+            _compose_page(writer, _page_xobject(writer, page), matrix, overlay_ref, target_w, target_h,
+                          source_page=page)
+
     # Add Summary (Using previous stable scaling/position)
-    reader_summary = PdfReader(summary_path)
-    add_pages_with_overlay(reader_summary, base_scale=0.83, ty_val=35)
+    reader_summary = PdfReader(_pdf_source(summary_path))
+    add_pages_with_overlay(reader_summary.pages, base_scale=0.83, ty_val=35)
 
     # Add Resume (Using new scaling/position to avoid header overlap)
-    reader_resume = PdfReader(resume_path)
-    add_pages_with_overlay(reader_resume, base_scale=0.78, ty_val=45)
+    documents = resume_path if isinstance(resume_path, list) else [resume_path]
+    readers = [PdfReader(_pdf_source(document)) for document in documents]
+    summary_pages = len(reader_summary.pages)
+    truncated = 0
+    bookmarks = []
+    if resume_prepared:
+        # Already scaled and overlaid by a previous merge
+        reader_resume = readers[0]
+        for page in reader_resume.pages[resume_start:]:
+            writer.add_page(page)
+        # Bookmarks follow their pages; the summary may now be longer or shorter
+        for item in reader_resume.outline:
+            if isinstance(item, list):
+                continue
+            number = reader_resume.get_destination_page_number(item)
+            bookmarks.append((item.title, number - resume_start + summary_pages if number >= resume_start else 0))
+    else:
+        count = sum(len(reader.pages) for reader in readers)
+        keep = (limits or ResumeLimits()).pages_to_keep(count)
+        truncated = count - keep
+        titles = outline or [None] * len(readers)
+        if outline:
+            bookmarks.append(('Summary', 0))
+        for title, reader in zip(titles, readers):
+            pages = reader.pages[:keep]
+            if outline and len(pages):
+                bookmarks.append((title, len(writer.pages)))
+            add_pages_with_overlay(pages, base_scale=0.78, ty_val=45)
+            keep -= len(pages)
+    for title, number in bookmarks:
+        writer.add_outline_item(title, number)
+    if bookmarks:
+        writer.page_mode = '/UseOutlines'
 
-    with open(output_path, "wb") as f:
-        writer.write(f)
-    
-    # Cleanup
-    if os.path.exists(overlay_path):
-        os.remove(overlay_path)
+    _compact(writer)
+    if linearize:
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        data = _linearize(buffer.getvalue())
+        _write_bytes(output_path, data)
+        output_bytes = len(data)
+    elif _is_path(output_path):
+        writer.write(output_path)
+        output_bytes = os.path.getsize(output_path)
+    else:
+        start = output_path.tell() if hasattr(output_path, 'tell') else None
+        writer.write(output_path)
+        output_bytes = output_path.tell() - start if start is not None else None
+    input_sizes = (byte_size(summary_path), byte_size(documents))
+    return {
+        'summary_pages': summary_pages,
+        'resume_pages': len(writer.pages) - summary_pages,
+        'resume_pages_truncated': truncated,
+        'input_bytes': None if None in input_sizes else sum(input_sizes),
+        'output_bytes': output_bytes,
+    }
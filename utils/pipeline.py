@@ -0,0 +1,258 @@
+"""
+End-to-end profile generation: summary page, resume conversion and merge.
+"""
+import contextlib
+import fcntl
+import io
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from utils.conversion_cache import CACHED_EXTENSIONS, IMAGE_EXTENSIONS
+from utils.metrics import PipelineTrace
+
+FORM_FIELDS = [
+    'candidate_name', 'department', 'phone', 'email', 'location', 'age',
+    'education', 'tech_expertise', 'industry', 'current_company',
+    'product_selling', 'ticket_size', 'sales_target', 'sales_achieved',
+    'communication', 'reason_change', 'total_exp', 'current_salary',
+    'expected_salary', 'notice_period', 'remarks',
+]
+
+STAGES = ['summary', 'convert', 'merge']
+
+WORD_EXTENSIONS = ('.doc', '.docx')
+
+
+def convert_workers():
+    """
+    Documents of one packet converted at once (CONVERT_WORKERS, default 4).
+    Word documents of a packet are converted one at a time: the build holds
+    a single 'word' admission slot (see utils.admission).
+    """
+    return max(1, int(os.environ.get('CONVERT_WORKERS', '4')))
+
+
+def _known_pages(pdf_generator, documents):
+    """
+    Pages of the documents that can be counted without converting them:
+    PDFs (from their page tree) and images (one page each). Word documents
+    are only counted once converted.
+    """
+    pages = 0
+    for source, name in documents:
+        ext = os.path.splitext(name)[1].lower()
+        if isinstance(source, list):
+            pages += len(source)
+        elif ext in IMAGE_EXTENSIONS:
+            pages += 1
+        elif ext == '.pdf':
+            try:
+                pages += pdf_generator.page_count(source)
+            except Exception:
+                # Unreadable: left for the merge to report
+                pass
+    return pages
+
+
+def _convert(pdf_generator, source, filename, cache=None, limits=None, word_lock=None):
+    """
+    Converts one document of a profile to PDF. Returns ``(converted,
+    conversion_cache, dropped)``: a PDF source for merge_pdfs(), 'hit',
+    'miss' or 'skip', and how many images of a multi-image resume were left
+    out by the page limit. Word conversions hold ``word_lock``, if given.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if isinstance(source, list):
+        # Cut (or refuse) before decoding images that would be dropped
+        keep = limits.pages_to_keep(len(source)) if limits is not None else len(source)
+        converted = io.BytesIO()
+        pdf_generator.convert_images_to_pdf(source[:keep], converted)
+        converted.seek(0)
+        return converted, 'skip', len(source) - keep
+    if ext == '.pdf':
+        # Nothing to convert: the upload is merged as it is
+        return pdf_generator._pdf_source(source), 'skip', 0
+    status = 'skip'
+    converted = io.BytesIO()
+    guard = word_lock if word_lock is not None and ext in WORD_EXTENSIONS else contextlib.nullcontext()
+    if cache is not None and ext in CACHED_EXTENSIONS:
+        data = pdf_generator._read_bytes(source)
+        key = cache.key(data, ext)
+        cached = cache.get(key)
+        if cached is not None:
+            converted = io.BytesIO(cached)
+            status = 'hit'
+        else:
+            with guard:
+                pdf_generator.convert_to_pdf(data, converted, filename=filename)
+            cache.put(key, converted.getvalue())
+            status = 'miss'
+    else:
+        with guard:
+            pdf_generator.convert_to_pdf(source, converted, filename=filename)
+    converted.seek(0)
+    return converted, status, 0
+
+
+def build_profile(form_data, resume, filename, output, on_stage=None, cache=None, trace=None, linearize=False,
+                  limits=None, attachments=None, outline=False):
+    """
+    Builds the final profile PDF entirely in memory.
+
+    ``resume`` is the uploaded document (a path, bytes or a binary file
+    object) and ``filename`` its original name. A list of images, one per
+    resume page, is converted to a single document. ``attachments``, a list
+    of ``(document, filename)`` pairs in any supported format, are merged
+    after the resume in order; the documents are converted concurrently
+    (see convert_workers()). With ``outline`` the profile gets a bookmark
+    per document. Intermediate PDFs live in buffers; only ``output`` (a path
+    or a binary file object) is written. ``on_stage``, if given, is called
+    with each name in STAGES as that stage starts. With a ConversionCache as
+    ``cache``, converted documents are looked up by content before
+    converting. Stage timings are recorded on ``trace`` (a
+    metrics.PipelineTrace; one is created if not given). With ``linearize``
+    the output is written for fast web view. ``limits`` (a ResumeLimits) is
+    checked against the uploads before any work is done (sizes, and the
+    pages of PDFs and images) and against the converted documents;
+    exceeding it raises DocumentTooLarge.
+
+    Returns a dict describing the run; ``conversion_cache`` is 'hit', 'miss'
+    or 'skip' (no cache, or a format that is not cached) for the resume,
+    ``timings`` maps each stage to its duration in seconds, and
+    ``input_bytes`` / ``output_bytes`` compare the merged PDFs with the
+    compacted result.
+    """
+    from utils import pdf_generator  # heavy; imported on first use, see utils.warmup
+
+    if trace is None:
+        trace = PipelineTrace(filename)
+    if on_stage is not None:
+        trace.on_stage = on_stage
+
+    documents = [(resume, filename)] + list(attachments or [])
+    if limits is not None:
+        limits.check_size([source for source, name in documents])
+        if limits.max_pages and not limits.truncate:
+            # Refused before the summary is rendered; cutting is left to the merge
+            limits.pages_to_keep(_known_pages(pdf_generator, documents))
+
+    with trace.stage('summary'):
+        summary = io.BytesIO()
+        pdf_generator.generate_summary_pdf(form_data, summary)
+        summary.seek(0)
+
+    with trace.stage('convert'):
+        if len(documents) == 1:
+            results = [_convert(pdf_generator, resume, filename, cache, limits)]
+        else:
+            word_lock = threading.Lock()
+            with ThreadPoolExecutor(max_workers=min(len(documents), convert_workers())) as pool:
+                results = list(pool.map(lambda document: _convert(pdf_generator, *document, cache, limits,
+                                                                  word_lock), documents))
+        converted = [result[0] for result in results]
+        if limits is not None:
+            limits.check_size(converted)
+
+    with trace.stage('merge'):
+        titles = ['Resume'] + [os.path.basename(name) for source, name in documents[1:]] if outline else None
+        info = pdf_generator.merge_pdfs(summary, converted if attachments else converted[0], output,
+                                        linearize=linearize, limits=limits, outline=titles)
+    info['conversion_cache'] = results[0][1]
+    info['resume_pages_truncated'] += results[0][2]
+    info['documents'] = len(documents)
+
+    trace.finish(info['resume_pages'], input_bytes=info['input_bytes'], output_bytes=info['output_bytes'])
+    info['timings'] = dict(trace.timings)
+    return info
+
+
+def profile_name(session_id):
+    return f"TalentWrap_Profile_{session_id}.pdf"
+
+
+def record_name(session_id):
+    return f"{session_id}_form.json"
+
+
+def lock_name(session_id):
+    return f"{record_name(session_id)}.lock"
+
+
+@contextlib.contextmanager
+def profile_lock(folder, session_id):
+    """
+    Serialises changes to one profile across threads and processes. Hold it
+    from reading the record until the new PDF and record are both in place.
+    """
+    with open(os.path.join(folder, lock_name(session_id)), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _record_path(folder, session_id):
+    return os.path.join(folder, record_name(session_id))
+
+
+def save_profile_record(folder, session_id, form_data, info):
+    """
+    Stores what is needed to edit a profile later: the form data and how many
+    leading pages of the final PDF belong to the summary, plus the earlier
+    profiles it was flagged as a possible duplicate of (``info``'s
+    ``possible_duplicates``, if any).
+    """
+    path = _record_path(folder, session_id)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    record = {'form_data': form_data, 'summary_pages': info['summary_pages']}
+    if info.get('possible_duplicates'):
+        record['possible_duplicates'] = info['possible_duplicates']
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(record, f)
+    os.replace(tmp_path, path)
+
+
+def load_profile_record(folder, session_id):
+    try:
+        with open(_record_path(folder, session_id), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def update_profile(folder, session_id, form_data, linearize=False):
+    """
+    Re-renders only the summary of an existing profile. The converted and
+    overlaid resume pages are copied from the current final PDF, so the cost
+    does not depend on the resume's length.
+
+    Raises FileNotFoundError when the profile or its record no longer exists.
+    """
+    from utils import pdf_generator
+    final_path = os.path.join(folder, profile_name(session_id))
+    # The record's summary_pages must describe the PDF the pages are copied
+    # from, so no other edit may replace either until this one is done
+    with profile_lock(folder, session_id):
+        record = load_profile_record(folder, session_id)
+        if record is None or not os.path.exists(final_path):
+            raise FileNotFoundError(f"No editable profile for session {session_id}")
+
+        summary = io.BytesIO()
+        pdf_generator.generate_summary_pdf(form_data, summary)
+        summary.seek(0)
+
+        # Write next to the old file and swap, so downloads never see a partial PDF
+        tmp_path = f"{final_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            info = pdf_generator.merge_pdfs(summary, final_path, tmp_path, resume_prepared=True,
+                                           resume_start=record['summary_pages'], linearize=linearize)
+            os.replace(tmp_path, final_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        info['possible_duplicates'] = record.get('possible_duplicates')
+        save_profile_record(folder, session_id, form_data, info)
+    return info
@@ -0,0 +1,59 @@
+"""
+Opt-in profiling of single profile builds.
+
+A request is profiled when it asks for it (``X-Profile: 1`` header or
+``profile=1`` query parameter) or when it is picked by the configured sample
+rate. Its build then runs under cProfile and the stats are written next to
+the profile as ``{session_id}_profile.pstats``, which loads in pstats,
+snakeviz, gprof2dot or flameprof. Requests that are not profiled only pay
+for the flag check.
+
+Only one build per process is profiled at a time (on Python 3.12+ cProfile
+cannot run twice at once); a build asking while another is being profiled
+runs unprofiled. cProfile only sees the request thread, so image and packet
+conversions run on worker threads show up as the time spent waiting for
+them.
+"""
+import contextlib
+import cProfile
+import os
+import random
+import threading
+
+_profiling = threading.Lock()
+
+
+def profile_stats_name(session_id):
+    return f"{session_id}_profile.pstats"
+
+
+def wants_profile(request, sample_rate=0.0):
+    """
+    Whether this request should be profiled.
+    """
+    if request.headers.get('X-Profile') == '1' or request.args.get('profile') == '1':
+        return True
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+@contextlib.contextmanager
+def profiled(enabled, folder, session_id):
+    """
+    Runs the block under cProfile when ``enabled`` and saves the stats to
+    ``folder``, even if the block fails. Yields the stats file name, or None
+    when not profiling (also when another build is already being profiled).
+    """
+    if not enabled or not _profiling.acquire(blocking=False):
+        yield None
+        return
+    try:
+        profiler = cProfile.Profile()
+        filename = profile_stats_name(session_id)
+        profiler.enable()
+        try:
+            yield filename
+        finally:
+            profiler.disable()
+            profiler.dump_stats(os.path.join(folder, filename))
+    finally:
+        _profiling.release()
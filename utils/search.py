@@ -0,0 +1,294 @@
+"""
+Full-text index of generated profiles.
+
+Each profile's form fields and the text of its resume pages go into a
+SQLite FTS5 table next to the uploads, so candidates can be found without
+opening PDFs. Indexing runs on a background thread: finished profiles are
+queued by session id, and a periodic reconcile pass compares the
+``{session_id}_form.json`` records on disk with what was indexed, picking
+up edits, profiles written by other processes and deleted sessions. The
+same pass keeps each profile's duplicate fingerprint (see fingerprint.py)
+up to date.
+
+Queries are words (stemmed, so "selling" finds "sell"), "quoted phrases",
+``prefix*`` terms, and ``field:value`` to search one field, e.g.
+``enterprise sales location:pune notice_period:"30 days"``. All terms must
+match.
+"""
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from utils.db import connect
+from utils.fingerprint import DEFAULT_THRESHOLD, DuplicateIndex, Fingerprint
+from utils.pipeline import FORM_FIELDS, load_profile_record, profile_name, record_name
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = FORM_FIELDS + ['resume_text']
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS profiles (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL UNIQUE,
+    record_mtime REAL NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS profiles_indexed_at ON profiles (indexed_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS profile_text USING fts5(
+    {', '.join(COLUMNS)},
+    tokenize = 'porter unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+"""
+
+# Fields returned with each hit (everything is searchable)
+RESULT_FIELDS = ['candidate_name', 'department', 'location', 'current_company', 'total_exp',
+                 'notice_period', 'expected_salary']
+
+# Resume text beyond this is not indexed; it is rarely useful for finding
+# a candidate and keeps scanned portfolios from bloating the index
+MAX_TEXT_CHARS = 100_000
+
+_RECORD = re.compile(r'^([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})_form\.json$')
+_TERM = re.compile(r'(?:(\w+):)?("[^"]*"|[^\s"]+)')
+_FIELD_ALIASES = {'name': 'candidate_name', 'resume': 'resume_text', 'company': 'current_company'}
+
+_RECONCILE = object()
+
+
+def build_query(text):
+    """
+    Turns a search box string into an FTS5 MATCH expression, or None when it
+    has no terms. Every term is quoted, so user input can never be FTS5
+    syntax; unknown ``field:`` prefixes are searched as plain words.
+    """
+    terms = []
+    for field, value in _TERM.findall(text or ''):
+        prefix = value.endswith('*') and not value.startswith('"')
+        value = value.strip('"').rstrip('*').replace('"', '')
+        if not value.strip():
+            continue
+        field = _FIELD_ALIASES.get(field.lower(), field.lower())
+        term = f'"{value}"' + ('*' if prefix else '')
+        if field in COLUMNS:
+            term = f'{field} : {term}'
+        elif field:
+            term = f'"{field} {value}"'
+        terms.append(term)
+    return ' AND '.join(terms) or None
+
+
+def extract_resume_text(path, skip_pages=0):
+    """
+    Text of a profile's resume pages (the pages after its summary), without
+    the overlay footer, capped at MAX_TEXT_CHARS. Scanned resumes have no
+    text layer and give ''.
+    """
+    # Heavy; only the indexer thread needs them
+    from pypdf import PdfReader
+    from utils.pdf_generator import FOOTER_TEXT
+
+    parts = []
+    size = 0
+    for page in PdfReader(path).pages[skip_pages:]:
+        text = (page.extract_text() or '').replace(FOOTER_TEXT, '')
+        parts.append(text)
+        size += len(text)
+        if size >= MAX_TEXT_CHARS:
+            break
+    return '\n'.join(parts)[:MAX_TEXT_CHARS]
+
+
+class SearchIndex:
+    def __init__(self, folder, db_path, reconcile_interval=300, duplicate_threshold=DEFAULT_THRESHOLD):
+        self.folder = folder
+        self.db_path = db_path
+        self.reconcile_interval = reconcile_interval
+        self.duplicates = DuplicateIndex(db_path, threshold=duplicate_threshold)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+
+    def _connect(self):
+        return connect(self.db_path, SCHEMA)
+
+    def index(self, session_id):
+        """
+        (Re-)indexes one profile from its record and final PDF, or drops it
+        from the index when either is gone.
+        """
+        record_path = os.path.join(self.folder, record_name(session_id))
+        pdf_path = os.path.join(self.folder, profile_name(session_id))
+        record = load_profile_record(self.folder, session_id)
+        try:
+            if record is None:
+                raise FileNotFoundError(record_path)
+            record_mtime = os.path.getmtime(record_path)
+            text = extract_resume_text(pdf_path, record['summary_pages'])
+        except FileNotFoundError:
+            self.remove(session_id)
+            return
+        form_data = record['form_data']
+        values = [form_data.get(field) or '' for field in FORM_FIELDS] + [text]
+        with self._connect() as conn:
+            row = conn.execute("SELECT id FROM profiles WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None:
+                rowid = conn.execute(
+                    "INSERT INTO profiles (session_id, record_mtime, indexed_at) VALUES (?, ?, ?)",
+                    (session_id, record_mtime, time.time())
+                ).lastrowid
+            else:
+                rowid = row['id']
+                conn.execute("UPDATE profiles SET record_mtime = ?, indexed_at = ? WHERE id = ?",
+                             (record_mtime, time.time(), rowid))
+                conn.execute("DELETE FROM profile_text WHERE rowid = ?", (rowid,))
+            conn.execute(
+                f"INSERT INTO profile_text (rowid, {', '.join(COLUMNS)}) VALUES (?{', ?' * len(COLUMNS)})",
+                [rowid] + values
+            )
+        self.duplicates.add(session_id, Fingerprint.from_profile(form_data, text))
+
+    def remove(self, session_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT id FROM profiles WHERE session_id = ?", (session_id,)).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM profile_text WHERE rowid = ?", (row['id'],))
+                conn.execute("DELETE FROM profiles WHERE id = ?", (row['id'],))
+        self.duplicates.remove(session_id)
+
+    def reconcile(self):
+        """
+        Indexes records that are new or changed since they were indexed and
+        removes sessions whose record is gone. Returns (indexed, removed).
+        """
+        with self._connect() as conn:
+            known = {row['session_id']: row['record_mtime']
+                     for row in conn.execute("SELECT session_id, record_mtime FROM profiles")}
+        on_disk = {}
+        for entry in os.scandir(self.folder):
+            match = _RECORD.match(entry.name)
+            if match:
+                on_disk[match.group(1)] = entry.stat().st_mtime
+        indexed = 0
+        for session_id, mtime in on_disk.items():
+            if known.get(session_id) != mtime:
+                self.index(session_id)
+                indexed += 1
+        gone = [session_id for session_id in known if session_id not in on_disk]
+        for session_id in gone:
+            self.remove(session_id)
+        return indexed, len(gone)
+
+    def search(self, text, limit=20, offset=0):
+        """
+        Returns ``(total, hits)``: the number of matching profiles and up to
+        ``limit`` of them, best match first (newest first for an empty
+        query). Each hit has the session id, RESULT_FIELDS and a snippet of
+        the resume text around the match.
+        """
+        match = build_query(text)
+        columns = ', '.join(f"t.{field}" for field in RESULT_FIELDS)
+        resume_column = COLUMNS.index('resume_text')
+        with self._connect() as conn:
+            if match is None:
+                total = conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+                # CROSS JOIN keeps SQLite from scanning the FTS table first
+                rows = conn.execute(
+                    f"SELECT p.session_id, {columns}, '' AS snippet FROM profiles p "
+                    "CROSS JOIN profile_text t ON t.rowid = p.id ORDER BY p.indexed_at DESC LIMIT ? OFFSET ?",
+                    (limit, offset)
+                ).fetchall()
+                return total, [dict(row) for row in rows]
+
+            total = conn.execute("SELECT COUNT(*) FROM profile_text WHERE profile_text MATCH ?",
+                                 (match,)).fetchone()[0]
+            ranked = [row[0] for row in conn.execute(
+                "SELECT rowid FROM profile_text WHERE profile_text MATCH ? "
+                "ORDER BY bm25(profile_text) LIMIT ? OFFSET ?",
+                (match, limit, offset)
+            )]
+            # Snippets only for the page being returned, not every match
+            rows = conn.execute(
+                f"SELECT t.rowid, p.session_id, {columns}, "
+                f"snippet(profile_text, {resume_column}, '[', ']', '...', 12) AS snippet "
+                "FROM profile_text t JOIN profiles p ON p.id = t.rowid "
+                f"WHERE profile_text MATCH ? AND t.rowid IN ({', '.join('?' * len(ranked))})",
+                [match] + ranked
+            ).fetchall() if ranked else []
+        by_rowid = {row['rowid']: row for row in rows}
+        hits = []
+        for rowid in ranked:
+            hit = dict(by_rowid[rowid])
+            del hit['rowid']
+            hits.append(hit)
+        return total, hits
+
+    def enqueue(self, session_id):
+        """
+        Queues a profile for indexing on the background thread.
+        """
+        self._queue.put(session_id)
+
+    def wait_idle(self):
+        """
+        Blocks until everything queued so far has been indexed.
+        """
+        self._queue.join()
+
+    def start(self):
+        """
+        Starts the indexing thread. It reconciles with the records on disk
+        first and then every ``reconcile_interval`` seconds.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._queue.put(_RECONCILE)
+            self._thread = threading.Thread(target=self._worker, name='talentwrap-indexer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _worker(self):
+        # Reconcile on schedule even when the queue never runs dry
+        last_reconcile = time.monotonic()
+        while True:
+            remaining = last_reconcile + self.reconcile_interval - time.monotonic()
+            if remaining <= 0:
+                self._process(_RECONCILE)
+                last_reconcile = time.monotonic()
+                continue
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            try:
+                if item is None:
+                    return
+                self._process(item)
+                if item is _RECONCILE:
+                    last_reconcile = time.monotonic()
+            finally:
+                self._queue.task_done()
+
+    def _process(self, item):
+        try:
+            if item is _RECONCILE:
+                indexed, removed = self.reconcile()
+                if indexed or removed:
+                    logger.info("search index: %d profiles indexed, %d removed", indexed, removed)
+            else:
+                self.index(item)
+        except Exception:
+            logger.exception("search indexing failed")
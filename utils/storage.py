@@ -0,0 +1,231 @@
+"""
+Lifecycle management for files in the upload folder.
+
+Every artifact written for a session is recorded in a SQLite index, so
+cleanup never has to list the upload directory. Intermediates are deleted as
+soon as a profile has been merged; final profiles (with their sidecar files)
+expire after a TTL, or earlier when the folder exceeds its byte quota, least
+recently downloaded first. A background janitor thread does the sweeping.
+"""
+import contextlib
+import logging
+import os
+import re
+import threading
+import time
+from utils.db import connect
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL
+);
+CREATE INDEX IF NOT EXISTS artifacts_session ON artifacts (session_id);
+"""
+
+# Kinds of artifact:
+#   final        - the generated profile handed to users
+#   sidecar      - kept for as long as the final profile (edit record and its lock,
+#                  profiling stats)
+#   intermediate - only needed until the merge succeeds
+FINAL = 'final'
+SIDECAR = 'sidecar'
+INTERMEDIATE = 'intermediate'
+
+_UUID = r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
+_PATTERNS = [
+    (re.compile(rf'^TalentWrap_Profile_(?P<sid>{_UUID})\.pdf$'), FINAL),
+    (re.compile(rf'^(?P<sid>{_UUID})_form\.json$'), SIDECAR),
+    (re.compile(rf'^(?P<sid>{_UUID})_form\.json\.lock$'), SIDECAR),
+    (re.compile(rf'^(?P<sid>{_UUID})_profile\.pstats$'), SIDECAR),
+    (re.compile(rf'^(?P<sid>{_UUID})_.+$'), INTERMEDIATE),
+]
+
+
+def classify(filename):
+    """
+    Returns (session_id, kind) for a file name in the upload folder, or None
+    for files that do not belong to a session (databases, caches, ...).
+    """
+    for pattern, kind in _PATTERNS:
+        match = pattern.match(filename)
+        if match:
+            return match.group('sid'), kind
+    return None
+
+
+def servable(filename):
+    """
+    Whether ``filename`` may be downloaded: final profiles and their
+    profiling stats, never edit records, uploads or databases.
+    """
+    classified = classify(filename)
+    if classified is None:
+        return False
+    _, kind = classified
+    return kind == FINAL or (kind == SIDECAR and filename.endswith('_profile.pstats'))
+
+
+class StorageManager:
+    def __init__(self, folder, db_path, ttl=7 * 24 * 3600, quota_bytes=2 * 1024 ** 3,
+                 intermediate_ttl=24 * 3600):
+        self.folder = folder
+        self.db_path = db_path
+        self.ttl = ttl
+        self.quota_bytes = quota_bytes
+        self.intermediate_ttl = intermediate_ttl
+        self._stop = threading.Event()
+        self._thread = None
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+
+    def _connect(self):
+        return connect(self.db_path, SCHEMA)
+
+    def register(self, filename, now=None):
+        """
+        Records (or refreshes the size of) a file in the upload folder.
+        """
+        classified = classify(filename)
+        if classified is None:
+            return
+        session_id, kind = classified
+        try:
+            size = os.path.getsize(os.path.join(self.folder, filename))
+        except FileNotFoundError:
+            return
+        now = now if now is not None else time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO artifacts (path, session_id, kind, size, created_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET size = excluded.size",
+                (filename, session_id, kind, size, now)
+            )
+
+    def merge_succeeded(self, session_id, *filenames):
+        """
+        Registers the session's final files and deletes its intermediates.
+        """
+        for filename in filenames:
+            self.register(filename)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT path FROM artifacts WHERE session_id = ? AND kind = ?", (session_id, INTERMEDIATE)
+            ).fetchall()
+        self._delete([row['path'] for row in rows])
+
+    def touch(self, filename):
+        """
+        Marks a file as downloaded, which protects it from quota eviction.
+        """
+        with self._connect() as conn:
+            conn.execute("UPDATE artifacts SET last_access = ? WHERE path = ?", (time.time(), filename))
+
+    def total_bytes(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+
+    def _delete(self, filenames):
+        for filename in filenames:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self.folder, filename))
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM artifacts WHERE path = ?", [(f,) for f in filenames])
+
+    def delete_session(self, session_id):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT path FROM artifacts WHERE session_id = ?", (session_id,)).fetchall()
+        self._delete([row['path'] for row in rows])
+
+    def adopt(self):
+        """
+        Indexes session files written before the index existed (or by an
+        older version). Only needed once at startup.
+        """
+        with self._connect() as conn:
+            known = {row['path'] for row in conn.execute("SELECT path FROM artifacts")}
+        adopted = 0
+        for entry in os.scandir(self.folder):
+            if entry.is_file() and entry.name not in known and classify(entry.name):
+                self.register(entry.name, now=entry.stat().st_mtime)
+                adopted += 1
+        return adopted
+
+    def sweep(self, now=None):
+        """
+        Deletes stale intermediates, expired sessions and, while over quota,
+        the least recently downloaded sessions. Returns the number of files
+        removed.
+        """
+        now = now if now is not None else time.time()
+        with self._connect() as conn:
+            stale = [row['path'] for row in conn.execute(
+                "SELECT path FROM artifacts WHERE kind = ? AND created_at < ?",
+                (INTERMEDIATE, now - self.intermediate_ttl)
+            )]
+            expired = [row['session_id'] for row in conn.execute(
+                "SELECT DISTINCT session_id FROM artifacts WHERE kind != ? AND created_at < ?",
+                (INTERMEDIATE, now - self.ttl)
+            )]
+        removed = len(stale)
+        self._delete(stale)
+        for session_id in expired:
+            removed += self._delete_session_counted(session_id)
+
+        total = self.total_bytes()
+        if total > self.quota_bytes:
+            with self._connect() as conn:
+                sessions = conn.execute(
+                    "SELECT session_id, SUM(size) AS size, MAX(COALESCE(last_access, created_at)) AS used "
+                    "FROM artifacts GROUP BY session_id ORDER BY used"
+                ).fetchall()
+            for row in sessions:
+                if total <= self.quota_bytes:
+                    break
+                removed += self._delete_session_counted(row['session_id'])
+                total -= row['size']
+        return removed
+
+    def _delete_session_counted(self, session_id):
+        with self._connect() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM artifacts WHERE session_id = ?", (session_id,)).fetchone()[0]
+        self.delete_session(session_id)
+        return count
+
+    def start_janitor(self, interval=300):
+        """
+        Starts the background thread that adopts existing files once and then
+        sweeps every ``interval`` seconds.
+        """
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._janitor, args=(interval,), name='talentwrap-janitor',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop_janitor(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _janitor(self, interval):
+        try:
+            self.adopt()
+        except Exception:
+            logger.exception("storage janitor failed to index existing uploads")
+        while True:
+            try:
+                removed = self.sweep()
+                if removed:
+                    logger.info("storage janitor removed %d files", removed)
+            except Exception:
+                logger.exception("storage janitor sweep failed")
+            if self._stop.wait(interval):
+                return
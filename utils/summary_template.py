@@ -0,0 +1,316 @@
+"""
+Compiled layout for the profile summary page.
+
+A SummaryTemplate is built once from a layout (a dict, or a JSON file) and
+holds everything that does not depend on the candidate: the criteria, column
+widths, styles and numbering rules. Rendering only binds form data to it.
+
+Layout keys (all optional except ``fields``):
+
+    {
+      "title": "PROFILE SUMMARY",
+      "header": ["SNO", "Evaluation Criteria", "Detail"],
+      "column_widths": [0.5, 3.0, 3.5],        (inches)
+      "font_size": 12, "leading": 13, "title_size": 16,
+      "numbering": "sequential",               (or "fixed": keep each field's position)
+      "hide_empty": true,                       (leave out fields without a value)
+      "fields": [{"key": "candidate_name", "label": "Candidate Name"}, ...]
+    }
+
+Summaries that are known to fit on one page are drawn straight onto a canvas
+with the same geometry the table layout produces; anything else (long
+values, markup characters, words wider than their column) goes through
+platypus.
+"""
+import json
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+DEFAULT_LAYOUT = {
+    'title': "PROFILE SUMMARY",
+    'header': ["SNO", "Evaluation Criteria", "Detail"],
+    'column_widths': [0.5, 3, 3.5],
+    'font_size': 12,
+    'leading': 13,
+    'title_size': 16,
+    'numbering': 'sequential',
+    'hide_empty': True,
+    'fields': [
+        {'key': 'candidate_name', 'label': "Candidate Name"},
+        {'key': 'department', 'label': "Department/Function"},
+        {'key': 'phone', 'label': "Phone No"},
+        {'key': 'email', 'label': "Email"},
+        {'key': 'location', 'label': "Current location"},
+        {'key': 'age', 'label': "Age"},
+        {'key': 'education', 'label': "Education Qualification"},
+        {'key': 'tech_expertise', 'label': "Technical Expertise"},
+        {'key': 'industry', 'label': "Industry Exposure"},
+        {'key': 'current_company', 'label': "Current Company"},
+        {'key': 'product_selling', 'label': "Product Selling"},
+        {'key': 'ticket_size', 'label': "Ticket Size"},
+        {'key': 'sales_target', 'label': "Current Company’s Annual\nSales Target"},
+        {'key': 'sales_achieved', 'label': "Achieved Sales Target"},
+        {'key': 'communication', 'label': "Communication"},
+        {'key': 'reason_change', 'label': "Reason for the job change"},
+        {'key': 'total_exp', 'label': "Total Experience"},
+        {'key': 'current_salary', 'label': "Current salary(Per month)"},
+        {'key': 'expected_salary', 'label': "Expected Salary (Per month)"},
+        {'key': 'notice_period', 'label': "Notice Period"},
+        {'key': 'remarks', 'label': "Remarks if any"},
+    ],
+}
+
+PAGE_SIZE = letter
+MARGIN = 0.3 * inch    # small margins to allow more content on the first page
+FRAME_PADDING = 6      # platypus Frame default
+CELL_PADDING_X = 10
+CELL_PADDING_Y = 7
+GRID_WIDTH = 0.5
+TITLE_SPACE_AFTER = 5
+TITLE_SPACER = 5
+FONT = 'Helvetica'
+BOLD_FONT = 'Helvetica-Bold'
+# Plain strings in table cells (the serial numbers) use the table defaults
+SNO_FONT_SIZE = 10
+STRING_LEADING = 12
+
+
+class LayoutError(ValueError):
+    """Raised when a summary layout is invalid."""
+
+
+class SummaryTemplate:
+    def __init__(self, layout=None):
+        layout = dict(DEFAULT_LAYOUT, **(layout or {}))
+        try:
+            self.fields = [(str(field['key']), str(field['label'])) for field in layout['fields']]
+            self.title = str(layout['title'])
+            self.header = [str(text) for text in layout['header']]
+            self.col_widths = [float(width) * inch for width in layout['column_widths']]
+            self.font_size = float(layout['font_size'])
+            self.leading = float(layout['leading'])
+            self.title_size = float(layout['title_size'])
+        except (KeyError, TypeError, ValueError) as e:
+            raise LayoutError(f"Invalid summary layout: {e}")
+        self.numbering = layout['numbering']
+        self.hide_empty = bool(layout['hide_empty'])
+        if self.numbering not in ('sequential', 'fixed'):
+            raise LayoutError(f"Invalid summary layout: unknown numbering {self.numbering!r}")
+        if len(self.header) != 3 or len(self.col_widths) != 3:
+            raise LayoutError("Invalid summary layout: the table has exactly three columns")
+        if not self.fields:
+            raise LayoutError("Invalid summary layout: no fields")
+
+        styles = getSampleStyleSheet()
+        self.title_style = ParagraphStyle(
+            'ProfileSummary',
+            parent=styles['Heading2'],
+            fontSize=self.title_size,
+            leading=self.title_size * 1.125,
+            alignment=1, # Center
+            spaceAfter=TITLE_SPACE_AFTER,
+            fontName=BOLD_FONT,
+            textColor=colors.black
+        )
+        self.cell_style = ParagraphStyle(
+            'TableContent',
+            parent=styles['BodyText'],
+            fontName=FONT,
+            fontSize=self.font_size,
+            leading=self.leading
+        )
+        self.table_style = TableStyle([
+            ('GRID', (0, 0), (-1, -1), GRID_WIDTH, colors.black),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.whitesmoke), # Header bg
+            ('FONTNAME', (0, 0), (-1, 0), BOLD_FONT),
+            ('FONTSIZE', (0, 0), (-1, 0), self.font_size),
+            ('LEADING', (0, 0), (-1, 0), STRING_LEADING),
+            ('ALIGN', (0, 0), (0, -1), 'CENTER'), # Center SNO
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('TOPPADDING', (0, 0), (-1, -1), CELL_PADDING_Y),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), CELL_PADDING_Y),
+            ('LEFTPADDING', (0, 0), (-1, -1), CELL_PADDING_X),
+            ('RIGHTPADDING', (0, 0), (-1, -1), CELL_PADDING_X),
+        ])
+
+        # Page geometry shared by both render paths
+        width, height = PAGE_SIZE
+        self.frame_x = MARGIN + FRAME_PADDING
+        self.frame_width = width - 2 * (MARGIN + FRAME_PADDING)
+        self.frame_top = height - MARGIN - FRAME_PADDING
+        self.frame_height = height - 2 * (MARGIN + FRAME_PADDING)
+        self.table_width = sum(self.col_widths)
+        self.table_x = self.frame_x + (self.frame_width - self.table_width) / 2
+        self.title_width = stringWidth(self.title, BOLD_FONT, self.title_size)
+        self.header_height = STRING_LEADING + 2 * CELL_PADDING_Y
+        self.table_top = self.frame_top - self.title_style.leading - TITLE_SPACE_AFTER - TITLE_SPACER
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Loads a layout from a JSON file; keys it omits keep their defaults.
+        """
+        try:
+            with open(path, encoding='utf-8') as f:
+                layout = json.load(f)
+        except json.JSONDecodeError as e:
+            raise LayoutError(f"Invalid summary layout {path}: {e}")
+        if not isinstance(layout, dict):
+            raise LayoutError(f"Invalid summary layout {path}: expected a JSON object")
+        return cls(layout)
+
+    def rows(self, data):
+        """
+        Returns the visible (number, label, value) rows for ``data``.
+        """
+        rows = []
+        for position, (key, label) in enumerate(self.fields, start=1):
+            value = data.get(key)
+            value = '' if value is None else str(value)
+            if self.hide_empty and not value.strip():
+                continue
+            number = len(rows) + 1 if self.numbering == 'sequential' else position
+            rows.append((str(number), label, value))
+        return rows
+
+    def render(self, data, output):
+        """
+        Renders the summary for ``data`` to ``output`` (a path or a writable
+        binary file object).
+        """
+        rows = self.rows(data)
+        layout = self._single_page_layout(rows)
+        if layout is not None:
+            self._draw(layout, output)
+        else:
+            self._build(rows, output)
+
+    def _build(self, rows, output):
+        doc = SimpleDocTemplate(
+            output,
+            pagesize=PAGE_SIZE,
+            topMargin=MARGIN,
+            bottomMargin=MARGIN,
+            leftMargin=MARGIN,
+            rightMargin=MARGIN
+        )
+        table_data = [list(self.header)]
+        for number, label, value in rows:
+            table_data.append([number, Paragraph(label, self.cell_style), Paragraph(value, self.cell_style)])
+        table = Table(table_data, colWidths=self.col_widths)
+        table.setStyle(self.table_style)
+        doc.build([Paragraph(self.title, self.title_style), Spacer(1, TITLE_SPACER), table])
+
+    def _wrap(self, text, width):
+        """
+        Breaks plain text into lines the way Paragraph does, or returns None
+        if Paragraph might treat it differently.
+        """
+        if '<' in text or '&' in text:
+            return None
+        lines = []
+        line = ''
+        space = stringWidth(' ', FONT, self.font_size)
+        line_width = 0
+        for word in text.split():
+            word_width = stringWidth(word, FONT, self.font_size)
+            if word_width > width:
+                return None
+            if line and line_width + space + word_width <= width:
+                line += ' ' + word
+                line_width += space + word_width
+            elif line:
+                lines.append(line)
+                line, line_width = word, word_width
+            else:
+                line, line_width = word, word_width
+        if line:
+            lines.append(line)
+        return lines or ['']
+
+    def _single_page_layout(self, rows):
+        """
+        Returns the wrapped rows with their heights when the summary fits on
+        one page with plain text, else None.
+        """
+        if self.title_width > self.frame_width:
+            return None
+        label_width = self.col_widths[1] - 2 * CELL_PADDING_X
+        value_width = self.col_widths[2] - 2 * CELL_PADDING_X
+        available = self.table_top - (self.frame_top - self.frame_height) - self.header_height
+        layout = []
+        for number, label, value in rows:
+            label_lines = self._wrap(label, label_width)
+            value_lines = self._wrap(value, value_width)
+            if label_lines is None or value_lines is None:
+                return None
+            content = max(STRING_LEADING, len(label_lines) * self.leading, len(value_lines) * self.leading)
+            height = content + 2 * CELL_PADDING_Y
+            available -= height
+            if available < 0:
+                return None
+            layout.append((number, label_lines, value_lines, height))
+        return layout
+
+    def _draw(self, layout, output):
+        c = canvas.Canvas(output, pagesize=PAGE_SIZE)
+        c.setFillColor(colors.black)
+
+        # Title, centred in the frame
+        c.setFont(BOLD_FONT, self.title_size)
+        c.drawString(self.frame_x + (self.frame_width - self.title_width) / 2,
+                     self.frame_top - self.title_size, self.title)
+
+        x0 = self.table_x
+        col_x = [x0, x0 + self.col_widths[0], x0 + self.col_widths[0] + self.col_widths[1]]
+        top = self.table_top
+        bottom = top - self.header_height - sum(row[3] for row in layout)
+
+        # Header row
+        c.setFillColor(colors.whitesmoke)
+        c.rect(x0, top - self.header_height, self.table_width, self.header_height, stroke=0, fill=1)
+        c.setFillColor(colors.black)
+        c.setFont(BOLD_FONT, self.font_size)
+        baseline = top - self.header_height + CELL_PADDING_Y + (STRING_LEADING - self.font_size)
+        c.drawCentredString(col_x[0] + self.col_widths[0] / 2, baseline, self.header[0])
+        c.drawString(col_x[1] + CELL_PADDING_X, baseline, self.header[1])
+        c.drawString(col_x[2] + CELL_PADDING_X, baseline, self.header[2])
+
+        # Body rows, each cell vertically centred
+        row_lines = [top - self.header_height]
+        y = top - self.header_height
+        for number, label_lines, value_lines, height in layout:
+            row_bottom = y - height
+            inner = height - 2 * CELL_PADDING_Y
+            c.setFont(FONT, SNO_FONT_SIZE)
+            c.drawCentredString(col_x[0] + self.col_widths[0] / 2,
+                                row_bottom + CELL_PADDING_Y + (inner - STRING_LEADING) / 2
+                                + STRING_LEADING - SNO_FONT_SIZE,
+                                number)
+            c.setFont(FONT, self.font_size)
+            for x, lines in ((col_x[1], label_lines), (col_x[2], value_lines)):
+                block = len(lines) * self.leading
+                line_y = row_bottom + CELL_PADDING_Y + (inner - block) / 2 + block - self.font_size
+                for line in lines:
+                    c.drawString(x + CELL_PADDING_X, line_y, line)
+                    line_y -= self.leading
+            y = row_bottom
+            row_lines.append(y)
+
+        # Grid
+        c.setStrokeColor(colors.black)
+        c.setLineWidth(GRID_WIDTH)
+        c.setLineCap(1)
+        c.setLineJoin(1)
+        for line_y in [top] + row_lines:
+            c.line(x0, line_y, x0 + self.table_width, line_y)
+        for line_x in col_x + [x0 + self.table_width]:
+            c.line(line_x, bottom, line_x, top)
+
+        c.showPage()
+        c.save()
@@ -0,0 +1,66 @@
+"""
+Start-up warm-up and readiness.
+
+The PDF stack (reportlab, pypdf, img2pdf) is only imported when the first
+profile is built, so a worker can answer the login page and health checks
+right away. warm_up() pays that cost up front. Under a pre-forking server it
+runs in the master before the workers are forked (see gunicorn.conf.py), so
+every worker starts warm and shares the loaded pages copy-on-write.
+
+It must not start threads or child processes: those would not survive the
+fork. The job queue, storage janitor and LibreOffice pool start lazily in
+each worker.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_ready = threading.Event()
+_lock = threading.Lock()
+_started = False
+
+
+def warm_up():
+    """
+    Imports the PDF stack and preloads fonts, styles and the overlay.
+    Safe to call more than once.
+    """
+    global _started
+    with _lock:
+        _started = True
+        if _ready.is_set():
+            return
+        started = time.perf_counter()
+        from utils import pdf_generator
+        pdf_generator.warm_up()
+        _ready.set()
+        logger.info("warm-up finished in %.2fs", time.perf_counter() - started)
+
+
+def warm_up_in_background():
+    """
+    Starts warm-up on a thread, for servers that do not pre-fork. Returns
+    immediately; is_ready() tells when it is done.
+    """
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_warm_up_logged, name='talentwrap-warmup', daemon=True).start()
+
+
+def _warm_up_logged():
+    global _started
+    try:
+        warm_up()
+    except Exception:
+        logger.exception("warm-up failed")
+        with _lock:
+            _started = False  # let the next readiness probe retry
+
+
+def is_ready():
+    return _ready.is_set()